@@ -10,12 +10,15 @@
 #-------------------------------------------------------------------------------
 
 import logging.config
+import math
 import threading
 import ConfigParser
 import os
 import sys
-import socket
+import signal
+import time
 import requests
+from collections import namedtuple
 from time import sleep
 
 # Can we clean this up?
@@ -23,6 +26,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "../../Faraday_Proxy_Too
 from FaradayIO import faradaybasicproxyio
 from FaradayIO import telemetryparser
 
+import aprsformat
+import aprsisclient
+
 # Start logging after importing modules
 logging.config.fileConfig('loggingConfig.ini')
 logger = logging.getLogger('APRS')
@@ -32,260 +38,562 @@ logger = logging.getLogger('APRS')
 aprsConfig = ConfigParser.RawConfigParser()
 aprsConfig.read('aprs.ini')
 
+# Mean earth radius (meters) for smart beaconing distances
+EARTH_RADIUS = 6371000.0
+
+# Default maximum bytes sent to APRS-IS per write
+MAX_BURST = 4096
+
+# Default seconds between resending unchanged telemetry metadata
+METADATA_INTERVAL = 1800
+
+# Default writes queued while disconnected and seconds of server silence
+# before reconnecting to APRS-IS
+QUEUE_SIZE = 1000
+KEEPALIVE = 120
+
+# Default smart beaconing settings, disabled without a [BEACONING] section
+BEACONING = {"ENABLED": False, "SLOWRATE": 1800.0, "FASTRATE": 60.0,
+             "LOWSPEED": 5.0, "HIGHSPEED": 60.0, "DISTANCE": 500.0}
+
+# Immutable snapshot of aprs.ini read once instead of for every packet
+AprsSettings = namedtuple("AprsSettings", [
+    "telemetryHost", "telemetryPort", "stationsAge", "callsign", "server",
+    "port", "rate", "qConstruct", "dataTypeIdent", "destAddress",
+    "symbolTable", "symbol", "altSymbolTable", "altSymbol", "comment",
+    "altComment", "ioSource", "units", "bitLabels", "adcParameters",
+    "ioParameters", "equations", "maxBurst", "metadataInterval", "queueSize",
+    "keepalive", "smartBeaconing", "beaconSlowRate", "beaconFastRate",
+    "beaconLowSpeed", "beaconHighSpeed", "beaconDistance"])
+
+
+def loadSettings(config):
+    """
+    Reads all APRS application settings from a configuration file
+
+    :param config: Configuration file descriptor from aprs.INI
+    :return: AprsSettings
+    """
+    maxBurst = MAX_BURST
+    if config.has_option("APRSIS", "MAXBURST"):
+        maxBurst = config.getint("APRSIS", "MAXBURST")
+    metadataInterval = METADATA_INTERVAL
+    if config.has_option("APRSIS", "METADATAINTERVAL"):
+        metadataInterval = config.getint("APRSIS", "METADATAINTERVAL")
+    queueSize = QUEUE_SIZE
+    if config.has_option("APRSIS", "QUEUESIZE"):
+        queueSize = config.getint("APRSIS", "QUEUESIZE")
+    keepalive = KEEPALIVE
+    if config.has_option("APRSIS", "KEEPALIVE"):
+        keepalive = config.getint("APRSIS", "KEEPALIVE")
+    beaconing = dict(BEACONING)
+    for option in beaconing:
+        if config.has_option("BEACONING", option):
+            if option == "ENABLED":
+                beaconing[option] = config.getboolean("BEACONING", option)
+            else:
+                beaconing[option] = config.getfloat("BEACONING", option)
+
+    settings = AprsSettings(
+        telemetryHost=config.get("TELEMETRY", "HOST"),
+        telemetryPort=config.get("TELEMETRY", "PORT"),
+        stationsAge=config.getint("APRSIS", "STATIONSAGE"),
+        callsign=config.get("APRSIS", "CALLSIGN").upper(),
+        server=config.get("APRSIS", "SERVER"),
+        port=config.getint("APRSIS", "PORT"),
+        rate=config.getint("APRSIS", "RATE"),
+        qConstruct=config.get("APRS", "QCONSTRUCT"),
+        dataTypeIdent=config.get("APRS", "DATATYPEIDENT"),
+        destAddress=config.get("APRS", "DESTADDRESS"),
+        symbolTable=config.get("APRS", "SYMBOLTABLE"),
+        symbol=config.get("APRS", "SYMBOL"),
+        altSymbolTable=config.get("APRS", "ALTSYMBOLTABLE"),
+        altSymbol=config.get("APRS", "ALTSYMBOL"),
+        comment=config.get("APRS", "COMMENT"),
+        altComment=config.get("APRS", "ALTCOMMENT"),
+        ioSource=config.get("APRS", "IOSOURCE").upper(),
+        units=tuple(config.get("APRS", "UNIT" + str(i))
+                    for i in range(5)),
+        bitLabels=tuple(config.get("APRS", "BLABEL" + str(i))
+                        for i in range(8)),
+        adcParameters=tuple(config.get("APRS", "ADC" + str(i) + "PARAM")
+                            for i in range(5)),
+        ioParameters=tuple(config.get("APRS", "IO" + str(i) + "PARAM")
+                           for i in range(8)),
+        equations=tuple(config.get("APRS", "EQ" + str(i) + coefficient)
+                        for i in range(5) for coefficient in "ABC"),
+        maxBurst=maxBurst,
+        metadataInterval=metadataInterval,
+        queueSize=queueSize,
+        keepalive=keepalive,
+        smartBeaconing=beaconing["ENABLED"],
+        beaconSlowRate=beaconing["SLOWRATE"],
+        beaconFastRate=beaconing["FASTRATE"],
+        beaconLowSpeed=beaconing["LOWSPEED"],
+        beaconHighSpeed=beaconing["HIGHSPEED"],
+        beaconDistance=beaconing["DISTANCE"])
+
+    if settings.ioSource not in aprsformat.IO_FIELDS:
+        raise ValueError("IOSOURCE '{0}' is invalid".format(settings.ioSource))
+
+    return settings
+
+
+def reloadSettings(signum=None, frame=None):
+    """
+    Rereads aprs.ini into aprsSettings, used as the SIGHUP signal handler
+
+    APRS-IS login settings only take effect on the next connection. The
+    current settings are kept if the configuration file is invalid.
+
+    :param signum: Signal number when called as a signal handler
+    :param frame: Stack frame when called as a signal handler
+    :return: None
+    """
+    global aprsSettings
+    global aprsFormatter
+
+    config = ConfigParser.RawConfigParser()
+    try:
+        config.read('aprs.ini')
+        settings = loadSettings(config)
+
+    except (ConfigParser.Error, ValueError) as e:
+        logger.error("Settings not reloaded: " + str(e))
+
+    else:
+        # Rebinding the globals is atomic, send functions use one snapshot
+        aprsFormatter = aprsformat.AprsFormatter(settings)
+        aprsSettings = settings
+        logger.info("Reloaded aprs.ini settings")
+
+aprsSettings = loadSettings(aprsConfig)
+
+# APRS line templates compiled from aprsSettings
+aprsFormatter = aprsformat.AprsFormatter(aprsSettings)
+
 # Create and initialize dictionary queues
 telemetryDicts = {}
 
 
-def aprs_worker(config, sock):
+def aprs_worker(client, stationSource=None, cycles=None):
     """
     Obtains telemetry with infinite loop, forwards to APRS-IS server
 
-    :param config: Configuration file descriptor from aprs.INI
-    :param sock: Internet socket
+    :param client: AprsIsClient connected to the APRS-IS server
+    :param stationSource: Function returning the latest station telemetry
+        list, None queries the telemetry server with getStationData()
+    :param cycles: Number of cycles to run, None runs forever
     :return: None
     """
     logger.debug('Starting aprs_worker thread')
-    rate = config.getint("APRSIS", "RATE")
 
     # Local variable initialization
     telemSequence = 0
+    metadataCache = MetadataCache()
+    positionFilter = PositionFilter()
+    clientStats = client.stats()
+    if stationSource is None:
+        stationSource = getStationData
 
     # Start infinite loop to send station data to APRS-IS
-    while(True):
-        # Query telemetry database for station data
-        stations = getStations()
-        stationData = getStationData(stations)
+    while cycles is None or cycles > 0:
+        # Metadata and reports queued earlier may have been dropped or lost
+        # with the connection, send them to every station again
+        previousStats, clientStats = clientStats, client.stats()
+        if clientStats["reconnects"] != previousStats["reconnects"] or\
+                clientStats["dropped"] != previousStats["dropped"]:
+            metadataCache.clear()
+            positionFilter.clear()
+
+        # Query telemetry server for latest data of all active stations
+        stationData = stationSource()
+
+        # Skip stations without new telemetry since the last cycle
+        freshStations = positionFilter.fresh(stationData)
+
+        # Iterate through all stations buffering telemetry and position data,
+        # with smart beaconing positions are only sent when due
+        cycle = TransmitBuffer()
+        sendPositions(positionFilter.due(freshStations, aprsSettings), cycle)
+        telemSequence = sendtelemetry(freshStations, telemSequence, cycle)
+
+        # Labels, parameters and equations only when changed or due again
+        metadataStations = metadataCache.due(stationData, aprsSettings)
+        sendTelemLabels(metadataStations, cycle)
+        sendParameters(metadataStations, cycle)
+        sendEquations(metadataStations, cycle)
+
+        # Queue all lines of this cycle in as few writes as possible, only
+        # remember the metadata and reports as sent once queued into a live
+        # connection
+        if cycle.flush(client, aprsSettings.maxBurst) and\
+                client.stats()["connected"]:
+            metadataCache.commit()
+            positionFilter.commit()
+        else:
+            metadataCache.discard()
+            positionFilter.discard()
 
-        # Iterate through all stations sending telemetry and position data
-        sendPositions(stationData, sock)
-        telemSequence = sendtelemetry(stationData, telemSequence, sock)
-        sendTelemLabels(stationData, sock)
-        sendParameters(stationData, sock)
-        sendEquations(stationData, sock)
+        if cycles is not None:
+            cycles -= 1
+            if cycles == 0:
+                break
 
-        # Sleep for intended update rate (seconds)
-        sleep(rate)
+        # Sleep for intended update rate (seconds), may change on reload
+        sleep(aprsSettings.rate)
 
-def getStations():
+class TransmitBuffer(object):
     """
-    Queries telemetry server for active stations
+    Collects the APRS-IS lines of one cycle so they are sent in a few writes
 
-    :return: JSON results from request
+    Provides the sendall() method of a socket so the send functions can write
+    into it. flush() joins the lines into bursts of at most maxBurst bytes,
+    lines are never split, instead of one syscall and TCP segment per line.
     """
 
-    # Read configuration to query telemetry server
-    host = aprsConfig.get("TELEMETRY", "HOST")
-    port = aprsConfig.get("TELEMETRY", "PORT")
+    def __init__(self):
+        self.lines = []
+
+    def sendall(self, data):
+        """Buffers an APRS-IS line until flush()"""
+        self.lines.append(data)
+
+    def flush(self, sock, maxBurst):
+        """
+        Sends and clears all buffered lines
+
+        :param sock: APRS-IS server internet socket or AprsIsClient
+        :param maxBurst: Maximum number of bytes sent per write
+        :return: True if every line was written, False on error
+        """
+        bursts = []
+        burst = []
+        size = 0
+        for line in self.lines:
+            if burst and size + len(line) > maxBurst:
+                bursts.append("".join(burst))
+                burst = []
+                size = 0
+            burst.append(line)
+            size += len(line)
+        if burst:
+            bursts.append("".join(burst))
+        self.lines = []
+
+        for data in bursts:
+            try:
+                sock.sendall(data)
 
-    # Construct station URL and query for active stations
-    url = "http://" + host + ":" + port + "/stations"
-    logger.debug(url)
+            except IOError as e:
+                logger.error(e)
+                return False
 
-    r = requests.get(url)
-    results = r.json()
+        return True
 
-    # Return extracted JSON data
-    return results
+class MetadataCache(object):
+    """
+    Tracks the telemetry metadata (UNIT, PARM and EQNS) sent for each station
 
-def getStationData(stations):
+    Metadata lines rarely change so they are only sent when a station is new,
+    its metadata differs from what was last sent (i.e. settings reloaded or a
+    new destination node) or METADATAINTERVAL seconds have passed. Positions
+    and telemetry values are still sent every cycle.
+
+    Stations returned by due() are only recorded as sent by commit() once
+    their lines were delivered, discard() forgets them so they are due again
+    next cycle and clear() makes every station due again.
     """
-    Queries telemetry server for detailed telemetry from active stations
 
-    :param stations: List of callsign + nodeids to get telemetry data from
-    :return: list containing latest station telemetry
+    def __init__(self):
+        # Station node: (metadata signature, time last sent)
+        self.sent = {}
+        # Entries of the last due() call waiting for commit()
+        self.pending = {}
+
+    def signature(self, station, settings):
+        """Returns everything the metadata lines of a station are built from"""
+        destNode = station["DESTINATIONCALLSIGN"] + "-" +\
+            str(station["DESTINATIONID"])
+        return (destNode, settings.qConstruct, settings.destAddress,
+                settings.units, settings.bitLabels, settings.adcParameters,
+                settings.ioParameters, settings.equations)
+
+    def due(self, stations, settings, now=None):
+        """
+        Returns the stations metadata should be sent for, pending commit()
+
+        :param stations: List of dictionary organized station data
+        :param settings: AprsSettings the metadata is built from
+        :param now: Current time in seconds since epoch, None is time.time()
+        :return: List of dictionary organized station data
+        """
+        if now is None:
+            now = time.time()
+
+        dueStations = []
+        for station in stations:
+            node = station["SOURCECALLSIGN"] + "-" + str(station["SOURCEID"])
+            signature = self.signature(station, settings)
+            last = self.sent.get(node)
+            if last is None or last[0] != signature or\
+                    now - last[1] >= settings.metadataInterval:
+                self.pending[node] = (signature, now)
+                dueStations.append(station)
+
+        return dueStations
+
+    def commit(self):
+        """Records the stations of the last due() call as sent"""
+        self.sent.update(self.pending)
+        self.pending = {}
+
+    def discard(self):
+        """Forgets the stations of the last due() call, they remain due"""
+        self.pending = {}
+
+    def clear(self):
+        """Forgets all sent metadata so every station is due again"""
+        self.sent = {}
+        self.pending = {}
+
+class PositionFilter(object):
+    """
+    Decides which stations position and telemetry reports are sent for
+
+    fresh() drops stations whose latest telemetry EPOCH was already sent, for
+    example a station that stopped transmitting but is still within
+    STATIONSAGE. With [BEACONING] enabled, due() further limits positions by
+    smart beaconing: slow movers are reported every SLOWRATE seconds, fast
+    movers up to every FASTRATE seconds and any station that moved DISTANCE
+    meters since its last report is reported right away.
+
+    Like MetadataCache, stations returned by fresh() and due() are only
+    recorded as sent by commit() once their lines were delivered, discard()
+    forgets them so they are sent again next cycle and clear() makes every
+    station fresh and due again.
     """
 
-    # Initialize lists
-    stationData = []
+    def __init__(self):
+        # Station node: EPOCH of the latest telemetry already sent
+        self.epochs = {}
+
+        # Station node: (time last sent, (latitude, longitude) or None)
+        self.positions = {}
+
+        # Entries of the last fresh() and due() calls waiting for commit()
+        self.pendingEpochs = {}
+        self.pendingPositions = {}
+
+    def fresh(self, stations):
+        """
+        Returns the stations with telemetry newer than last sent, pending
+        commit()
+
+        :param stations: List of dictionary organized station data
+        :return: List of dictionary organized station data
+        """
+        freshStations = []
+        for station in stations:
+            node = station["SOURCECALLSIGN"] + "-" + str(station["SOURCEID"])
+            epoch = station["EPOCH"]
+            if self.epochs.get(node) != epoch:
+                self.pendingEpochs[node] = epoch
+                freshStations.append(station)
+
+        return freshStations
+
+    def due(self, stations, settings, now=None):
+        """
+        Returns the stations a position should be sent for, pending commit()
+
+        :param stations: List of dictionary organized station data
+        :param settings: AprsSettings with the smart beaconing configuration
+        :param now: Current time in seconds since epoch, None is time.time()
+        :return: List of dictionary organized station data
+        """
+        if not settings.smartBeaconing:
+            return stations
+
+        if now is None:
+            now = time.time()
+
+        dueStations = []
+        for station in stations:
+            node = station["SOURCECALLSIGN"] + "-" + str(station["SOURCEID"])
+            position = stationPosition(station)
+            last = self.positions.get(node)
+
+            if last is None:
+                due = True
+            else:
+                lastTime, lastPosition = last
+                due = now - lastTime >= beaconInterval(station["GPSSPEED"],
+                                                       settings)
+                if not due and position is not None and\
+                        lastPosition is not None:
+                    due = distance(lastPosition, position) >=\
+                        settings.beaconDistance
+
+            if due:
+                self.pendingPositions[node] = (now, position)
+                dueStations.append(station)
+
+        return dueStations
+
+    def commit(self):
+        """Records the stations of the last fresh() and due() calls as sent"""
+        self.epochs.update(self.pendingEpochs)
+        self.positions.update(self.pendingPositions)
+        self.discard()
+
+    def discard(self):
+        """Forgets the stations of the last fresh() and due() calls"""
+        self.pendingEpochs = {}
+        self.pendingPositions = {}
+
+    def clear(self):
+        """Forgets all sent reports so every station is fresh and due again"""
+        self.epochs = {}
+        self.positions = {}
+        self.discard()
+
+def beaconInterval(speed, settings):
+    """
+    Returns the smart beaconing interval in seconds for a speed
 
-    # Read configuration to query telemetry server
-    host = aprsConfig.get("TELEMETRY", "HOST")
-    port = aprsConfig.get("TELEMETRY", "PORT")
-    age = aprsConfig.getint('APRSIS', 'STATIONSAGE')
+    :param speed: Station GPS speed (knots)
+    :param settings: AprsSettings with the smart beaconing configuration
+    :return: Seconds between position reports
+    """
+    try:
+        speed = float(speed)
+    except (TypeError, ValueError):
+        return settings.beaconSlowRate
+
+    if speed <= settings.beaconLowSpeed:
+        return settings.beaconSlowRate
+    elif speed >= settings.beaconHighSpeed:
+        return settings.beaconFastRate
+    else:
+        # Rate scales with speed between the low and high speeds
+        return min(settings.beaconSlowRate,
+                   settings.beaconFastRate * settings.beaconHighSpeed / speed)
 
-    # Construct base URL to get station data from telemetry server
-    url = "http://" + host + ":" + port + "/"
+def stationPosition(station):
+    """
+    Returns the decimal degree position of a station, None if not valid
 
-    # Iterate through each station and request latest telemetry data entry
-    for station in stations:
-        # Extract station identification data from active stations
-        callsign = station["SOURCECALLSIGN"]
-        nodeid = station["SOURCEID"]
-        epoch = station["EPOCH"]
+    :param station: Dictionary organized station data
+    :return: (latitude, longitude) tuple or None
+    """
+    try:
+        latitude = station["GPSLATITUDE"]
+        longitude = station["GPSLONGITUDE"]
+        latitude = float(latitude[:2]) + float(latitude[2:]) / 60
+        longitude = float(longitude[:3]) + float(longitude[3:]) / 60
 
-        # Construct request dictionary payload
-        payload = {"callsign": callsign, "nodeid": nodeid, "timespan": age, "limit": 1}
+    except (TypeError, ValueError):
+        return None
 
-        # Request data, append to stationData list
-        try:
-            r = requests.get(url, params = payload)
-            data = r.json()
+    if station["GPSLATITUDEDIR"] == "S":
+        latitude = -latitude
+    if station["GPSLONGITUDEDIR"] == "W":
+        longitude = -longitude
+    return (latitude, longitude)
 
-        except requests.exceptions.RequestException as e:
-            logger.error(e)
+def distance(start, end):
+    """
+    Returns the distance in meters between two decimal degree positions
 
-        else:
-            stationData.append(data)
+    Uses an equirectangular approximation which is accurate to well under a
+    percent over the few kilometers smart beaconing compares.
 
-    # Return all detailed stationData
-    return stationData
+    :param start: (latitude, longitude) tuple
+    :param end: (latitude, longitude) tuple
+    :return: Distance in meters
+    """
+    x = math.radians(end[1] - start[1]) *\
+        math.cos(math.radians((start[0] + end[0]) / 2))
+    y = math.radians(end[0] - start[0])
+    return EARTH_RADIUS * math.hypot(x, y)
 
-def nmeaToDegDecMin(latitude,longitude):
+def getStationData():
     """
-    Converts NMEA string latitude and longitude data into degree decimal minutes data compatible with
-    APRS-IS server requirements per APRS Protocol Version 1.0
+    Queries telemetry server for the latest telemetry from all active stations
 
-    :param latitude: NMEA latitude string
-    :param longitude: NMEA longitude string
-    :return: list of latitude and longitude strings per APRS protocol version 1
+    A single "/latest" request returns the most recent telemetry of every
+    station heard in the last STATIONSAGE seconds, so cycle time does not grow
+    with the number of stations.
+
+    :return: list containing latest station telemetry dictionaries
     """
 
-    # Convert NMEA to Decimal Degrees
-    latDeg = latitude[:2]  # latitude degrees
-    lonDeg = longitude[:3]  # Longitude degrees
-    latDec = round(float(latitude[2:]), 2)  # Latitude decimal minutes
-    lonDec = round(float(longitude[3:]), 2)  # Longitude decimal minutes
+    # Read configuration to query telemetry server
+    settings = aprsSettings
+    host = settings.telemetryHost
+    port = settings.telemetryPort
+    age = settings.stationsAge
+
+    # Construct latest telemetry URL and request payload
+    url = "http://" + host + ":" + port + "/latest"
+    payload = {"timespan": age}
+    logger.debug(url)
 
-    # round decimal minutes to 2 dec places & make 5 characters, zero fill
-    latDec = str("%.2f" % latDec).zfill(5)
-    lonDec = str("%.2f" % lonDec).zfill(5)
+    # Request data, no stations heard returns HTTP 204 without data
+    try:
+        r = requests.get(url, params = payload)
+        if r.status_code == 204:
+            return []
+        r.raise_for_status()
+        stationData = r.json()
 
-    # Combine into APRS-IS compliant lat/lon position
-    latString = latDeg + str(latDec)
-    lonString = lonDeg + str(lonDec)
+    except requests.exceptions.RequestException as e:
+        logger.error(e)
+        return []
 
-    return [latString,lonString]
+    except ValueError as e:
+        logger.error(e)
+        return []
 
+    # Return all detailed stationData
+    return stationData
 
 def sendPositions(stations, socket):
     """
     Constructs an APRS position string for station and sends to a socket
 
     :param stations: List of dictionary organized station data
-    :param socket: APRS-IS server internet socket
+    :param socket: APRS-IS server internet socket or cycle TransmitBuffer
     :return: None
     """
 
+    # Get APRS line templates compiled at startup
+    formatter = aprsFormatter
+
     # Iterate through each station and generate an APRS position string
     # then send the string to the socket for each station in list
-    for item in stations:
-        station = item[0]
-
-        # Get Station data from GPS data
-        sourceCallsign = station["SOURCECALLSIGN"]
-        sourceID = station["SOURCEID"]
-        destinationCallsign = station["DESTINATIONCALLSIGN"]
-        destinationID = station["DESTINATIONID"]
-        latitude = station["GPSLATITUDE"]
-        longitude = station["GPSLONGITUDE"]
-        latitudeDirection = station["GPSLATITUDEDIR"]
-        longitudeDir = station["GPSLONGITUDEDIR"]
-        altitude = station["GPSALTITUDE"]
-        speed = station["GPSSPEED"]
-        gpsFix = station["GPSFIX"]
-
-        # Get APRS configuration
-        qConstruct = aprsConfig.get('APRS', 'QCONSTRUCT')
-        dataTypeIdent = aprsConfig.get('APRS', 'DATATYPEIDENT')
-        destAddress = aprsConfig.get('APRS', 'DESTADDRESS')
-        symbolTable = aprsConfig.get('APRS', 'SYMBOLTABLE')
-        symbol = aprsConfig.get('APRS', 'SYMBOL')
-        altSymbolTable = aprsConfig.get('APRS', 'ALTSYMBOLTABLE')
-        altSymbol = aprsConfig.get('APRS', 'ALTSYMBOL')
-        comment = aprsConfig.get('APRS', 'COMMENT')
-        altComment = aprsConfig.get('APRS', 'ALTCOMMENT')
-
-        # Create nodes from GPS data
-        node = sourceCallsign + "-" + str(sourceID)
-        destNode = destinationCallsign + "-" + str(destinationID)
-
-        # Convert position to APRS-IS compliant string
-        latString,lonString = nmeaToDegDecMin(latitude,longitude)
-
-        # Convert altitude and speed to APRS compliant values
+    for station in stations:
         try:
-            rawaltitude = str(round(altitude, 0)).split('.')
-            rawspeed = str(round(speed, 0)).split('.')
+            positionString = formatter.position(station)
 
-        except TypeError as e:
+        except (TypeError, ValueError) as e:
             logger.error(e)
-            logger.error(altitude)
-            logger.error(speed)
+            logger.error(station["GPSALTITUDE"])
+            logger.error(station["GPSSPEED"])
 
         else:
-            altitude = rawaltitude[0].zfill(6)
-            speed = rawspeed[0].zfill(3)
+            # If GPSFix is not valid warn user
+            if station["GPSFIX"] <= 0:
+                logger.warning(formatter.nodes(station)[0] + " No GPS Fix")
 
+            logger.debug(positionString)
 
-            # If GPSFix is not valid warn user
-            if gpsFix <= 0:
-                logger.warning(node + " No GPS Fix")
-
-            if node != destNode:
-                # APRS string is for remote RF node
-                aprsPosition = dataTypeIdent +\
-                               latString +\
-                               latitudeDirection +\
-                               symbolTable +\
-                               lonString +\
-                               longitudeDir +\
-                               symbol
-                try:
-                    logger.info(aprsPosition)
-                except:
-                    pass
-
-                positionString = node +\
-                                 '>' +\
-                                 destAddress +\
-                                 ',' +\
-                                 qConstruct +\
-                                 ',' +\
-                                 destNode +\
-                                 ':' +\
-                                 aprsPosition +\
-                                 '.../' +\
-                                 speed +\
-                                 '/A=' +\
-                                 altitude +\
-                                 comment +\
-                                 '\r'
-
-                logger.debug(positionString)
-
-                try:
-                    socket.sendall(positionString)
-
-                except IOError as e:
-                    logger.error(e)
-
-            elif node == destNode:
-                # APRS string is for local node
-                aprsPosition = dataTypeIdent +\
-                               latString +\
-                               latitudeDirection +\
-                               altSymbolTable +\
-                               lonString +\
-                               longitudeDir +\
-                               altSymbol
-                positionString = node +\
-                                 ">" +\
-                                 destAddress +\
-                                 ':' +\
-                                 aprsPosition +\
-                                 '.../' +\
-                                 speed +\
-                                 '/A=' +\
-                                 altitude +\
-                                 altComment +\
-                                 '\r'
-                logger.debug(positionString)
-
-                try:
-                    socket.sendall(positionString)
-
-                except IOError as e:
-                    logger.error(e)
+            try:
+                socket.sendall(positionString)
+
+            except IOError as e:
+                logger.error(e)
 
 def sendtelemetry(stations, telemSequence, socket):
     """
@@ -293,564 +601,128 @@ def sendtelemetry(stations, telemSequence, socket):
 
     :param stations: List of dictionary organized station data
     :param telemSequence: Telemetry sequence number from 0 to 999, incrementing
-    :param socket: APRS-IS server internet socket
-    :return: None
+    :param socket: APRS-IS server internet socket or cycle TransmitBuffer
+    :return: Next telemetry sequence number
     """
 
+    # Get APRS line templates compiled at startup
+    formatter = aprsFormatter
 
-    for item in stations:
-        station = item[0]
-
-        # Get Station data from GPS data
-        sourceCallsign = station["SOURCECALLSIGN"]
-        sourceID = station["SOURCEID"]
-        destinationCallsign = station["DESTINATIONCALLSIGN"]
-        destinationID = station["DESTINATIONID"]
-        gpsFix = station["GPSFIX"]
-        gpioValues = station["GPIOSTATE"]
-        rfValues = station["RFSTATE"]
-
-        # Get APRS Telemetry configuration
-        qConstruct = aprsConfig.get('APRS', 'QCONSTRUCT')
-        destAddress = aprsConfig.get('APRS', 'DESTADDRESS')
-        ioSource = aprsConfig.get('APRS', 'IOSOURCE').upper()
-
-        # Extract IO data
-        if ioSource == 'GPIO':
-            ioList = bin(gpioValues)[2:].zfill(8)
-        elif ioSource == 'RF':
-            ioList = bin(rfValues)[2:].zfill(8)
-
-        # Create nodes from GPS data
-        node = sourceCallsign + "-" + str(sourceID)
-        destNode = destinationCallsign + "-" + str(destinationID)
-
-        if node != destNode:
-            # APRS string is for remote RF node
-            telemetry = node +\
-                        '>' +\
-                        destAddress +\
-                        ',' +\
-                        qConstruct +\
-                        ',' +\
-                        destNode +\
-                        ':T#' +\
-                        str(telemSequence).zfill(3) +\
-                        ',' +\
-                        str(station["ADC0"]/16).zfill(3) +\
-                        ',' +\
-                        str(station["ADC1"]/16).zfill(3) +\
-                        ',' +\
-                        str(station["ADC3"]/16).zfill(3) +\
-                        ',' +\
-                        str(station["ADC6"]/16).zfill(3) +\
-                        ',' +\
-                        str(station["BOARDTEMP"]/16).zfill(3) +\
-                        ',' +\
-                        ioList +\
-                        '\r'
-
-            logger.debug(telemetry)
+    for station in stations:
+        telemetry = formatter.telemetry(station, telemSequence)
 
-            try:
-                socket.sendall(telemetry)
+        logger.debug(telemetry)
 
-            except IOError as e:
-                    logger.error(e)
-
-        elif node == destNode:
-            # APRS string is for local node
-            telemetry = node +\
-                        '>' +\
-                        destAddress +\
-                        ':T#' +\
-                        str(telemSequence).zfill(3) +\
-                        ',' +\
-                        str(station["ADC0"]/16).zfill(3) +\
-                        ',' +\
-                        str(station["ADC1"]/16).zfill(3) +\
-                        ',' +\
-                        str(station["ADC3"]/16).zfill(3) +\
-                        ',' +\
-                        str(station["ADC6"]/16).zfill(3) +\
-                        ',' +\
-                        str(station["BOARDTEMP"]/16).zfill(3) +\
-                        ',' +\
-                        ioList +\
-                        '\r'
-
-            logger.debug(telemetry)
-
-            try:
-                socket.sendall(telemetry)
+        try:
+            socket.sendall(telemetry)
 
-            except IOError as e:
-                logger.error(e)
+        except IOError as e:
+            logger.error(e)
 
         # Check for telemetry sequence rollover
         if telemSequence >= 999:
             telemSequence = 0
         else:
             telemSequence += 1
-        # Return telemetrySequence to save count
-        return telemSequence
+
+    # Return telemetrySequence to save count
+    return telemSequence
 
 def sendTelemLabels(stations, socket):
     """
     Constructs an APRS unit/label string for each station and sends it to the socket
 
     :param stations: List of dictionary organized station data
-    :param socket: APRS-IS server internet socket
+    :param socket: APRS-IS server internet socket or cycle TransmitBuffer
     :return: None
     """
-
-    for item in stations:
-        station = item[0]
-
-        # Get Station data from GPS data
-        sourceCallsign = station["SOURCECALLSIGN"]
-        sourceID = station["SOURCEID"]
-        destinationCallsign = station["DESTINATIONCALLSIGN"]
-        destinationID = station["DESTINATIONID"]
-        gpsFix = station["GPSFIX"]
-
-
-        # Get APRS Telemetry configuration
-        qConstruct = aprsConfig.get('APRS', 'QCONSTRUCT')
-        destAddress = aprsConfig.get('APRS', 'DESTADDRESS')
-
-        # Get units and labels from configuration file
-        unit0 = aprsConfig.get('APRS', 'UNIT0')
-        unit1 = aprsConfig.get('APRS', 'UNIT1')
-        unit2 = aprsConfig.get('APRS', 'UNIT2')
-        unit3 = aprsConfig.get('APRS', 'UNIT3')
-        unit4 = aprsConfig.get('APRS', 'UNIT4')
-        bLabel0 = aprsConfig.get('APRS', 'BLABEL0')
-        bLabel1 = aprsConfig.get('APRS', 'BLABEL1')
-        bLabel2 = aprsConfig.get('APRS', 'BLABEL2')
-        bLabel3 = aprsConfig.get('APRS', 'BLABEL3')
-        bLabel4 = aprsConfig.get('APRS', 'BLABEL4')
-        bLabel5 = aprsConfig.get('APRS', 'BLABEL5')
-        bLabel6 = aprsConfig.get('APRS', 'BLABEL6')
-        bLabel7 = aprsConfig.get('APRS', 'BLABEL7')
-
-        # Create nodes from GPS data
-        node = sourceCallsign + "-" + str(sourceID)
-        destNode = destinationCallsign + "-" + str(destinationID)
-
-        if node != destNode:
-            # APRS string is for remote node
-            labels = node +\
-                     '>' +\
-                     destAddress +\
-                     ',' +\
-                     qConstruct +\
-                     ',' +\
-                     destNode +\
-                     '::' +\
-                     node +\
-                     ' :' +\
-                     "UNIT." +\
-                     str(unit0[:6]) +\
-                     ',' +\
-                     str(unit1[:6]) +\
-                     ',' +\
-                     str(unit2[:5]) +\
-                     ',' +\
-                     str(unit3[:5]) +\
-                     ',' +\
-                     str(unit4[:4]) +\
-                     ',' +\
-                     str(bLabel0[:5]) +\
-                     ',' +\
-                     str(bLabel1[:4]) +\
-                     ',' +\
-                     str(bLabel2[:3]) +\
-                     ',' +\
-                     str(bLabel3[:3]) +\
-                     ',' +\
-                     str(bLabel4[:3]) +\
-                     ',' +\
-                     str(bLabel5[:2]) +\
-                     ',' +\
-                     str(bLabel6[:2]) +\
-                     ',' +\
-                     str(bLabel7[:2]) +\
-                     '\r'
-            logger.debug(labels)
-
-            try:
-                socket.sendall(labels)
-
-            except IOError as e:
-                logger.error(e)
-
-        elif node == destNode:
-            # APRS string is for local node
-            labels = node +\
-                     '>' +\
-                     destAddress +\
-                     '::' +\
-                     node +\
-                     ' :' +\
-                     "UNIT." +\
-                     str(unit0[:6]) +\
-                     ',' +\
-                     str(unit1[:6]) +\
-                     ',' +\
-                     str(unit2[:5]) +\
-                     ',' +\
-                     str(unit3[:5]) +\
-                     ',' +\
-                     str(unit4[:4]) +\
-                     ',' +\
-                     str(bLabel0[:5]) +\
-                     ',' +\
-                     str(bLabel1[:4]) +\
-                     ',' +\
-                     str(bLabel2[:3]) +\
-                     ',' +\
-                     str(bLabel3[:3]) +\
-                     ',' +\
-                     str(bLabel4[:3]) +\
-                     ',' +\
-                     str(bLabel5[:2]) +\
-                     ',' +\
-                     str(bLabel6[:2]) +\
-                     ',' +\
-                     str(bLabel7[:2]) +\
-                     '\r'
-
-            logger.debug(labels)
-            try:
-                socket.sendall(labels)
-
-            except IOError as e:
-                logger.error(e)
+    sendMetadata(stations, socket, aprsFormatter.labels)
 
 def sendParameters(stations, socket):
     """
     Constructs an APRS parameters string for each station and sends it to the socket
 
     :param stations: List of dictionary organized station data
-    :param socket: APRS-IS server internet socket
-    :return:
-    """
-
-    for item in stations:
-        station = item[0]
-
-        # Get Station data from GPS data
-        sourceCallsign = station["SOURCECALLSIGN"]
-        sourceID = station["SOURCEID"]
-        destinationCallsign = station["DESTINATIONCALLSIGN"]
-        destinationID = station["DESTINATIONID"]
-        gpsFix = station["GPSFIX"]
-
-
-        # Get APRS Telemetry configuration
-        qConstruct = aprsConfig.get('APRS', 'QCONSTRUCT')
-        destAddress = aprsConfig.get('APRS', 'DESTADDRESS')
-
-        adc0 = aprsConfig.get('APRS', 'ADC0PARAM')
-        adc1 = aprsConfig.get('APRS', 'ADC1PARAM')
-        adc2 = aprsConfig.get('APRS', 'ADC2PARAM')
-        adc3 = aprsConfig.get('APRS', 'ADC3PARAM')
-        adc4 = aprsConfig.get('APRS', 'ADC4PARAM')
-        io0 = aprsConfig.get('APRS', 'IO0PARAM')
-        io1 = aprsConfig.get('APRS', 'IO1PARAM')
-        io2 = aprsConfig.get('APRS', 'IO2PARAM')
-        io3 = aprsConfig.get('APRS', 'IO3PARAM')
-        io4 = aprsConfig.get('APRS', 'IO4PARAM')
-        io5 = aprsConfig.get('APRS', 'IO5PARAM')
-        io6 = aprsConfig.get('APRS', 'IO6PARAM')
-        io7 = aprsConfig.get('APRS', 'IO7PARAM')
-
-        # Create nodes from GPS data
-        node = sourceCallsign + "-" + str(sourceID)
-        destNode = destinationCallsign + "-" + str(destinationID)
-
-        if node != destNode:
-            # APRS string is for remote node
-            parameters = node +\
-                         '>' +\
-                         destAddress +\
-                         ',' +\
-                         qConstruct +\
-                         ',' +\
-                         destNode +\
-                         '::' +\
-                         node +\
-                         ' :' +\
-                         "PARM." +\
-                         str(adc0[:6]) +\
-                         ',' +\
-                         str(adc1[:6]) +\
-                         ',' +\
-                         str(adc2[:5]) +\
-                         ',' +\
-                         str(adc3[:5]) +\
-                         ',' +\
-                         str(adc4[:4]) +\
-                         ',' +\
-                         str(io0[:5]) +\
-                         ',' +\
-                         str(io1[:4]) +\
-                         ',' +\
-                         str(io2[:3]) +\
-                         ',' +\
-                         str(io3[:3]) +\
-                         ',' +\
-                         str(io4[:3]) +\
-                         ',' +\
-                         str(io5[:2]) +\
-                         ',' +\
-                         str(io6[:2]) +\
-                         ',' +\
-                         str(io7[:2]) +\
-                         '\r'
-
-            logger.debug(parameters)
-            try:
-                socket.sendall(parameters)
-
-            except IOError as e:
-                logger.error(e)
-
-        elif node == destNode:
-            # APRS string is for local node
-            parameters = node +\
-                         '>' +\
-                         destAddress +\
-                         '::' +\
-                         node +\
-                         ' :' +\
-                         "PARM." +\
-                         str(adc0[:6]) +\
-                         ',' +\
-                         str(adc1[:6]) +\
-                         ',' +\
-                         str(adc2[:5]) +\
-                         ',' +\
-                         str(adc3[:5]) +\
-                         ',' +\
-                         str(adc4[:4]) +\
-                         ',' +\
-                         str(io0[:5]) +\
-                         ',' +\
-                         str(io1[:4]) +\
-                         ',' +\
-                         str(io2[:3]) +\
-                         ',' +\
-                         str(io3[:3]) +\
-                         ',' +\
-                         str(io4[:3]) +\
-                         ',' +\
-                         str(io5[:2]) +\
-                         ',' +\
-                         str(io6[:2]) +\
-                         ',' +\
-                         str(io7[:2]) +\
-                         '\r'
-
-            logger.debug(parameters)
-            try:
-                socket.sendall(parameters)
-
-            except IOError as e:
-                logger.error(e)
+    :param socket: APRS-IS server internet socket or cycle TransmitBuffer
+    :return: None
+    """
+    sendMetadata(stations, socket, aprsFormatter.parameters)
 
 def sendEquations(stations, socket):
     """
     Constructs an APRS equation string for each station and sends it to the socket
 
     :param stations: List of dictionary organized station data
-    :param socket: APRS-IS server internet socket
+    :param socket: APRS-IS server internet socket or cycle TransmitBuffer
     :return: None
     """
+    sendMetadata(stations, socket, aprsFormatter.equations)
 
-    for item in stations:
-        station = item[0]
-
-        # Get Station data from GPS data
-        sourceCallsign = station["SOURCECALLSIGN"]
-        sourceID = station["SOURCEID"]
-        destinationCallsign = station["DESTINATIONCALLSIGN"]
-        destinationID = station["DESTINATIONID"]
-        gpsFix = station["GPSFIX"]
-
-
-        # Get APRS Telemetry configuration
-        qConstruct = aprsConfig.get('APRS', 'QCONSTRUCT')
-        destAddress = aprsConfig.get('APRS', 'DESTADDRESS')
-
-        # Get equations from configuration file
-        eq0a = aprsConfig.get('APRS', 'EQ0A')
-        eq0b = aprsConfig.get('APRS', 'EQ0B')
-        eq0c = aprsConfig.get('APRS', 'EQ0C')
-        eq1a = aprsConfig.get('APRS', 'EQ1A')
-        eq1b = aprsConfig.get('APRS', 'EQ1B')
-        eq1c = aprsConfig.get('APRS', 'EQ1C')
-        eq2a = aprsConfig.get('APRS', 'EQ2A')
-        eq2b = aprsConfig.get('APRS', 'EQ2B')
-        eq2c = aprsConfig.get('APRS', 'EQ2C')
-        eq3a = aprsConfig.get('APRS', 'EQ3A')
-        eq3b = aprsConfig.get('APRS', 'EQ3B')
-        eq3c = aprsConfig.get('APRS', 'EQ3C')
-        eq4a = aprsConfig.get('APRS', 'EQ4A')
-        eq4b = aprsConfig.get('APRS', 'EQ4B')
-        eq4c = aprsConfig.get('APRS', 'EQ4C')
-
-        # Create nodes from GPS data
-        node = sourceCallsign + "-" + str(sourceID)
-        destNode = destinationCallsign + "-" + str(destinationID)
-
-        if node != destNode:
-            # APRS string is for remote node
-            equations = node +\
-                        '>' +\
-                        destAddress +\
-                        ',' +\
-                        qConstruct +\
-                        ',' +\
-                        destNode +\
-                        '::' +\
-                        node +\
-                        ' :' +\
-                        "EQNS." +\
-                        str(eq0a) +\
-                        ',' +\
-                        str(eq0b) +\
-                        ',' +\
-                        str(eq0c) +\
-                        ',' +\
-                        str(eq1a) +\
-                        ',' +\
-                        str(eq1b) +\
-                        ',' +\
-                        str(eq1c) +\
-                        ',' +\
-                        str(eq2a) +\
-                        ',' +\
-                        str(eq2b) +\
-                        ',' +\
-                        str(eq2c) +\
-                        ',' +\
-                        str(eq3a) +\
-                        ',' +\
-                        str(eq3b) +\
-                        ',' +\
-                        str(eq3c) +\
-                        ',' +\
-                        str(eq4a) +\
-                        ',' +\
-                        str(eq4b) +\
-                        ',' +\
-                        str(eq4c) +\
-                        '\r'
-
-            logger.debug(equations)
-            try:
-                socket.sendall(equations)
+def sendMetadata(stations, socket, formatLine):
+    """
+    Formats a telemetry metadata line for each station and sends it to the socket
 
-            except IOError as e:
-                logger.error(e)
+    :param stations: List of dictionary organized station data
+    :param socket: APRS-IS server internet socket or cycle TransmitBuffer
+    :param formatLine: AprsFormatter method returning the line of a station
+    :return: None
+    """
 
-        elif node == destNode:
-            # APRS string is for local node
-            equations = node +\
-                         '>' +\
-                         destAddress +\
-                         '::' +\
-                         node +\
-                         ' :' +\
-                         "EQNS." +\
-                         str(eq0a) +\
-                         ',' +\
-                         str(eq0b) +\
-                         ',' +\
-                         str(eq0c) +\
-                         ',' +\
-                         str(eq1a) +\
-                         ',' +\
-                         str(eq1b) +\
-                         ',' +\
-                         str(eq1c) +\
-                         ',' +\
-                         str(eq2a) +\
-                         ',' +\
-                         str(eq2b) +\
-                         ',' +\
-                         str(eq2c) +\
-                         ',' +\
-                         str(eq3a) +\
-                         ',' +\
-                         str(eq3b) +\
-                         ',' +\
-                         str(eq3c) +\
-                         ',' +\
-                         str(eq4a) +\
-                         ',' +\
-                         str(eq4b) +\
-                         ',' +\
-                         str(eq4c) +\
-                         '\r'
-
-            logger.debug(equations)
-            try:
-                socket.sendall(equations)
+    for station in stations:
+        line = formatLine(station)
 
-            except IOError as e:
-                logger.error(e)
+        logger.debug(line)
+        try:
+            socket.sendall(line)
+
+        except IOError as e:
+            logger.error(e)
 
 def connectAPRSIS():
     """
-    Connect to APRS-IS server with login credentials
+    Starts a background APRS-IS connection with login credentials
 
-    :return: APRS-IS socket connection
+    The connection is made, and remade whenever it is lost, by an
+    AprsIsClient thread. Data sent to it is queued so the APRS worker never
+    blocks on the network.
+
+    :return: Started AprsIsClient
     """
 
-    # Read APRS-IS login credentials from configuration file
-    callsign = aprsConfig.get('APRSIS', 'CALLSIGN').upper()
+    logger.info("Connecting to APRS-IS as: " + str(aprsSettings.callsign))
 
-    # APRS-IS passcode generator
-    passcode = generatePasscode(callsign)
+    client = aprsisclient.AprsIsClient(aprsIsLogon,
+                                       aprsSettings.queueSize,
+                                       aprsSettings.keepalive)
+    client.start()
+    return client
 
-    # Read APRS-IS server address from configuration file
-    server = aprsConfig.get("APRSIS", "SERVER")
-    port = aprsConfig.getint("APRSIS", "PORT")
+def aprsIsLogon():
+    """
+    Creates the APRS-IS server address and login string for a new connection
 
-    if passcode != None:
-        logger.info("Connecting to APRS-IS as: " + str(callsign))
-        logger.debug("Server: " + str(server) + ":" + str(port))
+    Called by AprsIsClient for every connection attempt so reloaded login
+    settings take effect on the next connection.
 
-        # Set socket up
-        aprssock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    :return: (server, port, logon string) or None if the callsign is invalid
+    """
 
-        # Infinite loop until connection is successful
-        while True:
-            try:
-                # Create login string and connect to server
-                logon_string = 'user' + ' ' + callsign + ' ' + 'pass' + ' ' + str(
-                    passcode) + ' vers "FaradayRF APRS-IS application" \r'
-                logger.debug(logon_string)
-                aprssock.connect((server, port))
-                aprssock.sendall(logon_string)
+    # Read APRS-IS login credentials from configuration file
+    settings = aprsSettings
+    callsign = settings.callsign
 
-            except IOError as e:
-                logger.error(e)
+    # APRS-IS passcode generator
+    passcode = generatePasscode(callsign)
 
-            else:
-                logger.info("Connection successful!")
-                return aprssock
-                break
+    if passcode == None:
+        return None
 
-            sleep(10)  # Try to reconnect every 10 seconds
-        return aprssock
-    else:
-        while(True):
-            logger.error("APRS-IS LOGIN ERROR!")
-            sleep(1)
+    # Create login string
+    logon_string = 'user' + ' ' + callsign + ' ' + 'pass' + ' ' + str(
+        passcode) + ' vers "FaradayRF APRS-IS application" \r'
+    logger.debug(logon_string)
+
+    return (settings.server, settings.port, logon_string)
 
 def generatePasscode(callsign):
     """
@@ -904,14 +776,24 @@ def main():
     """
 
     logger.info('Starting Faraday APRS-IS application')
-    sock = connectAPRSIS()
+    client = connectAPRSIS()
 
     # Initialize local variables
     threads = []
 
-    t = threading.Thread(target=aprs_worker, args=(aprsConfig, sock))
+    # Reload aprs.ini on SIGHUP where supported (not on Windows)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, reloadSettings)
+
+    t = threading.Thread(target=aprs_worker, args=(client,))
+    t.daemon = True
     threads.append(t)
     t.start()
 
+    # Python 2 only runs signal handlers while the main thread executes,
+    # join() with a timeout keeps it responsive
+    while t.is_alive():
+        t.join(1)
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,181 @@
+# /Applications/APRS/aprsformat.py
+# License: GPLv3
+
+"""
+Format APRS-IS position, telemetry and telemetry metadata lines of Faraday
+stations from precompiled templates.
+"""
+
+# Maximum lengths of the telemetry metadata fields per APRS Protocol Version
+# 1.0, five analog channels followed by eight binary channels
+ANALOG_LENGTHS = (6, 6, 5, 5, 4)
+BINARY_LENGTHS = (5, 4, 3, 3, 3, 2, 2, 2)
+
+# Telemetry field sent as the eight APRS binary channels for each IOSOURCE
+IO_FIELDS = {"GPIO": "GPIOSTATE", "RF": "RFSTATE"}
+
+
+def escape(text):
+    """Escapes a configuration string for use inside a str.format() template"""
+    return str(text).replace("{", "{{").replace("}", "}}")
+
+
+def metadataText(values, lengths):
+    """Joins truncated telemetry metadata fields with commas"""
+    return ",".join(str(value[:length])
+                    for value, length in zip(values, lengths))
+
+
+def nmeaMinutes(nmea, degreeDigits):
+    """
+    Splits a NMEA latitude or longitude string into degrees and minutes
+
+    Minutes are returned in integer hundredths rounded exactly like
+    round(float(minutes), 2) so the output matches the original APRS string
+    formatting.
+
+    :param nmea: NMEA latitude (DDMM.MMMM) or longitude (DDDMM.MMMM) string
+    :param degreeDigits: 2 for latitude, 3 for longitude
+    :return: (degrees string, whole minutes, hundredths of minutes)
+    """
+    hundredths = int(round(float(nmea[degreeDigits:]), 2) * 100 + 0.5)
+    minutes, hundredths = divmod(hundredths, 100)
+    return nmea[:degreeDigits], minutes, hundredths
+
+
+class AprsFormatter(object):
+    """
+    Formats APRS-IS lines of Faraday stations
+
+    All configuration (addresses, symbols, comments and telemetry metadata)
+    is compiled into str.format() templates once per AprsSettings snapshot so
+    every line is a single format call. Stations whose node differs from their
+    destination node were heard over RF and are sent via the destination node
+    with the QCONSTRUCT path, the local node is sent directly.
+    """
+
+    def __init__(self, settings):
+        """
+        :param settings: AprsSettings the templates are compiled from
+        """
+        self.settings = settings
+
+        # Header arguments {0} node and {1} destination node
+        remote = "{0}>" + escape(settings.destAddress) + "," +\
+            escape(settings.qConstruct) + ",{1}"
+        local = "{0}>" + escape(settings.destAddress)
+
+        # Position arguments {2} latitude degrees, {3} minutes, {4} hundredths,
+        # {5} direction, {6}-{9} longitude likewise, {10} speed, {11} altitude
+        self.remotePosition = remote + self.compilePosition(
+            settings.symbolTable, settings.symbol, settings.comment)
+        self.localPosition = local + self.compilePosition(
+            settings.altSymbolTable, settings.altSymbol, settings.altComment)
+
+        # Telemetry arguments {2} sequence, {3}-{7} analog, {8} binary values
+        telemetry = ":T#{2:03d},{3:03d},{4:03d},{5:03d},{6:03d},{7:03d}," +\
+            "{8:08b}\r"
+        self.remoteTelemetry = remote + telemetry
+        self.localTelemetry = local + telemetry
+
+        # Metadata is constant apart from the node it is addressed to
+        units = "UNIT." + metadataText(settings.units, ANALOG_LENGTHS) + "," +\
+            metadataText(settings.bitLabels, BINARY_LENGTHS)
+        parameters = "PARM." +\
+            metadataText(settings.adcParameters, ANALOG_LENGTHS) + "," +\
+            metadataText(settings.ioParameters, BINARY_LENGTHS)
+        equations = "EQNS." + ",".join(str(value)
+                                       for value in settings.equations)
+        self.remoteLabels = remote + "::{0} :" + escape(units) + "\r"
+        self.localLabels = local + "::{0} :" + escape(units) + "\r"
+        self.remoteParameters = remote + "::{0} :" + escape(parameters) + "\r"
+        self.localParameters = local + "::{0} :" + escape(parameters) + "\r"
+        self.remoteEquations = remote + "::{0} :" + escape(equations) + "\r"
+        self.localEquations = local + "::{0} :" + escape(equations) + "\r"
+
+        # Telemetry field of the eight APRS binary channels
+        self.ioField = IO_FIELDS[settings.ioSource]
+
+    def compilePosition(self, symbolTable, symbol, comment):
+        """Returns the position template after the header for a symbol"""
+        return ":" + escape(self.settings.dataTypeIdent) +\
+            "{2}{3:02d}.{4:02d}{5}" + escape(symbolTable) +\
+            "{6}{7:02d}.{8:02d}{9}" + escape(symbol) +\
+            ".../{10:03d}/A={11:06d}" + escape(comment) + "\r"
+
+    def nodes(self, station):
+        """Returns the node and destination node names of a station"""
+        node = station["SOURCECALLSIGN"] + "-" + str(station["SOURCEID"])
+        destNode = station["DESTINATIONCALLSIGN"] + "-" +\
+            str(station["DESTINATIONID"])
+        return node, destNode
+
+    def position(self, station):
+        """
+        Formats the APRS position line of a station
+
+        :param station: Dictionary organized station data
+        :return: APRS-IS line string
+        :raises TypeError, ValueError: Invalid GPS data
+        """
+        node, destNode = self.nodes(station)
+        latDeg, latMin, latHun = nmeaMinutes(station["GPSLATITUDE"], 2)
+        lonDeg, lonMin, lonHun = nmeaMinutes(station["GPSLONGITUDE"], 3)
+        speed = int(round(station["GPSSPEED"], 0))
+        altitude = int(round(station["GPSALTITUDE"], 0))
+
+        if node != destNode:
+            template = self.remotePosition
+        else:
+            template = self.localPosition
+        return template.format(node, destNode,
+                               latDeg, latMin, latHun,
+                               station["GPSLATITUDEDIR"],
+                               lonDeg, lonMin, lonHun,
+                               station["GPSLONGITUDEDIR"],
+                               speed, altitude)
+
+    def telemetry(self, station, sequence):
+        """
+        Formats the APRS telemetry line of a station
+
+        Analog channels are the integer ADC values divided by 16, the binary
+        channels are the IOSOURCE state bits.
+
+        :param station: Dictionary organized station data
+        :param sequence: Telemetry sequence number from 0 to 999
+        :return: APRS-IS line string
+        """
+        node, destNode = self.nodes(station)
+        if node != destNode:
+            template = self.remoteTelemetry
+        else:
+            template = self.localTelemetry
+        return template.format(node, destNode, sequence,
+                               station["ADC0"] / 16,
+                               station["ADC1"] / 16,
+                               station["ADC3"] / 16,
+                               station["ADC6"] / 16,
+                               station["BOARDTEMP"] / 16,
+                               station[self.ioField])
+
+    def labels(self, station):
+        """Formats the APRS telemetry unit/label line of a station"""
+        node, destNode = self.nodes(station)
+        if node != destNode:
+            return self.remoteLabels.format(node, destNode)
+        return self.localLabels.format(node, destNode)
+
+    def parameters(self, station):
+        """Formats the APRS telemetry parameter name line of a station"""
+        node, destNode = self.nodes(station)
+        if node != destNode:
+            return self.remoteParameters.format(node, destNode)
+        return self.localParameters.format(node, destNode)
+
+    def equations(self, station):
+        """Formats the APRS telemetry equation line of a station"""
+        node, destNode = self.nodes(station)
+        if node != destNode:
+            return self.remoteEquations.format(node, destNode)
+        return self.localEquations.format(node, destNode)
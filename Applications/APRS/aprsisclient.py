@@ -0,0 +1,177 @@
+# /Applications/APRS/aprsisclient.py
+# License: GPLv3
+
+"""
+Background APRS-IS connection with an outbound queue which reconnects with
+backoff so the APRS worker never blocks.
+"""
+
+import logging
+import select
+import socket
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger('APRS')
+
+# Seconds between reconnection attempts, doubled after every failure
+RECONNECT_MIN = 1
+RECONNECT_MAX = 60
+
+# Seconds to wait for a connection or a blocked write before reconnecting
+SOCKET_TIMEOUT = 30
+
+# Seconds between checks of the connection while nothing is queued
+POLL_INTERVAL = 0.5
+
+
+class AprsIsClient(threading.Thread):
+    """
+    Manages an APRS-IS server connection in a background thread
+
+    sendall() only queues data so callers never block on the network. Up to
+    queueSize items are queued while disconnected, the oldest are dropped
+    when full. The connection is considered lost when the server closes it or
+    sends nothing (APRS-IS servers send a "#" keepalive line about every 20
+    seconds) for keepalive seconds. It is then reopened with exponential
+    backoff and queued data is sent once connected again.
+    """
+
+    def __init__(self, logon, queueSize=1000, keepalive=120):
+        """
+        :param logon: Function returning (server, port, logon string) for each
+            connection attempt, or None when the login is invalid
+        :param queueSize: Maximum number of queued items
+        :param keepalive: Seconds without data from the server before
+            reconnecting
+        """
+        threading.Thread.__init__(self, name="AprsIsClient")
+        self.daemon = True
+
+        self.logon = logon
+        self.keepalive = keepalive
+        self.queue = deque(maxlen=queueSize)
+        self.condition = threading.Condition()
+        self.running = True
+        self.sock = None
+
+        # Item taken from the queue but not completely sent yet
+        self.pending = None
+
+        self.connected = False
+        self.sent = 0
+        self.dropped = 0
+        self.reconnects = 0
+
+    def sendall(self, data):
+        """
+        Queues data to send to APRS-IS, drops the oldest item if the queue is
+        full. Drop-in replacement for socket.sendall() which never blocks.
+
+        :param data: String to send
+        :return: None
+        """
+        with self.condition:
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1
+            self.queue.append(data)
+            self.condition.notify()
+
+    def stop(self):
+        """Stops the thread and closes the connection"""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+    def stats(self):
+        """Returns a dictionary of connection and queue statistics"""
+        with self.condition:
+            return {"connected": self.connected,
+                    "queued": len(self.queue),
+                    "sent": self.sent,
+                    "dropped": self.dropped,
+                    "reconnects": self.reconnects}
+
+    def run(self):
+        """Connects and sends queued data until stop() is called"""
+        delay = RECONNECT_MIN
+        while self.running:
+            try:
+                self.connect()
+
+            except (IOError, ValueError) as e:
+                logger.error("APRS-IS connection failed: " + str(e))
+
+            else:
+                delay = RECONNECT_MIN
+                try:
+                    self.transmit()
+
+                except IOError as e:
+                    logger.error("APRS-IS connection lost: " + str(e))
+
+            self.disconnect()
+            if not self.running:
+                break
+
+            # Wait before reconnecting unless stopped meanwhile
+            logger.info("Reconnecting to APRS-IS in %d seconds", delay)
+            with self.condition:
+                if self.running:
+                    self.condition.wait(delay)
+            delay = min(delay * 2, RECONNECT_MAX)
+            self.reconnects += 1
+
+    def connect(self):
+        """Opens a new connection to the server and logs in"""
+        logon = self.logon()
+        if logon is None:
+            raise ValueError("APRS-IS LOGIN ERROR!")
+        server, port, logonString = logon
+
+        logger.debug("Server: " + str(server) + ":" + str(port))
+        self.sock = socket.create_connection((server, port), SOCKET_TIMEOUT)
+        self.sock.sendall(logonString)
+        self.lastHeard = time.time()
+        self.connected = True
+        logger.info("Connection successful!")
+
+    def disconnect(self):
+        """Closes the current connection, if any"""
+        self.connected = False
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except IOError:
+                pass
+            self.sock = None
+
+    def transmit(self):
+        """Sends queued data and checks the connection until it is lost"""
+        while self.running:
+            if self.pending is None:
+                with self.condition:
+                    if not self.queue and self.running:
+                        self.condition.wait(POLL_INTERVAL)
+                    if self.queue:
+                        self.pending = self.queue.popleft()
+
+            # Detect a lost connection before writing so data is not lost
+            self.receive()
+
+            if self.pending is not None:
+                self.sock.sendall(self.pending)
+                self.pending = None
+                self.sent += 1
+
+    def receive(self):
+        """Reads and discards server data, raises IOError if it went quiet"""
+        now = time.time()
+        while select.select([self.sock], [], [], 0)[0]:
+            if not self.sock.recv(4096):
+                raise IOError("Connection closed by server")
+            self.lastHeard = now
+
+        if now - self.lastHeard > self.keepalive:
+            raise IOError("No keepalive in {0} seconds".format(self.keepalive))
@@ -0,0 +1,248 @@
+# /Applications/APRS/aprsisserver.py
+# License: GPLv3
+
+"""
+Local stand-in for an APRS-IS server which records and validates received lines
+so the APRS application can be tested and benchmarked without the real APRS-IS
+network.
+"""
+
+import argparse
+import re
+import socket
+import threading
+import time
+
+# Login line sent by connectAPRSIS()
+LOGIN = re.compile(r'^user (\S+) pass (-?\d+)(?: vers (.*))?$')
+
+# TNC2 monitor format packet: source>destination[,path]:information
+PACKET = re.compile(r'^[A-Z0-9]{1,6}(?:-[A-Z0-9]{1,2})?>[A-Z0-9-]{1,9}'
+                    r'(?:,[A-Za-z0-9*-]{1,9})*:.+$')
+
+# Seconds between "#" keepalive lines, like real APRS-IS servers
+KEEPALIVE_INTERVAL = 20
+
+
+def passcode(callsign):
+    """
+    Returns the APRS-IS passcode of a callsign, same hash as
+    aprs.generatePasscode() without the SSID
+
+    :param callsign: Callsign string
+    :return: Passcode Integer
+    """
+    callsign = callsign.split("-")[0].upper()
+    callhash = 0x73e2
+    for i in range(0, len(callsign), 2):
+        callhash ^= ord(callsign[i]) << 8
+        if i + 1 < len(callsign):
+            callhash ^= ord(callsign[i + 1])
+    return callhash & 0x7fff
+
+
+class AprsIsServer(threading.Thread):
+    """
+    Minimal APRS-IS server accepting connections on a local TCP port
+
+    Every connection must start with a valid login line. All following lines
+    are recorded, lines that are not valid APRS packets are also recorded as
+    invalid. latency delays reading every received chunk, simulating a slow
+    server or link, and disconnectAfter closes each connection after that
+    many lines to exercise client reconnection.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0,
+                 disconnectAfter=None, record=True):
+        """
+        :param host: Address to listen on
+        :param port: TCP port to listen on, 0 picks a free port
+        :param latency: Seconds to wait before reading each received chunk
+        :param disconnectAfter: Close connections after this many lines, None
+            never closes them
+        :param record: If False only count lines instead of keeping them
+        """
+        threading.Thread.__init__(self, name="AprsIsServer")
+        self.daemon = True
+
+        self.latency = latency
+        self.disconnectAfter = disconnectAfter
+        self.record = record
+
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen(5)
+        self.host, self.port = self.listener.getsockname()
+
+        self.lock = threading.Lock()
+        self.connections = []
+        self.lines = []
+        self.invalid = []
+        self.logins = []
+        self.lineCount = 0
+        self.byteCount = 0
+        self.connectionCount = 0
+        self.disconnects = 0
+
+    def run(self):
+        """Accepts connections, each handled by its own thread"""
+        while True:
+            try:
+                conn, address = self.listener.accept()
+            except socket.error:
+                break
+
+            with self.lock:
+                self.connections.append(conn)
+                self.connectionCount += 1
+            t = threading.Thread(target=self.handle, args=(conn,))
+            t.daemon = True
+            t.start()
+
+    def handle(self, conn):
+        """Receives lines of a connection until either side closes it"""
+        conn.sendall("# FaradayRF APRS-IS stand-in\r\n")
+        lastKeepalive = time.time()
+        conn.settimeout(1)
+        buf = ""
+        loggedIn = False
+        received = 0
+        try:
+            while True:
+                if time.time() - lastKeepalive >= KEEPALIVE_INTERVAL:
+                    conn.sendall("# keepalive\r\n")
+                    lastKeepalive = time.time()
+
+                if self.latency:
+                    time.sleep(self.latency)
+                try:
+                    data = conn.recv(65536)
+                except socket.timeout:
+                    continue
+                if not data:
+                    break
+
+                buf += data
+                lines = re.split("[\r\n]+", buf)
+                buf = lines.pop()
+                for line in lines:
+                    if not line:
+                        continue
+                    if not loggedIn:
+                        loggedIn = self.login(conn, line)
+                        if not loggedIn:
+                            return
+                        continue
+
+                    self.receive(line)
+                    received += 1
+                    if self.disconnectAfter is not None and\
+                            received >= self.disconnectAfter:
+                        with self.lock:
+                            self.disconnects += 1
+                        return
+
+        except socket.error:
+            pass
+
+        finally:
+            conn.close()
+            with self.lock:
+                if conn in self.connections:
+                    self.connections.remove(conn)
+
+    def login(self, conn, line):
+        """Validates a login line, returns True if the passcode is correct"""
+        match = LOGIN.match(line.strip())
+        if match is None or int(match.group(2)) != passcode(match.group(1)):
+            conn.sendall("# logresp unverified, login refused\r\n")
+            with self.lock:
+                self.invalid.append(line)
+            return False
+
+        conn.sendall("# logresp {0} verified, server STANDIN\r\n"
+                     .format(match.group(1)))
+        with self.lock:
+            self.logins.append(match.group(1))
+        return True
+
+    def receive(self, line):
+        """Records a received line and validates it"""
+        with self.lock:
+            self.lineCount += 1
+            self.byteCount += len(line) + 1
+            if self.record:
+                self.lines.append(line)
+            if PACKET.match(line) is None:
+                self.invalid.append(line)
+
+    def disconnectAll(self):
+        """Closes all current client connections"""
+        with self.lock:
+            self.disconnects += len(self.connections)
+        self.closeConnections()
+
+    def closeConnections(self):
+        """Shuts down all current client connections"""
+        with self.lock:
+            connections = list(self.connections)
+        for conn in connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+    def stop(self):
+        """Stops accepting connections and closes current ones"""
+        self.listener.close()
+        self.closeConnections()
+
+    def stats(self):
+        """Returns a dictionary of received line and connection counts"""
+        with self.lock:
+            return {"connections": self.connectionCount,
+                    "logins": len(self.logins),
+                    "lines": self.lineCount,
+                    "bytes": self.byteCount,
+                    "invalid": len(self.invalid),
+                    "disconnects": self.disconnects}
+
+
+def main():
+    """Runs the stand-in server printing every received line"""
+    parser = argparse.ArgumentParser(
+        description="Local APRS-IS stand-in server for testing Faraday APRS")
+    parser.add_argument("--host", default="127.0.0.1", help="Listen address")
+    parser.add_argument("--port", type=int, default=14580, help="TCP port")
+    parser.add_argument("--latency", type=float, default=0,
+                        help="Seconds to delay reading each received chunk")
+    parser.add_argument("--disconnect", type=int, default=None,
+                        help="Close connections after this many lines")
+    args = parser.parse_args()
+
+    server = AprsIsServer(args.host, args.port, args.latency, args.disconnect)
+    server.start()
+    print "APRS-IS stand-in listening on {0}:{1}".format(server.host,
+                                                         server.port)
+
+    printed = 0
+    invalid = 0
+    try:
+        while True:
+            time.sleep(1)
+            with server.lock:
+                lines = server.lines[printed:]
+                bad = server.invalid[invalid:]
+                printed += len(lines)
+                invalid += len(bad)
+            for line in lines:
+                print line
+            for line in bad:
+                print "INVALID:", line
+    except KeyboardInterrupt:
+        server.stop()
+        print server.stats()
+
+if __name__ == '__main__':
+    main()
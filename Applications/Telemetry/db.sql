@@ -1,5 +1,5 @@
 BEGIN TRANSACTION;
-CREATE TABLE "TELEMETRY" (
+CREATE TABLE IF NOT EXISTS "TELEMETRY" (
 	`KEYID`	INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
 	`SOURCECALLSIGN`	TEXT DEFAULT NULL,
 	`SOURCEID`	INTEGER DEFAULT NULL,
@@ -38,4 +38,16 @@ CREATE TABLE "TELEMETRY" (
 	`HABTIMER`	INTEGER DEFAULT NULL,
 	`EPOCH`	INTEGER DEFAULT NULL
 );
+CREATE TABLE IF NOT EXISTS "ROLLUP" (
+	`SOURCECALLSIGN`	TEXT NOT NULL,
+	`SOURCEID`	INTEGER NOT NULL,
+	`FIELD`	TEXT NOT NULL,
+	`RESOLUTION`	INTEGER NOT NULL,
+	`BUCKET`	INTEGER NOT NULL,
+	`MIN`	REAL DEFAULT NULL,
+	`MAX`	REAL DEFAULT NULL,
+	`SUM`	REAL NOT NULL DEFAULT 0,
+	`COUNT`	INTEGER NOT NULL DEFAULT 0,
+	PRIMARY KEY(SOURCECALLSIGN, SOURCEID, FIELD, RESOLUTION, BUCKET)
+);
 COMMIT;
@@ -0,0 +1,161 @@
+# /Applications/Telemetry/querycache.py
+# License: GPLv3
+
+"""
+In-process cache of telemetry query results invalidated by station whenever new
+telemetry is written to the database.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# SQL LIKE wildcards, a parameter containing these may match any station
+LIKE_WILDCARDS = ("%", "_")
+
+
+def makeKey(name, parameters, *args):
+    """
+    Creates a hashable cache key from a query name and its parameters
+
+    :param name: Name of the query, i.e. "telemetry" or "stations"
+    :param parameters: Query parameters dictionary
+    :param args: Any other arguments changing the result (i.e. columnar)
+    :return: Tuple usable as a dictionary key
+    """
+    return (name, tuple(sorted(parameters.items()))) + args
+
+
+def stationTag(callsign, nodeid):
+    """
+    Returns the station a query is limited to, None if it may match any
+
+    :param callsign: Callsign query parameter, SQL LIKE wildcards allowed
+    :param nodeid: Node ID query parameter, SQL LIKE wildcards allowed
+    :return: (callsign, nodeid) tuple or None
+    """
+    callsign = str(callsign).upper()
+    nodeid = str(nodeid)
+    for wildcard in LIKE_WILDCARDS:
+        if wildcard in callsign or wildcard in nodeid:
+            return None
+    return (callsign, nodeid)
+
+
+class QueryCache(object):
+    """
+    LRU cache of query results with a time to live
+
+    Every entry is tagged with the station its query is limited to, or None
+    when the query may match any station. invalidate() drops entries of a
+    station, and all untagged entries, once new telemetry of it is written.
+    Entries still expire after ttl seconds since timespan queries are
+    relative to the current time.
+    """
+
+    def __init__(self, maxEntries=256, ttl=5.0):
+        """
+        :param maxEntries: Maximum number of cached results
+        :param ttl: Seconds before a cached result expires
+        """
+        self.maxEntries = maxEntries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.tags = {}
+        self.lock = threading.Lock()
+
+        # Incremented by invalidate() so results queried before an insert
+        # that finish after it are not cached
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def fetch(self, key, tag, function, *args):
+        """
+        Returns the cached result of key, otherwise calls and caches function
+
+        function must raise when its query fails, the exception is passed on
+        to the caller and nothing is cached.
+
+        :param key: Cache key from makeKey()
+        :param tag: Station tag from stationTag()
+        :param function: Function returning the result when not cached
+        :param args: Arguments of function
+        :return: Result of function(*args)
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires, entryTag, result = entry
+                if expires > time.time():
+                    # Hit, move to the most recently used end
+                    del self.entries[key]
+                    self.entries[key] = entry
+                    self.hits += 1
+                    return result
+                self.remove(key)
+                self.expirations += 1
+            self.misses += 1
+            generation = self.generation
+
+        # Query without holding the lock so other requests are not blocked
+        result = function(*args)
+
+        with self.lock:
+            if generation == self.generation and self.maxEntries > 0:
+                if key in self.entries:
+                    self.remove(key)
+                self.entries[key] = (time.time() + self.ttl, tag, result)
+                self.tags.setdefault(tag, set()).add(key)
+                while len(self.entries) > self.maxEntries:
+                    self.remove(next(iter(self.entries)))
+                    self.evictions += 1
+
+        return result
+
+    def remove(self, key):
+        """Removes key from the cache, the lock must be held by the caller"""
+        expires, tag, result = self.entries.pop(key)
+        keys = self.tags[tag]
+        keys.discard(key)
+        if not keys:
+            del self.tags[tag]
+
+    def invalidate(self, stations):
+        """
+        Drops cached results which may include telemetry of stations
+
+        :param stations: Iterable of (callsign, nodeid) written to the database
+        """
+        with self.lock:
+            self.generation += 1
+            for tag in set(stationTag(*station) for station in stations) |\
+                    set([None]):
+                for key in list(self.tags.get(tag, ())):
+                    self.remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        """Drops all cached results"""
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.tags.clear()
+
+    def stats(self):
+        """Returns a dictionary of cache statistics"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self.entries),
+                    "maxentries": self.maxEntries,
+                    "ttl": self.ttl,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "hitratio": float(self.hits) / lookups if lookups else 0.0,
+                    "invalidations": self.invalidations,
+                    "expirations": self.expirations,
+                    "evictions": self.evictions}
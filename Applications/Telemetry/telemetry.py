@@ -14,13 +14,19 @@ import logging
 import logging.config
 import threading
 import ConfigParser
+import Queue
 from collections import deque
+from collections import OrderedDict
 import os
 import sys
 import sqlite3
+import struct
 import json
+import operator
+import tempfile
 
 from flask import Flask
+from flask import Response
 from flask import request
 
 # Can we clean this up?
@@ -28,6 +34,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "../../Faraday_Proxy_Too
 from FaradayIO import faradaybasicproxyio
 from FaradayIO import telemetryparser
 
+import querycache
+import telemetryexport
+
 # Start logging after importing modules
 logging.config.fileConfig('loggingConfig.ini')
 logger = logging.getLogger('telemetry')
@@ -37,9 +46,132 @@ logger = logging.getLogger('telemetry')
 telemetryConfig = ConfigParser.RawConfigParser()
 telemetryConfig.read('telemetry.ini')
 
-# Create and initialize dictionary queues
+# Create and initialize queues of TelemetryRecord's for each station
 telemetryDicts = {}
 
+# Default maximum parsed telemetry packets waiting to be inserted and
+# inserted at once
+INGEST_QUEUE_SIZE = 10000
+BATCH_SIZE = 100
+
+# Default seconds between polls of a unit with telemetry and of an idle unit
+POLL_MIN = 0.1
+POLL_MAX = 1.0
+
+# Parsed telemetry from all poll_worker threads waiting to be inserted, full
+# queue blocks the pollers until the database writer catches up
+ingestQueueSize = INGEST_QUEUE_SIZE
+if telemetryConfig.has_option("TELEMETRY", "INGESTQUEUE"):
+    ingestQueueSize = telemetryConfig.getint("TELEMETRY", "INGESTQUEUE")
+ingestQueue = Queue.Queue(ingestQueueSize)
+
+# Default datagram checksum verification and number of rejected datagrams kept
+VERIFY_CHECKSUM = False
+QUARANTINE_SIZE = 100
+
+# Datagram checksum verification counters and recently rejected datagrams
+integrityLock = threading.Lock()
+integrityCounts = {"verified": 0, "rejected": 0}
+quarantineSize = QUARANTINE_SIZE
+if telemetryConfig.has_option("TELEMETRY", "QUARANTINE"):
+    quarantineSize = telemetryConfig.getint("TELEMETRY", "QUARANTINE")
+quarantine = deque([], maxlen=quarantineSize)
+
+# Datagram PacketType of standard telemetry (packet #3)
+TELEMETRY_PACKET_TYPE = 3
+
+# Rows fetched from SQLite per chunk of a streamed response
+STREAM_CHUNK_ROWS = 500
+
+# Default rollup fields and bucket sizes (seconds) without a [ROLLUP] section
+ROLLUP_FIELDS = "ADC0,ADC1,ADC2,ADC3,ADC4,ADC5,VCC,BOARDTEMP,ADC8,GPSALTITUDE"
+ROLLUP_RESOLUTIONS = "60,3600"
+
+# Default query cache size and TTL (seconds) without a [CACHE] section
+CACHE_ENTRIES = 256
+CACHE_TTL = 5
+
+
+def loadRollupFields(config):
+    """
+    Returns an OrderedDict of the [ROLLUP] FIELDS to roll up, mapping each
+    configured name to its TelemetryRecord attribute
+
+    TELEMETRY column names are accepted for renamed attributes (ADC6 is VCC).
+    Fields which are not telemetry are logged and skipped so they can never
+    break saving telemetry.
+    """
+    fields = ROLLUP_FIELDS
+    if config.has_option("ROLLUP", "FIELDS"):
+        fields = config.get("ROLLUP", "FIELDS")
+
+    attributes = dict((column, field) for field, column in
+                      telemetryexport.COLUMN_ALIASES.iteritems())
+    rollup = OrderedDict()
+    for field in fields.split(","):
+        field = field.strip().upper()
+        attribute = attributes.get(field, field)
+        if attribute in telemetryparser.TelemetryRecord._fields:
+            rollup[field] = attribute
+        elif field:
+            logger.error("[ROLLUP] FIELDS '{0}' is not a telemetry field, "
+                         "not rolled up".format(field))
+    return rollup
+
+
+def loadRollupResolutions(config):
+    """
+    Returns the list of [ROLLUP] RESOLUTIONS bucket sizes in seconds
+
+    Resolutions which are not a positive number of seconds are logged and
+    skipped.
+    """
+    resolutions = ROLLUP_RESOLUTIONS
+    if config.has_option("ROLLUP", "RESOLUTIONS"):
+        resolutions = config.get("ROLLUP", "RESOLUTIONS")
+
+    rollup = []
+    for resolution in resolutions.split(","):
+        resolution = resolution.strip()
+        try:
+            seconds = int(resolution)
+        except ValueError:
+            seconds = 0
+        if seconds > 0:
+            rollup.append(seconds)
+        elif resolution:
+            logger.error("[ROLLUP] RESOLUTIONS '{0}' is not a positive number "
+                         "of seconds, not rolled up".format(resolution))
+    return rollup
+
+
+def createQueryCache(config):
+    """Creates the query result cache from the [CACHE] section"""
+    entries = CACHE_ENTRIES
+    ttl = CACHE_TTL
+    if config.has_section("CACHE"):
+        if config.has_option("CACHE", "ENTRIES"):
+            entries = config.getint("CACHE", "ENTRIES")
+        if config.has_option("CACHE", "TTL"):
+            ttl = config.getfloat("CACHE", "TTL")
+    return querycache.QueryCache(entries, ttl)
+
+# Telemetry fields and bucket sizes (seconds) kept as min/max/avg rollups
+rollupFields = loadRollupFields(telemetryConfig)
+rollupResolutions = loadRollupResolutions(telemetryConfig)
+
+# TelemetryRecord fields saved in the TELEMETRY table in record order, the
+# itemgetter pulls them out of a record in one call without building a dict
+unsavedFields = ("SOURCECALLSIGNLEN", "DESTINATIONCALLSIGNLEN", "IOSTATE")
+savedFields = [field for field in telemetryparser.TelemetryRecord._fields
+               if field not in unsavedFields]
+telemetryValues = operator.itemgetter(
+    *[telemetryparser.TelemetryRecord._fields.index(field)
+      for field in savedFields])
+
+# Cache of query results, invalidated per station by sqlInsertMany()
+queryCache = createQueryCache(telemetryConfig)
+
 
 def telemetry_worker(config):
     """
@@ -48,11 +180,63 @@ def telemetry_worker(config):
     This function interfaces the Proxy application via its RESTful interface.
     It is a one-way operation as it makes no sense to POST data to proxy for
     telemetry to a specific unit with this application.
+
+    A poll_worker thread is started for every configured unit so all units
+    are polled concurrently. This thread then becomes the single database
+    writer, inserting everything the pollers parsed in batches.
     """
     logger.info('Starting telemetry_worker thread')
 
-    # initialize variables
-    stations = {}
+    # Pragmatically create descriptors for each Faraday connected to Proxy
+    count = config.getint("TELEMETRY", "UNITS")
+    batchSize = BATCH_SIZE
+    if config.has_option("TELEMETRY", "BATCHSIZE"):
+        batchSize = config.getint("TELEMETRY", "BATCHSIZE")
+
+    for num in range(count):
+        callsign = config.get("TELEMETRY", "UNIT" + str(num) + "CALL").upper()
+        nodeid = config.get("TELEMETRY", "UNIT" + str(num) + "ID")
+        telemetryDicts[str(callsign) + str(nodeid)] = deque([], maxlen=1000)
+
+        t = threading.Thread(target=poll_worker,
+                             args=(config, callsign, nodeid))
+        t.daemon = True
+        t.start()
+
+    # Insert parsed telemetry from all units, blocking until data arrives
+    while(1):
+        batch = [ingestQueue.get()]
+        while len(batch) < batchSize:
+            try:
+                batch.append(ingestQueue.get_nowait())
+            except Queue.Empty:
+                break
+
+        # A failure must never stop the only database writer. If a batch
+        # fails insert its rows one by one so only the bad rows are lost
+        try:
+            rows = [parsedTelemetry for station, parsedTelemetry in batch]
+            if not sqlInsertMany(rows) and len(rows) > 1:
+                for row in rows:
+                    sqlInsertMany([row])
+
+            for station, parsedTelemetry in batch:
+                telemetryDicts[station].append(parsedTelemetry)
+
+        except StandardError as e:
+            logger.exception("Telemetry insert failed: " + str(e))
+
+def poll_worker(config, callsign, nodeid):
+    """
+    Polls Proxy for telemetry of a single unit and parses it
+
+    Parsed telemetry is placed into ingestQueue for telemetry_worker to write
+    to the database. Polling is adaptive: a unit returning data is polled
+    again after POLLMIN seconds while an idle unit backs off, doubling the
+    interval up to POLLMAX seconds. When VERIFYCHECKSUM is set datagrams
+    failing their checksum are quarantined instead of parsed.
+    """
+    logger.info('Starting poll_worker thread for %s-%s', callsign, nodeid)
 
     # Initialize proxy object
     proxy = faradaybasicproxyio.proxyio()
@@ -60,51 +244,78 @@ def telemetry_worker(config):
     # Initialize Faraday parser
     faradayParser = telemetryparser.TelemetryParse()  # Add logger?
 
-    # Open configuration file
-    dbFilename = config.get("DATABASE", "FILENAME")
+    pollMin = POLL_MIN
+    if config.has_option("TELEMETRY", "POLLMIN"):
+        pollMin = config.getfloat("TELEMETRY", "POLLMIN")
+    pollMax = POLL_MAX
+    if config.has_option("TELEMETRY", "POLLMAX"):
+        pollMax = config.getfloat("TELEMETRY", "POLLMAX")
+    verifyChecksum = VERIFY_CHECKSUM
+    if config.has_option("TELEMETRY", "VERIFYCHECKSUM"):
+        verifyChecksum = config.getboolean("TELEMETRY", "VERIFYCHECKSUM")
+    interval = pollMin
+    station = str(callsign) + str(nodeid)
+
+    # check for data on telemetry port, if True place into ingest queue
+    while(1):
+        data = proxy.GET(str(callsign), str(nodeid), int(proxy.TELEMETRY_PORT))
+
+        # Iterate through each packet and unpack into dictionary
+        if data != None:
+            for item in data:
+                try:
+                    # Decode BASE64 JSON data packet into
+                    unPackedItem = proxy.DecodeRawPacket(item["data"])
+                    # Keep corrupted datagrams out of the database
+                    if verifyChecksum:
+                        if not faradayParser.VerifyDatagram(unPackedItem):
+                            quarantineDatagram(station, item["data"])
+                            continue
+                        countIntegrity("verified")
+                    # Unpack datagram and dispatch on its packet type, telemetry
+                    # packets are returned as a compact TelemetryRecord
+                    packetType, parsedTelemetry = faradayParser.Parse(unPackedItem)
+
+                except ValueError as e:
+                    logger.error("ValueError: " + str(e))
+                except IndexError as e:
+                    logger.error("IndexError: " + str(e))
+                except KeyError as e:
+                    logger.error("KeyError: " + str(e))
+                except struct.error as e:
+                    logger.error("struct.error: " + str(e))
+
+                else:
+                    # Only standard telemetry (packet #3) is saved, settings and
+                    # debug packets requested by other applications are skipped
+                    if packetType == TELEMETRY_PACKET_TYPE:
+                        ingestQueue.put((station, parsedTelemetry))
+
+            interval = pollMin
+        else:
+            # Nothing waiting in Proxy, back off
+            interval = min(interval * 2, pollMax)
 
-    # Pragmatically create descriptors for each Faraday connected to Proxy
-    count = config.getint("TELEMETRY", "UNITS")
+        time.sleep(interval)
 
-    for num in range(count):
-        callsign = config.get("TELEMETRY", "UNIT" + str(num) + "CALL").upper()
-        nodeid = config.get("TELEMETRY", "UNIT" + str(num) + "ID")
-        stations["UNIT" + str(num) + "CALL"] = callsign
-        stations["UNIT" + str(num) + "ID"] = nodeid
-        telemetryDicts[str(callsign) + str(nodeid)] = deque([], maxlen=1000)
+def countIntegrity(counter):
+    """Increments a datagram checksum verification counter"""
+    with integrityLock:
+        integrityCounts[counter] += 1
 
-    # check for data on telemetry port, if True place into deque
-    while(1):
-         for radio in range(count):
-            callsign = stations["UNIT" + str(num) + "CALL"]
-            nodeid = stations["UNIT" + str(num) + "ID"]
-            data = proxy.GET(str(callsign), str(nodeid), int(proxy.TELEMETRY_PORT))
-
-            # Iterate through each packet and unpack into dictionary
-            if data != None:
-                for item in data:
-                    try:
-                        # Decode BASE64 JSON data packet into
-                        unPackedItem = proxy.DecodeRawPacket(item["data"])
-                        # Unpack packet into datagram elements
-                        datagram = faradayParser.UnpackDatagram(unPackedItem,False)
-                        # Extract the payload length from payload since padding could be used
-                        telemetryData = faradayParser.ExtractPaddedPacket(datagram["PayloadData"],faradayParser.packet_3_len)
-                        # Unpack payload and return a dictionary of telemetry, return tuple and dictionary
-                        parsedTelemetry = faradayParser.UnpackPacket_3(telemetryData, False)
-
-                    except ValueError as e:
-                        logger.error("ValueError: " + str(e))
-                    except IndexError as e:
-                        logger.error("IndexError: " + str(e))
-                    except KeyError as e:
-                        logger.error("KeyError: " + str(e))
-
-                    else:
-                        sqlInsert(parsedTelemetry)
-                        telemetryDicts[str(callsign) + str(nodeid)].append(parsedTelemetry)
-
-         time.sleep(1) # should slow down
+def quarantineDatagram(station, data):
+    """
+    Counts and saves a telemetry datagram which failed checksum verification
+
+    :param station: Station key (callsign + nodeid) the datagram came from
+    :param data: BASE64 datagram as received from Proxy
+    """
+    logger.warning("Datagram from %s failed checksum verification", station)
+    with integrityLock:
+        integrityCounts["rejected"] += 1
+        quarantine.append({"STATION": station,
+                           "EPOCH": time.time(),
+                           "DATA": data})
 
 # Initialize Flask microframework
 app = Flask(__name__)
@@ -117,6 +328,10 @@ def dbTelemetry():
     Serves JSON responses to the "/" URL containing output of SQLite queries.
     Specific SQLite queries can return data from specified ranges and source
     stations as
+
+    Large queries should use the "stream" parameter ("json" or "ndjson") to
+    stream results from the cursor and "after" (a KEYID) to page through
+    history with bounded memory on both ends.
     """
 
     try:
@@ -128,6 +343,9 @@ def dbTelemetry():
         endTime = request.args.get("endtime", None)
         timespan = request.args.get("timespan", 5*60)
         limit = request.args.get("limit")
+        after = request.args.get("after")
+        streamFormat = request.args.get("stream")
+        shape = request.args.get("shape", "rows")
 
         nodeid = str(nodeid)
         direction = int(direction)
@@ -135,6 +353,16 @@ def dbTelemetry():
         timespan = int(timespan)
         if limit != None:
             limit = int(limit)
+        if after != None:
+            after = int(after)
+        if streamFormat != None:
+            streamFormat = str(streamFormat).lower()
+            if streamFormat not in ("json", "ndjson"):
+                raise ValueError(
+                    "Stream format '{0}' is invalid".format(streamFormat))
+        shape = str(shape).lower()
+        if shape not in ("rows", "columnar"):
+            raise ValueError("Shape '{0}' is invalid".format(shape))
 
     except ValueError as e:
         logger.error("ValueError: " + str(e))
@@ -160,16 +388,30 @@ def dbTelemetry():
     parameters["ENDTIME"] = endTime
     parameters["TIMESPAN"] = timespan
     parameters["LIMIT"] = limit
-
-    data = []
-    data = queryDb(parameters)
+    parameters["AFTER"] = after
+
+    # Streamed responses are written chunk by chunk straight from the cursor
+    if streamFormat != None:
+        try:
+            stream = streamDb(parameters, streamFormat)
+        except (sqlite3.Error, ValueError) as e:
+            return json.dumps({"error": str(e)}), 500
+        if streamFormat == "json":
+            return Response(stream, mimetype='application/json')
+        return Response(stream, mimetype='application/x-ndjson')
+
+    columnar = shape == "columnar"
+    try:
+        data = queryDb(parameters, columnar)
+    except (sqlite3.Error, ValueError) as e:
+        return json.dumps({"error": str(e)}), 500
 
     # Check if data returned, if not, return HTTP 204
-    if len(data) <= 0:
+    if len(data["rows"] if columnar else data) <= 0:
         logger.info("No station data in last %d seconds", timespan)
         return '', 204  # HTTP 204 response cannot have message data
 
-    return json.dumps(data, indent=1), 200,\
+    return dumpJson(data), 200,\
             {'Content-Type': 'application/json'}
 
 @app.route('/raw', methods=['GET'])
@@ -271,7 +513,7 @@ def rawTelemetry():
                             # Hit the limit, break out of the while loop early
                             break
                         # Append packet to stationData list
-                        stationData.append(packet)
+                        stationData.append(packet.to_dict())
                     # All necessary data from radio obtained, add to dictionary
                     station[key] = stationData
             # The data list is a list of dictionaries for json.dumps()
@@ -288,7 +530,7 @@ def rawTelemetry():
                     packet = \
                         telemetryDicts[
                             str(callsign) + str(nodeId)].pop()
-                    stationData.append(packet)
+                    stationData.append(packet.to_dict())
                     station[str(callsign) + str(nodeId)] = stationData
                     if len(stationData) >= limit:
                         # Hit the limit, break from loop
@@ -310,7 +552,7 @@ def rawTelemetry():
         return json.dumps({"error": str(e)}), 400
 
     # Completed our query for "/raw", return json.dumos() and HTTP 200
-    return json.dumps(data, indent=1), 200,\
+    return dumpJson(data), 200,\
             {'Content-Type': 'application/json'}
 
 @app.route('/stations', methods=['GET'])
@@ -332,9 +574,13 @@ def stations():
         endTime = request.args.get("endtime", None)
         callsign = request.args.get("callsign", "%").upper()
         nodeId = request.args.get("nodeid", "%")
+        shape = request.args.get("shape", "rows")
 
         # Timespan will allways be an integer
         timespan = int(timespan)
+        shape = str(shape).lower()
+        if shape not in ("rows", "columnar"):
+            raise ValueError("Shape '{0}' is invalid".format(shape))
 
     except ValueError as e:
         logger.error("ValueError: " + str(e))
@@ -358,15 +604,258 @@ def stations():
     parameters["NODEID"] = nodeId
 
     # Provide parameters to queryStationsDb to return the result SQLite rows
-    data = queryStationsDb(parameters)
+    columnar = shape == "columnar"
+    try:
+        data = queryStationsDb(parameters, columnar)
+    except (sqlite3.Error, ValueError) as e:
+        return json.dumps({"error": str(e)}), 500
 
     # Check if no stations returned, if not, return HTTP 204
-    if len(data) <= 0:
+    if len(data["rows"] if columnar else data) <= 0:
         logger.info("Station(s) not heard in last %d seconds", timespan)
         return '', 204  # HTTP 204 response cannot have message data
 
     # Completed the /stations request, return data json.dumps() and HTTP 200
-    return json.dumps(data, indent=1), 200,\
+    return dumpJson(data), 200,\
+            {'Content-Type': 'application/json'}
+
+@app.route('/latest', methods=['GET'])
+def latest():
+    """
+    Provides a RESTful interface to the latest telemetry at URL '/latest'
+
+    This function, latest(), runs whenever "/latest" URL is queried. It
+    returns the most recent telemetry item of every station heard in the
+    timespan or range, defaulting to the last 5 minutes. Applications such as
+    APRS get all active stations in a single request instead of querying
+    "/stations" and then "/" once per station.
+    """
+
+    try:
+        # Obtain URL parameters
+        timespan = request.args.get("timespan", 5*60)
+        startTime = request.args.get("starttime", None)
+        endTime = request.args.get("endtime", None)
+        callsign = request.args.get("callsign", "%").upper()
+        nodeId = request.args.get("nodeid", "%")
+        shape = request.args.get("shape", "rows")
+
+        # Timespan will allways be an integer
+        timespan = int(timespan)
+        shape = str(shape).lower()
+        if shape not in ("rows", "columnar"):
+            raise ValueError("Shape '{0}' is invalid".format(shape))
+
+    except ValueError as e:
+        logger.error("ValueError: " + str(e))
+        return json.dumps({"error": str(e)}), 400
+    except StandardError as e:
+        logger.error("StandardError: " + str(e))
+        return json.dumps({"error": str(e)}), 400
+
+    # Validate timespan
+    if timespan <= 0:
+        message = "Error: Timespan '{0}' is invalid".format(timespan)
+        return json.dumps({"error": message}), 400
+
+    # Clear parameters dictionary and add URL parameters to it
+    parameters = {}
+    parameters["TIMESPAN"] = timespan
+    parameters["STARTTIME"] = startTime
+    parameters["ENDTIME"] = endTime
+    parameters["CALLSIGN"] = callsign
+    parameters["NODEID"] = nodeId
+
+    columnar = shape == "columnar"
+    try:
+        data = queryLatestDb(parameters, columnar)
+    except (sqlite3.Error, ValueError) as e:
+        return json.dumps({"error": str(e)}), 500
+
+    # Check if no stations returned, if not, return HTTP 204
+    if len(data["rows"] if columnar else data) <= 0:
+        logger.info("Station(s) not heard in last %d seconds", timespan)
+        return '', 204  # HTTP 204 response cannot have message data
+
+    return dumpJson(data), 200,\
+            {'Content-Type': 'application/json'}
+
+@app.route('/rollup', methods=['GET'])
+def rollup():
+    """
+    Provides a RESTful interface to downsampled telemetry at URL '/rollup'
+
+    Serves the per-station min/max/avg/count rollups kept by sqlInsert() for
+    a single telemetry field at one of the configured resolutions. Long
+    timespans return one item per bucket instead of every telemetry row.
+    """
+
+    try:
+        # Obtain URL parameters
+        field = request.args.get("field", None)
+        resolution = request.args.get("resolution", None)
+        callsign = request.args.get("callsign", "%")
+        nodeid = request.args.get("nodeid", "%")
+        startTime = request.args.get("starttime", None)
+        endTime = request.args.get("endtime", None)
+        timespan = request.args.get("timespan", 24*60*60)
+
+        if field is None:
+            raise StandardError("Missing 'field' parameter")
+        if not rollupResolutions:
+            raise ValueError("No [ROLLUP] RESOLUTIONS are rolled up")
+        if resolution is None:
+            resolution = rollupResolutions[0]
+
+        field = str(field).upper()
+        resolution = int(resolution)
+        callsign = str(callsign).upper()
+        nodeid = str(nodeid)
+        timespan = int(timespan)
+
+        if field not in rollupFields:
+            raise ValueError("Field '{0}' is not rolled up".format(field))
+        if resolution not in rollupResolutions:
+            raise ValueError(
+                "Resolution '{0}' is not rolled up".format(resolution))
+
+    except ValueError as e:
+        logger.error("ValueError: " + str(e))
+        return json.dumps({"error": str(e)}), 400
+    except StandardError as e:
+        logger.error("StandardError: " + str(e))
+        return json.dumps({"error": str(e)}), 400
+
+    # Validate timespan
+    if timespan <= 0:
+        message = "Error: Timespan '{0}' is invalid".format(timespan)
+        return json.dumps({"error": message}), 400
+
+    # Create dictionary of parameters for SQLite3
+    parameters = {}
+    parameters["FIELD"] = field
+    parameters["RESOLUTION"] = resolution
+    parameters["CALLSIGN"] = callsign
+    parameters["NODEID"] = nodeid
+    parameters["STARTTIME"] = startTime
+    parameters["ENDTIME"] = endTime
+    parameters["TIMESPAN"] = timespan
+
+    try:
+        data = queryRollupDb(parameters)
+    except (sqlite3.Error, ValueError) as e:
+        return json.dumps({"error": str(e)}), 500
+
+    # Check if data returned, if not, return HTTP 204
+    if len(data) <= 0:
+        logger.info("No %s rollup data in last %d seconds", field, timespan)
+        return '', 204  # HTTP 204 response cannot have message data
+
+    return dumpJson(data), 200,\
+            {'Content-Type': 'application/json'}
+
+@app.route('/export', methods=['GET'])
+def export():
+    """
+    Provides a columnar file export of telemetry history at URL '/export'
+
+    Exports the selected columns of a station and time range straight from
+    SQLite into a NumPy .npz, Arrow or Parquet file using telemetryexport.
+    The file is built in chunks and streamed back so memory use stays flat
+    regardless of how much history is requested.
+    """
+
+    try:
+        # Obtain URL parameters
+        callsign = request.args.get("callsign", "%")
+        nodeid = request.args.get("nodeid", "%")
+        startTime = request.args.get("starttime", None)
+        endTime = request.args.get("endtime", None)
+        timespan = request.args.get("timespan", 5*60)
+        columns = request.args.get("columns", None)
+        fileFormat = request.args.get("format", "npz")
+
+        callsign = str(callsign).upper()
+        nodeid = str(nodeid)
+        timespan = int(timespan)
+        fileFormat = str(fileFormat).lower()
+        if columns is not None:
+            columns = str(columns).split(",")
+
+        # Validate timespan
+        if timespan <= 0:
+            raise ValueError("Timespan '{0}' is invalid".format(timespan))
+
+        parameters = {}
+        parameters["STARTTIME"] = startTime
+        parameters["ENDTIME"] = endTime
+        parameters["TIMESPAN"] = timespan
+        startEpoch, endEpoch = generateStartStopTimes(parameters)
+
+        # Export into a temporary file which is removed once streamed
+        dbFilename = telemetryConfig.get("DATABASE", "FILENAME")
+        fd, filename = tempfile.mkstemp(suffix="." + fileFormat)
+        os.close(fd)
+        try:
+            count = telemetryexport.exportTelemetry(dbFilename, filename,
+                                                    columns, callsign, nodeid,
+                                                    startEpoch, endEpoch,
+                                                    fileFormat)
+        except:
+            os.remove(filename)
+            raise
+
+    except ValueError as e:
+        logger.error("ValueError: " + str(e))
+        return json.dumps({"error": str(e)}), 400
+    except sqlite3.Error as e:
+        logger.error("sqlite3.Error: " + str(e))
+        return json.dumps({"error": str(e)}), 500
+
+    logger.info("Exporting %d telemetry rows as %s", count, fileFormat)
+
+    def streamFile():
+        try:
+            with open(filename, "rb") as f:
+                while True:
+                    chunk = f.read(64*1024)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.remove(filename)
+
+    headers = {"Content-Disposition":
+               "attachment; filename=telemetry." + fileFormat,
+               "Content-Length": str(os.path.getsize(filename))}
+    return Response(streamFile(), mimetype="application/octet-stream",
+                    headers=headers)
+
+@app.route('/cache', methods=['GET'])
+def cache():
+    """
+    Provides query result cache statistics at URL '/cache'
+
+    Returns the number of cached results and the hit, miss, invalidation,
+    expiration and eviction counts of queryCache since Telemetry started.
+    """
+    return dumpJson(queryCache.stats()), 200,\
+            {'Content-Type': 'application/json'}
+
+@app.route('/integrity', methods=['GET'])
+def integrity():
+    """
+    Provides datagram checksum verification results at URL '/integrity'
+
+    Returns the number of datagrams which passed and failed checksum
+    verification since Telemetry started along with the most recent failed
+    datagrams (newest first) so they can be inspected.
+    """
+    with integrityLock:
+        data = dict(integrityCounts)
+        data["quarantine"] = list(reversed(quarantine))
+
+    return dumpJson(data), 200,\
             {'Content-Type': 'application/json'}
 
 @app.errorhandler(404)
@@ -384,88 +873,77 @@ def initDB():
     dbFilename = telemetryConfig.get("DATABASE", "FILENAME")
     dbSchema = telemetryConfig.get("DATABASE", "SCHEMANAME")
 
-    # Check if database exists
-    if os.path.isfile(dbFilename):
-        pass
-    else:
-        # Open database schema SQL file and execute the SQL functions inside
-        # after connecting. Close the database when complete.
-        with open(dbSchema, 'rt') as f:
-            conn = sqlite3.connect(dbFilename)
-            cur = conn.cursor()
-            schema = f.read()
-            cur.executescript(schema)
-        conn.close()
+    # Open database schema SQL file and execute the SQL functions inside
+    # after connecting. Every table is created "IF NOT EXISTS" so this also
+    # adds new tables (i.e. ROLLUP) to an existing database file. Close the
+    # database when complete.
+    with open(dbSchema, 'rt') as f:
+        conn = sqlite3.connect(dbFilename)
+        cur = conn.cursor()
+        schema = f.read()
+        cur.executescript(schema)
+    conn.close()
 
 def createTelemetryList(data):
-    """Converts data dictionary into a defined list for insertion into SQLite db"""
-
-    # Create list of dictionary data in appropriate order
-    # First statement in None for KeyID
-    temp = [None,
-            data["SOURCECALLSIGN"],
-            data["SOURCEID"],
-            data["DESTINATIONCALLSIGN"],
-            data["DESTINATIONID"],
-            data["RTCSEC"],
-            data["RTCMIN"],
-            data["RTCHOUR"],
-            data["RTCDAY"],
-            data["RTCDOW"],
-            data["RTCMONTH"],
-            data["RTCYEAR"],
-            data["GPSLATITUDE"],
-            data["GPSLATITUDEDIR"],
-            data["GPSLONGITUDE"],
-            data["GPSLONGITUDEDIR"],
-            data["GPSALTITUDE"],
-            data["GPSALTITUDEUNITS"],
-            data["GPSSPEED"],
-            data["GPSFIX"],
-            data["GPSHDOP"],
-            data["GPIOSTATE"],
-            data["RFSTATE"],
-            data["ADC0"],
-            data["ADC1"],
-            data["ADC2"],
-            data["ADC3"],
-            data["ADC4"],
-            data["ADC5"],
-            data["VCC"],
-            data["BOARDTEMP"],
-            data["ADC8"],
-            data["HABTIMERSTATE"],
-            data["HABCUTDOWNSTATE"],
-            data["HABTRIGGERTIME"],
-            data["HABTIMER"],
-            data["EPOCH"]
-            ]
-
-    return temp
+    """Converts a TelemetryRecord into a tuple of TELEMETRY table values"""
+    return telemetryValues(data)
 
 
 def sqlInsert(data):
-    """Takes in a data tuple and inserts int into the telemetry SQLite table"""
+    """Takes in a TelemetryRecord and inserts it into the telemetry SQLite table"""
+    return sqlInsertMany([data])
+
+def sqlInsertMany(dataList):
+    """
+    Inserts a list of TelemetryRecord's into the telemetry SQLite table
+
+    All rows are written in a single transaction which is much cheaper than
+    a transaction per telemetry packet. Their rollups follow in a second
+    transaction so a rollup error can never lose the telemetry rows.
+
+    Returns True if the telemetry rows were inserted, False on error.
+    """
 
     # Read in name of telemetry databse
     db = telemetryConfig.get("DATABASE", "FILENAME")
 
-    telem = createTelemetryList(data)
-
-    # Create parameter substitute "?" string for SQL query then create SQL
-    numKeys = len(telem)
-    paramSubs = "?" * (numKeys)
+    # Create parameter substitute "?" string for SQL query then create SQL,
+    # KEYID is assigned by SQLite and VCC is stored in the ADC6 column
+    columns = [telemetryexport.COLUMN_ALIASES.get(field, field)
+               for field in savedFields]
+    paramSubs = "?" * (len(columns))
     paramSubs = ",".join(paramSubs)
-    sql = "INSERT INTO TELEMETRY VALUES(" + paramSubs + ")"
+    sql = "INSERT INTO TELEMETRY (" + ", ".join(columns) + ") " +\
+          "VALUES(" + paramSubs + ")"
 
     # Connect to database, create SQL query, execute query, and close database
+    conn = None
+    inserted = False
     try:
+        telem = [createTelemetryList(data) for data in dataList]
         conn = sqlite3.connect(db)
         cursor = conn.cursor()
 
         # Use connection as context manager to rollback automatically if error
         with conn:
-            conn.execute(sql,telem)
+            conn.executemany(sql,telem)
+        inserted = True
+
+        # Committed, drop cached results of source and destination stations
+        # once their rollups are committed too so no query between the two
+        # transactions caches outdated rollups
+        stations = set()
+        for data in dataList:
+            stations.add((data.SOURCECALLSIGN, data.SOURCEID))
+            stations.add((data.DESTINATIONCALLSIGN, data.DESTINATIONID))
+
+        try:
+            with conn:
+                updateRollups(conn, dataList)
+        except (ValueError, AttributeError, sqlite3.Error) as e:
+            logger.error("Rollup update failed: " + str(e))
+        finally:
+            queryCache.invalidate(stations)
 
     except ValueError as e:
         logger.error("ValueError: " + str(e))
@@ -473,20 +951,98 @@ def sqlInsert(data):
         logger.error("IndexError: " + str(e))
     except KeyError as e:
         logger.error("KeyError: " + str(e))
+    except AttributeError as e:
+        logger.error("AttributeError: " + str(e))
     except sqlite3.OperationalError as e:
         # TODO: cleanup
         logger.error(e)
         initDB()
+    except sqlite3.Error as e:
+        # i.e. IntegrityError or unsupported value types
+        logger.error("sqlite3.Error: " + str(e))
 
     # Completed, close database
-    conn.close()
+    if conn is not None:
+        conn.close()
+    return inserted
 
-def queryDb(parameters):
+def updateRollups(conn, dataList):
     """
-    Takes in parameters to query the SQLite database, returns the results
+    Folds a list of TelemetryRecord's into the ROLLUP table buckets
 
-    Performs a SQL query to retrieve data from specific times, stations, or
-    ranges of time. Returns all results as a list of JSON dictionaries
+    Each configured field is added to the min/max/sum/count of the bucket it
+    falls in for every configured resolution. Called in its own transaction
+    after the telemetry insert committed.
+    """
+    # Create a row of parameters for each packet, field and resolution
+    buckets = []
+    values = []
+    for data in dataList:
+        callsign = data.SOURCECALLSIGN
+        nodeid = data.SOURCEID
+        epoch = int(data.EPOCH)
+
+        for field, attribute in rollupFields.iteritems():
+            try:
+                value = float(getattr(data, attribute))
+            except (ValueError, TypeError):
+                # Field not numeric in this packet (i.e. no GPS altitude)
+                continue
+
+            for resolution in rollupResolutions:
+                bucket = epoch - (epoch % resolution)
+                key = (callsign, nodeid, field, resolution, bucket)
+                buckets.append(key + (value, value))
+                values.append((value, value, value) + key)
+
+    # Create any missing buckets, then fold the values into them
+    sqlBucket = "INSERT OR IGNORE INTO ROLLUP " +\
+                "(SOURCECALLSIGN, SOURCEID, FIELD, RESOLUTION, BUCKET, MIN, MAX) " +\
+                "VALUES(?,?,?,?,?,?,?)"
+    sqlUpdate = "UPDATE ROLLUP SET MIN = min(MIN, ?), MAX = max(MAX, ?), " +\
+                "SUM = SUM + ?, COUNT = COUNT + 1 " +\
+                "WHERE SOURCECALLSIGN = ? AND SOURCEID = ? AND FIELD = ? " +\
+                "AND RESOLUTION = ? AND BUCKET = ?"
+    conn.executemany(sqlBucket, buckets)
+    conn.executemany(sqlUpdate, values)
+
+def queryRollupDb(parameters):
+    """
+    Takes in parameters to query the ROLLUP table, returns the results
+
+    Performs a SQL query to retrieve the rollup buckets of one field at one
+    resolution for specific stations and ranges of time. Returns all results
+    as a list of JSON dictionaries ordered by bucket time. Results are cached
+    like queryDb().
+    """
+    # Use supplied parameters to generate a Tuple of epoch start/stop times,
+    # buckets partially overlapping the time range are included
+    timeTuple = generateStartStopTimes(parameters)
+
+    sql = "SELECT SOURCECALLSIGN, SOURCEID, FIELD, RESOLUTION, BUCKET, " +\
+          "MIN, MAX, SUM / COUNT AS AVG, COUNT FROM ROLLUP " +\
+          "WHERE FIELD = ? AND RESOLUTION = ? " +\
+          "AND SOURCECALLSIGN LIKE ? AND SOURCEID LIKE ? " +\
+          "AND BUCKET + RESOLUTION > ? AND BUCKET <= ? " +\
+          "ORDER BY SOURCECALLSIGN, SOURCEID, BUCKET"
+    paramTuple = (parameters["FIELD"],
+                  parameters["RESOLUTION"],
+                  parameters["CALLSIGN"],
+                  parameters["NODEID"]) + timeTuple
+
+    key = querycache.makeKey("rollup", parameters)
+    tag = querycache.stationTag(parameters["CALLSIGN"], parameters["NODEID"])
+
+    # Completed query, return list of dictionary data for JSON
+    return queryCache.fetch(key, tag, queryFormattedRows, sql, paramTuple)
+
+def createTelemetryQuery(parameters):
+    """
+    Takes in parameters for a telemetry query, returns the SQL and parameters
+
+    Builds the SQL query string and SQLite3 parameter tuple shared by
+    queryDb() and streamDb(). Rows are ordered newest first, when an "AFTER"
+    KEYID is supplied only rows older than it are returned (keyset paging).
     """
     # Use supplied parameters to generate a Tuple of epoch start/stop times
     # SQLite3 parameters need to be Tuples
@@ -494,6 +1050,7 @@ def queryDb(parameters):
     callsign = parameters["CALLSIGN"].upper()
     nodeid = parameters["NODEID"]
     limit = parameters["LIMIT"]
+    after = parameters.get("AFTER")
 
     # Detect the direction, this will change the query from searching for
     # the source or destination radio. Must generate two slightly different
@@ -510,63 +1067,176 @@ def queryDb(parameters):
     sqlBeg = "SELECT * FROM TELEMETRY "
     sqlEpoch ="AND EPOCH BETWEEN ? AND ? "
     sqlEnd = "ORDER BY KEYID DESC"
+    paramTuple = (callsign, nodeid) + timeTuple
+    if after != None:
+        sqlEpoch = sqlEpoch + "AND KEYID < ? "
+        paramTuple = paramTuple + (after,)
     if limit != None:
         sqlEnd = sqlEnd + " LIMIT ?"
-        paramTuple = (callsign, nodeid) + timeTuple + (limit,)
-    else:
-        paramTuple = (callsign, nodeid) + timeTuple
+        paramTuple = paramTuple + (limit,)
 
     # Create  SQL Query string
     sql = sqlBeg + sqlWhereCall + sqlWhereID + sqlEpoch + sqlEnd
 
+    return sql, paramTuple
+
+def streamDb(parameters, streamFormat):
+    """
+    Takes in parameters to query the SQLite database, returns a generator
+    yielding the results
+
+    Streaming version of queryDb(). The query is executed before returning
+    so a failed query raises here and can still be answered with an error
+    status. The generator then iterates the cursor in chunks and yields
+    compact JSON text as it goes, so neither the server nor the client has
+    to hold the full result. streamFormat "json" yields a single JSON list
+    while "ndjson" yields one JSON dictionary per line.
+    """
+    sql, paramTuple = createTelemetryQuery(parameters)
+
     # Open configuration file
     dbFilename = telemetryConfig.get("DATABASE", "FILENAME")
 
-    # Connect to database, create SQL query, execute query, and close database
+    conn = sqlite3.connect(dbFilename)
+    try:
+        cur = conn.cursor()
+        cur.execute(sql, paramTuple)
+        columns = [description[0] for description in cur.description]
+
+    except (sqlite3.Error, ValueError) as e:
+        logger.error("Telemetry stream query failed: " + str(e))
+        conn.close()
+        raise
+
+    return streamRows(conn, cur, columns, streamFormat)
+
+def streamRows(conn, cur, columns, streamFormat):
+    """
+    Yields the rows of an executed streamDb() query as compact JSON text
+
+    An error after streaming started can no longer change the HTTP status.
+    The stream then ends with a final {"error": ...} item, which closes the
+    JSON list or is the last NDJSON line, so the result is always valid and
+    the failure visible to the client.
+    """
+    separator = "["
+    try:
+        while True:
+            rows = cur.fetchmany(STREAM_CHUNK_ROWS)
+            if not rows:
+                break
+            if streamFormat == "json":
+                chunk = []
+                for row in rows:
+                    chunk.append(separator)
+                    chunk.append(dumpJson(dict(zip(columns, row))))
+                    separator = ","
+                yield "".join(chunk)
+            else:
+                yield "".join([dumpJson(dict(zip(columns, row))) + "\n"
+                               for row in rows])
+
+    except sqlite3.Error as e:
+        logger.error("sqlite3.Error: " + str(e))
+        error = dumpJson({"error": str(e)})
+        if streamFormat == "json":
+            yield separator + error
+            separator = ","
+        else:
+            yield error + "\n"
+
+    finally:
+        # Completed query or client disconnected, close database
+        conn.close()
+
+    if streamFormat == "json":
+        # Empty results are still a valid JSON list
+        if separator == "[":
+            yield "["
+        yield "]"
+
+def queryRows(sql, paramTuple):
+    """
+    Executes a SQL query on the telemetry database, returns columns and rows
+
+    Rows are returned as plain tuples with the column name list computed once
+    per query from the cursor description instead of per row. Errors are
+    logged and raised so a failed query is never cached as an empty result.
+    """
+    # Open configuration file
+    dbFilename = telemetryConfig.get("DATABASE", "FILENAME")
+
+    # Connect to database, execute query, and close database
+    conn = sqlite3.connect(dbFilename)
     try:
-        conn = sqlite3.connect(dbFilename)
-        conn.row_factory = sqlite3.Row  # Row_factory returns column/values
         cur = conn.cursor()
         cur.execute(sql,paramTuple)
+        columns = [description[0] for description in cur.description]
         rows = cur.fetchall()
 
+    except sqlite3.Error as e:
+        logger.error("sqlite3.Error: " + str(e))
+        raise
     except ValueError as e:
         logger.error("ValueError: " + str(e))
-    except IndexError as e:
-        logger.error("IndexError: " + str(e))
-    except KeyError as e:
-        logger.error("KeyError: " + str(e))
+        raise
 
+    finally:
+        # Completed query, close database
+        conn.close()
 
-    # Iterate through resulting data and create a list of dictionaries for JSON
-    try:
-        sqlData = []
-        for row in rows:
-            rowData = {}
-            for parameter in row.keys():
-                rowData[parameter] = row[parameter]
-            sqlData.append(rowData)
+    return columns, rows
 
-    except StandardError as e:
-        logger.error("StandardError: " + str(e))
-    except ValueError as e:
-        logger.error("ValueError: " + str(e))
-    except IndexError as e:
-        logger.error("IndexError: " + str(e))
-    except KeyError as e:
-        logger.error("KeyError: " + str(e))
+def formatRows(columns, rows, columnar=False):
+    """
+    Converts query columns and tuple rows into a JSON serializable result
 
-    # Completed query, close database, return sqlData list of dictionaries
-    conn.close()
-    return sqlData
+    Returns a list of dictionaries, one per row, or when columnar is True a
+    single {"columns": [...], "rows": [[...]]} dictionary which avoids
+    repeating every column name in each row.
+    """
+    if columnar:
+        return {"columns": columns, "rows": rows}
+    return [dict(zip(columns, row)) for row in rows]
+
+def queryFormattedRows(sql, paramTuple, columnar=False):
+    """Executes a SQL query, returns the rows formatted by formatRows()"""
+    columns, rows = queryRows(sql, paramTuple)
+    return formatRows(columns, rows, columnar)
+
+def dumpJson(data):
+    """Serializes data into compact JSON for HTTP responses"""
+    return json.dumps(data, separators=(',', ':'))
 
-def queryStationsDb(parameters):
+def queryDb(parameters, columnar=False):
+    """
+    Takes in parameters to query the SQLite database, returns the results
+
+    Performs a SQL query to retrieve data from specific times, stations, or
+    ranges of time. Returns all results as a list of JSON dictionaries or
+    in the columnar format of formatRows()
+
+    Results are served from queryCache when the same parameters were queried
+    recently and no telemetry of the station has been inserted since.
+    """
+    sql, paramTuple = createTelemetryQuery(parameters)
+
+    key = querycache.makeKey("telemetry", parameters, columnar)
+    tag = querycache.stationTag(parameters["CALLSIGN"], parameters["NODEID"])
+
+    # Completed query, return sqlData list of dictionaries
+    return queryCache.fetch(key, tag, queryFormattedRows, sql, paramTuple,
+                            columnar)
+
+def queryStationsDb(parameters, columnar=False):
     """
     Takes in parameters to query the SQLite database, returns the results
 
     Performs a SQL query to retrieve data about stations in the SQLite db.
     Can retrieve all stations ever heard, in a specific time range, or in
     a timespan before now. Returns all results as a list of JSON dictionaries
+    or in the columnar format of formatRows(). Results are cached like
+    queryDb().
     """
 
     # Check for whether a time range or timespan is being specified
@@ -601,48 +1271,40 @@ def queryStationsDb(parameters):
     # Create SQL query string
     sql = sqlBeg + sqlWhere + sqlEnd
 
-    # Get telemetry databse name from configuration file
-    dbFilename = telemetryConfig.get("DATABASE", "FILENAME")
+    key = querycache.makeKey("stations", parameters, columnar)
+    tag = querycache.stationTag(parameters["CALLSIGN"], parameters["NODEID"])
 
-    # Connect to database, create SQL query, execute query, and close database
-    try:
-        conn = sqlite3.connect(dbFilename)
-        conn.row_factory = sqlite3.Row  # SQLite.Row returns columns,values
-        cur = conn.cursor()
-        cur.execute(sql,paramTuple)
-        rows = cur.fetchall()
+    # Completed query, return list of dictionary data for JSON
+    return queryCache.fetch(key, tag, queryFormattedRows, sql, paramTuple,
+                            columnar)
 
-    except StandardError as e:
-        logger.error("StandardError: " + str(e))
-    except ValueError as e:
-        logger.error("ValueError: " + str(e))
-    except IndexError as e:
-        logger.error("IndexError: " + str(e))
-    except KeyError as e:
-        logger.error("KeyError: " + str(e))
+def queryLatestDb(parameters, columnar=False):
+    """
+    Takes in parameters to query the SQLite database, returns the results
 
-    # Parse through rows and create key:value dictionaries for each row.
-    # Then build up a list of dictionaries for all results.
-    try:
-        sqlData = []
-        for row in rows:
-            rowData = {}
-            for parameter in row.keys():
-                rowData[parameter] = row[parameter]
-            sqlData.append(rowData)
+    Performs a single SQL query to retrieve the latest telemetry row of every
+    station heard in a time range or timespan before now, ordered by station.
+    Returns all results as a list of JSON dictionaries or in the columnar
+    format of formatRows(). Results are cached like queryDb().
+    """
+    # Use supplied parameters to generate a Tuple of epoch start/stop times
+    timeTuple = generateStartStopTimes(parameters)
 
-    except StandardError as e:
-        logger.error("StandardError: " + str(e))
-    except ValueError as e:
-        logger.error("ValueError: " + str(e))
-    except IndexError as e:
-        logger.error("IndexError: " + str(e))
-    except KeyError as e:
-        logger.error("KeyError: " + str(e))
+    # Newest KEYID of each station is its latest telemetry row
+    sql = "SELECT TELEMETRY.* FROM TELEMETRY JOIN " +\
+          "(SELECT MAX(KEYID) AS LATESTKEYID FROM TELEMETRY " +\
+          "WHERE EPOCH BETWEEN ? AND ? " +\
+          "AND SOURCECALLSIGN LIKE ? AND SOURCEID LIKE ? " +\
+          "GROUP BY SOURCECALLSIGN, SOURCEID) " +\
+          "ON KEYID = LATESTKEYID ORDER BY SOURCECALLSIGN, SOURCEID"
+    paramTuple = timeTuple + (parameters["CALLSIGN"], parameters["NODEID"])
 
-    # Completed query, close database, return list of dictionary data for JSON
-    conn.close()
-    return sqlData
+    key = querycache.makeKey("latest", parameters, columnar)
+    tag = querycache.stationTag(parameters["CALLSIGN"], parameters["NODEID"])
+
+    # Completed query, return list of dictionary data for JSON
+    return queryCache.fetch(key, tag, queryFormattedRows, sql, paramTuple,
+                            columnar)
 
 def generateStartStopTimes(parameters):
     """Use parameters dictionary to build up a Tuple of start/stop time values"""
@@ -0,0 +1,352 @@
+# /Applications/Telemetry/telemetryexport.py
+# License: GPLv3
+
+"""
+Export telemetry history from the SQLite database into columnar files (NumPy
+.npz, Apache Arrow or Parquet) for analysis.
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zipfile
+
+# NumPy and PyArrow are optional, only the formats they provide need them
+try:
+    import numpy
+    from numpy.lib import format as npformat
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Rows fetched from SQLite per chunk, memory use is bounded by this value
+CHUNK_ROWS = 4096
+
+FORMATS = ("npz", "arrow", "parquet")
+
+# Telemetry field names stored under a different TELEMETRY column name
+COLUMN_ALIASES = {"VCC": "ADC6"}
+
+logger = logging.getLogger('telemetry')
+
+
+def availableFormats():
+    """Returns the export formats supported by the installed packages"""
+    formats = []
+    if numpy is not None:
+        formats.append("npz")
+    if pyarrow is not None:
+        formats.extend(["arrow", "parquet"])
+    return formats
+
+
+def telemetryColumns(conn):
+    """
+    Returns an ordered list of (name, type) tuples for the TELEMETRY table
+
+    :param conn: SQLite3 database connection
+    :return: List of column name and declared SQLite type tuples
+    """
+    cur = conn.execute("PRAGMA table_info(TELEMETRY)")
+    return [(str(row[1]), str(row[2]).upper()) for row in cur.fetchall()]
+
+
+def createExportQuery(columns, callsign, nodeid, startEpoch, endEpoch):
+    """
+    Creates the SQL query and parameter tuple for an export
+
+    :param columns: List of validated column names or "column AS name"
+    :param callsign: Source callsign, SQL LIKE wildcards allowed
+    :param nodeid: Source node ID, SQL LIKE wildcards allowed
+    :param startEpoch: Start of time range in seconds since epoch
+    :param endEpoch: End of time range in seconds since epoch
+    :return: SQL string and parameter tuple
+    """
+    sql = "SELECT " + ", ".join(columns) + " FROM TELEMETRY " +\
+          "WHERE SOURCECALLSIGN LIKE ? AND SOURCEID LIKE ? " +\
+          "AND EPOCH BETWEEN ? AND ? ORDER BY KEYID ASC"
+    paramTuple = (str(callsign).upper(), str(nodeid), startEpoch, endEpoch)
+    return sql, paramTuple
+
+
+def iterChunks(cur):
+    """Yields lists of rows from an executed cursor CHUNK_ROWS at a time"""
+    while True:
+        rows = cur.fetchmany(CHUNK_ROWS)
+        if not rows:
+            break
+        yield rows
+
+
+def numpyDtype(name, sqlType, width):
+    """
+    Returns the NumPy dtype used for a TELEMETRY column in .npz files
+
+    TEXT columns are fixed width byte strings of width, the longest value of
+    the column in bytes.
+    """
+    if name == "KEYID":
+        return numpy.dtype("i8")
+    elif sqlType == "TEXT":
+        return numpy.dtype("S" + str(max(1, width)))
+    else:
+        # INTEGER columns may hold REAL values (EPOCH) and NULL, use float
+        return numpy.dtype("f8")
+
+
+def arrowType(name, sqlType):
+    """Returns the Arrow type used for a TELEMETRY column"""
+    if name == "KEYID":
+        return pyarrow.int64()
+    elif sqlType == "TEXT":
+        return pyarrow.string()
+    else:
+        return pyarrow.float64()
+
+
+def cleanColumn(name, sqlType, column):
+    """
+    Returns a list of column values safe to store in a typed array
+
+    NULL numeric values become NaN and SQLite values stored with an unexpected
+    type (i.e. non-numeric text in a REAL column) are treated as NULL.
+    """
+    if name == "KEYID":
+        return list(column)
+    elif sqlType == "TEXT":
+        return [u"" if value is None else unicode(value) for value in column]
+    else:
+        return [float(value) if isinstance(value, (int, long, float))
+                else float("nan") for value in column]
+
+
+def writeNpz(cur, rowCount, widths, columns, filename):
+    """
+    Writes the query results in cursor into a NumPy .npz file
+
+    Every column is filled chunk by chunk into a memory mapped .npy file in a
+    temporary directory which are then zipped into the .npz archive just like
+    numpy.savez() would. Memory use stays flat regardless of rowCount.
+
+    :param cur: Executed SQLite3 cursor
+    :param rowCount: Number of rows the query will return
+    :param widths: List of the longest value in bytes of each column
+    :param columns: List of (name, type) tuples in query order
+    :param filename: Output .npz filename
+    """
+    tempDir = tempfile.mkdtemp(prefix="telemetryexport")
+    try:
+        arrays = []
+        for (name, sqlType), width in zip(columns, widths):
+            arrays.append(npformat.open_memmap(
+                os.path.join(tempDir, name + ".npy"), mode="w+",
+                dtype=numpyDtype(name, sqlType, width), shape=(rowCount,)))
+        truncated = dict((name, 0) for name, sqlType in columns)
+
+        offset = 0
+        for rows in iterChunks(cur):
+            # Only fill up to the counted rows if inserts happened meanwhile
+            rows = rows[:rowCount - offset]
+            end = offset + len(rows)
+            for index, column in enumerate(zip(*rows)):
+                name, sqlType = columns[index]
+                column = cleanColumn(name, sqlType, column)
+                if sqlType == "TEXT":
+                    column = [value.encode("utf-8") for value in column]
+                    # Rows inserted since the widths were measured may be
+                    # longer, NumPy cuts them off at the column width
+                    width = arrays[index].dtype.itemsize
+                    truncated[name] += sum(1 for value in column
+                                           if len(value) > width)
+                arrays[index][offset:end] = column
+            offset = end
+            if offset >= rowCount:
+                break
+
+        for array in arrays:
+            array.flush()
+        del arrays
+
+        for name, sqlType in columns:
+            if truncated[name]:
+                logger.warning("Export truncated {0} {1} value(s) longer than "
+                               "the column width".format(truncated[name],
+                                                         name))
+
+        with zipfile.ZipFile(filename, "w", zipfile.ZIP_STORED,
+                             allowZip64=True) as archive:
+            for name, sqlType in columns:
+                archive.write(os.path.join(tempDir, name + ".npy"),
+                              name + ".npy")
+
+    finally:
+        shutil.rmtree(tempDir, ignore_errors=True)
+
+
+def writeArrow(cur, columns, filename, fileFormat):
+    """
+    Writes the query results in cursor into an Arrow or Parquet file
+
+    Each chunk of rows is written as its own record batch (Arrow) or row
+    group (Parquet) so only one chunk is ever held in memory.
+
+    :param cur: Executed SQLite3 cursor
+    :param columns: List of (name, type) tuples in query order
+    :param filename: Output filename
+    :param fileFormat: "arrow" or "parquet"
+    :return: Number of rows written
+    """
+    schema = pyarrow.schema([pyarrow.field(name, arrowType(name, sqlType))
+                             for name, sqlType in columns])
+
+    if fileFormat == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(filename, schema)
+    else:
+        writer = pyarrow.RecordBatchFileWriter(filename, schema)
+
+    rowCount = 0
+    try:
+        for rows in iterChunks(cur):
+            arrays = [pyarrow.array(cleanColumn(name, sqlType, column),
+                                    type=arrowType(name, sqlType))
+                      for column, (name, sqlType) in zip(zip(*rows), columns)]
+            batch = pyarrow.RecordBatch.from_arrays(arrays, schema.names)
+            if fileFormat == "parquet":
+                writer.write_table(pyarrow.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+            rowCount += len(rows)
+    finally:
+        writer.close()
+
+    return rowCount
+
+
+def exportTelemetry(dbFilename, filename, columns=None, callsign="%",
+                    nodeid="%", startEpoch=0, endEpoch=None,
+                    fileFormat="npz"):
+    """
+    Exports telemetry history of a station and time range into a columnar file
+
+    :param dbFilename: Telemetry SQLite database filename
+    :param filename: Output filename
+    :param columns: List of TELEMETRY column names, None exports all columns
+    :param callsign: Source callsign, SQL LIKE wildcards allowed
+    :param nodeid: Source node ID, SQL LIKE wildcards allowed
+    :param startEpoch: Start of time range in seconds since epoch
+    :param endEpoch: End of time range in seconds since epoch, None is now
+    :param fileFormat: One of "npz", "arrow" or "parquet"
+    :return: Number of rows exported
+    """
+    if fileFormat not in FORMATS:
+        raise ValueError("Format '{0}' is invalid".format(fileFormat))
+    if fileFormat not in availableFormats():
+        raise ValueError(
+            "Format '{0}' requires a package that is not installed"
+            .format(fileFormat))
+
+    if endEpoch is None:
+        endEpoch = time.time()
+
+    conn = sqlite3.connect(dbFilename)
+    try:
+        # Validate requested columns against the table, keeps SQL safe too
+        tableColumns = telemetryColumns(conn)
+        if columns is None:
+            selected = tableColumns
+            expressions = [name for name, _ in selected]
+        else:
+            types = dict(tableColumns)
+            selected = []
+            expressions = []
+            for name in columns:
+                name = str(name).strip().upper()
+                column = COLUMN_ALIASES.get(name, name)
+                if column not in types:
+                    raise ValueError("Column '{0}' is invalid".format(name))
+                selected.append((name, types[column]))
+                if column != name:
+                    expressions.append(column + " AS " + name)
+                else:
+                    expressions.append(name)
+
+        sql, paramTuple = createExportQuery(expressions, callsign, nodeid,
+                                            startEpoch, endEpoch)
+
+        cur = conn.cursor()
+        cur.execute(sql, paramTuple)
+
+        if fileFormat == "npz":
+            # Arrays are preallocated so the size and the width in bytes of
+            # TEXT columns must be known up front
+            lengths = ["MAX(LENGTH(CAST(" + name + " AS BLOB)))"
+                       if sqlType == "TEXT" else "0"
+                       for name, sqlType in selected]
+            countSql = "SELECT COUNT(*), " + ", ".join(lengths) +\
+                       " FROM (" + sql + ")"
+            counts = conn.execute(countSql, paramTuple).fetchone()
+            rowCount = counts[0]
+            widths = [width or 0 for width in counts[1:]]
+            writeNpz(cur, rowCount, widths, selected, filename)
+        else:
+            rowCount = writeArrow(cur, selected, filename, fileFormat)
+
+    finally:
+        conn.close()
+
+    return rowCount
+
+
+def iso8601ToEpoch(isoTime):
+    """Converts an ISO 8601 "%Y-%m-%dT%H:%M:%S" local time to epoch seconds"""
+    return time.mktime(time.strptime(isoTime, "%Y-%m-%dT%H:%M:%S"))
+
+
+def main():
+    """Command line interface to exportTelemetry()"""
+    parser = argparse.ArgumentParser(
+        description="Export Faraday telemetry history into a columnar file")
+    parser.add_argument("output", help="Output filename")
+    parser.add_argument("--database", default="telemetry.db",
+                        help="Telemetry SQLite database filename")
+    parser.add_argument("--callsign", default="%", help="Source callsign")
+    parser.add_argument("--nodeid", default="%", help="Source node ID")
+    parser.add_argument("--starttime", default=None,
+                        help="Start time (ISO 8601 %%Y-%%m-%%dT%%H:%%M:%%S)")
+    parser.add_argument("--endtime", default=None,
+                        help="End time (ISO 8601 %%Y-%%m-%%dT%%H:%%M:%%S)")
+    parser.add_argument("--columns", default=None,
+                        help="Comma separated columns, default all")
+    parser.add_argument("--format", dest="fileFormat", default="npz",
+                        choices=FORMATS, help="Output file format")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+
+    startEpoch = 0
+    endEpoch = None
+    if args.starttime is not None:
+        startEpoch = iso8601ToEpoch(args.starttime)
+    if args.endtime is not None:
+        endEpoch = iso8601ToEpoch(args.endtime)
+
+    columns = None
+    if args.columns is not None:
+        columns = args.columns.split(",")
+
+    count = exportTelemetry(args.database, args.output, columns,
+                            args.callsign, args.nodeid, startEpoch, endEpoch,
+                            args.fileFormat)
+    print "Exported {0} rows to {1}".format(count, args.output)
+
+if __name__ == '__main__':
+    main()
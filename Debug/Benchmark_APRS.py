@@ -0,0 +1,126 @@
+#Imports - General
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+#The APRS application reads aprs.ini and loggingConfig.ini from its own folder
+APRS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../Applications/APRS/")
+sys.path.append(APRS_PATH)
+os.chdir(APRS_PATH)
+
+#Imports - Faraday Specific
+import aprs
+import aprsisclient
+import aprsisserver
+
+
+#Define constants
+STATION_COUNTS = (10, 100, 1000) #Synthetic fleet sizes
+CYCLES = 10 #aprs_worker cycles per fleet size
+CALLSIGN = "KB1LQC" #APRS-IS login callsign, only sent to the local stand-in server
+TIMEOUT = 60 #Seconds to wait for the stand-in server to receive all lines
+STALL_TIMEOUT = 5 #Seconds without new lines before giving up waiting
+
+
+def synthetic_stations(count):
+    """
+    Returns a function returning the latest telemetry of count stations like the telemetry server "/latest" query. Every call returns a new
+    EPOCH and moves the stations so each cycle sends positions and telemetry of every station.
+    """
+    random.seed(count)
+    stations = []
+    for i in range(count):
+        stations.append({"SOURCECALLSIGN": "KB{0}LQ".format(i // 16), "SOURCEID": i % 16,
+                         "DESTINATIONCALLSIGN": "KB0LQ", "DESTINATIONID": 0,
+                         "GPSLATITUDE": "{0:02d}{1:07.4f}".format(random.randint(0, 89), random.uniform(0, 59)),
+                         "GPSLATITUDEDIR": "N",
+                         "GPSLONGITUDE": "{0:03d}{1:07.4f}".format(random.randint(0, 179), random.uniform(0, 59)),
+                         "GPSLONGITUDEDIR": "W",
+                         "GPSALTITUDE": random.uniform(0, 30000), "GPSSPEED": random.uniform(0, 100), "GPSFIX": 1,
+                         "GPIOSTATE": random.randint(0, 255), "RFSTATE": random.randint(0, 255),
+                         "ADC0": random.randint(0, 4095), "ADC1": random.randint(0, 4095), "ADC3": random.randint(0, 4095),
+                         "ADC6": random.randint(0, 4095), "BOARDTEMP": random.randint(0, 4095), "EPOCH": 0})
+    cycle_times = []
+
+    def source():
+        cycle_times.append(time.time())
+        for station in stations:
+            station["EPOCH"] += 1
+        return stations
+
+    return source, cycle_times
+
+
+def wait_for_lines(server, lines):
+    """
+    Waits until the stand-in server received lines lines, returns the time it happened or None on timeout. Lines written just before the
+    stand-in server disconnects are lost so it also gives up once nothing was received for STALL_TIMEOUT seconds.
+    """
+    deadline = time.time() + TIMEOUT
+    received = 0
+    last_received = time.time()
+    while received < lines:
+        now = time.time()
+        if server.stats()["lines"] != received:
+            received = server.stats()["lines"]
+            last_received = now
+        elif now > deadline or now - last_received > STALL_TIMEOUT:
+            return None
+        time.sleep(0.001)
+    return time.time()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Faraday APRS application against a local APRS-IS stand-in server")
+    parser.add_argument("--stations", type=int, nargs="+", default=STATION_COUNTS, help="Synthetic fleet sizes")
+    parser.add_argument("--cycles", type=int, default=CYCLES, help="aprs_worker cycles per fleet size")
+    parser.add_argument("--latency", type=float, default=0, help="Stand-in server read latency (seconds)")
+    parser.add_argument("--disconnect", type=int, default=None, help="Stand-in server closes connections after this many lines")
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)
+
+    for count in args.stations:
+        server = aprsisserver.AprsIsServer(latency=args.latency, disconnectAfter=args.disconnect, record=False)
+        server.start()
+
+        #Run back to back cycles against the stand-in server
+        aprs.aprsSettings = aprs.aprsSettings._replace(callsign=CALLSIGN, server=server.host, port=server.port, rate=0,
+                                                       queueSize=count * 5 * args.cycles)
+        client = aprsisclient.AprsIsClient(aprs.aprsIsLogon, aprs.aprsSettings.queueSize, aprs.aprsSettings.keepalive)
+        client.start()
+        source, cycle_times = synthetic_stations(count)
+
+        start = time.time()
+        aprs.aprs_worker(client, source, args.cycles)
+        end = time.time()
+        cycle_times.append(end)
+
+        #Positions and telemetry every cycle, metadata only in the first
+        expected = count * (2 * args.cycles + 3)
+        received = wait_for_lines(server, expected)
+
+        client.stop()
+        client.join()
+        server.stop()
+        stats = server.stats()
+
+        cycle_ms = [(cycle_times[i + 1] - cycle_times[i]) * 1000 for i in range(len(cycle_times) - 1)]
+        print "{0} stations, {1} cycles".format(count, args.cycles)
+        print "  Cycle time:            {0:8.2f} ms mean, {1:8.2f} ms max".format(sum(cycle_ms) / len(cycle_ms), max(cycle_ms))
+        print "  Formatting throughput: {0:8.0f} lines/s".format(expected / (end - start))
+        if received is None:
+            print "  Received {0} of {1} lines, lines in flight are lost on disconnects".format(stats["lines"], expected)
+        else:
+            print "  End to end throughput: {0:8.0f} lines/s".format(expected / (received - start))
+        print "  Server: {0} lines, {1} invalid, {2} connections, {3} disconnects".format(stats["lines"], stats["invalid"],
+                                                                                       stats["connections"], stats["disconnects"])
+        print "  Client: {0}".format(client.stats())
+        print
+
+if __name__ == '__main__':
+    main()
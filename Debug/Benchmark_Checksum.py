@@ -0,0 +1,66 @@
+#Imports - General
+
+import os
+import struct
+import sys
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../Faraday_Proxy_Tools/")) #Append path to common tutorial FaradayIO module
+#Imports - Faraday Specific
+from FaradayIO import Checksum
+
+
+#Define constants
+PACKET_LENGTHS = (15, 123) #Local command datagram and telemetry datagram lengths
+BATCH_SIZE = 1000 #Packets checksummed per batch
+REPEAT = 5 #Timing repeats, best result is reported
+
+
+def compute_checksum_16_loop(packet, length):
+    """
+    Original struct.unpack() and Python loop implementation of Checksum.compute_checksum_16() used as the reference, without the print.
+    """
+    parsed_data = struct.unpack(str(length) + 'B', packet)
+    checksum = 0
+    for i in range(0, len(parsed_data)):
+        checksum += parsed_data[i]
+    while(checksum > 2**16):
+        checksum -= 2**16
+    return checksum
+
+
+def best_time(function):
+    """
+    Returns the best time in seconds of REPEAT runs of function
+    """
+    return min(timeit.repeat(function, number=1, repeat=REPEAT))
+
+
+#Verify results are identical, including overflowing sums of long packets
+for length in PACKET_LENGTHS + (0, 1, 257, 258, 1000):
+    for fill in (0x00, 0x7F, 0xFF):
+        packet = chr(fill) * length
+        assert Checksum.compute_checksum_16(packet, length) == compute_checksum_16_loop(packet, length)
+packets = [os.urandom(length) for length in range(600)]
+expected = [compute_checksum_16_loop(packet, len(packet)) for packet in packets]
+assert Checksum.compute_checksums_16(packets) == expected
+if Checksum.numpy is not None:
+    assert Checksum.compute_checksums_16(packets, use_numpy=True) == expected
+print "Results identical to original implementation\n"
+
+#Benchmark
+for length in PACKET_LENGTHS:
+    packets = [os.urandom(length) for i in range(BATCH_SIZE)]
+
+    loop = best_time(lambda: [compute_checksum_16_loop(packet, length) for packet in packets])
+    single = best_time(lambda: [Checksum.compute_checksum_16(packet, length) for packet in packets])
+    batch = best_time(lambda: Checksum.compute_checksums_16(packets))
+
+    print "{0} packets of {1} bytes".format(BATCH_SIZE, length)
+    print "  Original loop:        {0:8.2f} ms".format(loop * 1000)
+    print "  compute_checksum_16:  {0:8.2f} ms ({1:.1f}x)".format(single * 1000, loop / single)
+    print "  compute_checksums_16: {0:8.2f} ms ({1:.1f}x)".format(batch * 1000, loop / batch)
+    if Checksum.numpy is not None:
+        vectorized = best_time(lambda: Checksum.compute_checksums_16(packets, use_numpy=True))
+        print "  NumPy batch:          {0:8.2f} ms ({1:.1f}x)".format(vectorized * 1000, loop / vectorized)
+    print
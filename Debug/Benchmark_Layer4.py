@@ -0,0 +1,142 @@
+#Imports - General
+
+import argparse
+import os
+import Queue
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../proxy/")) #Append path to the proxy UART stack
+sys.path.append(os.path.join(os.path.dirname(__file__), "../Faraday_Proxy_Tools/")) #Append path to common tutorial FaradayIO module
+#Imports - Faraday Specific
+from faraday_uart_stack import layer_4_service
+from FaradayIO import faradaycommands
+
+
+#Define constants
+UART_BAUDRATE = 115200 #Simulated USB UART link, 10 bits per byte
+DATAGRAM_LENGTH = 125 #Layer 4 transport packet bytes
+DATALINK_OVERHEAD = 2.0 #Layer 2 framing bytes per payload byte (5 byte fragments with start, stop and escape bytes)
+BULK_SERVICE_NUMBER = 3 #Experimental message port
+BULK_DATAGRAMS = 300 #Bulk datagrams queued at once
+COMMANDS = 10 #Commands POSTed while the bulk datagrams are being sent
+COMMAND_INTERVAL = 0.2 #Seconds between commands
+
+
+class SimulatedLayer2(object):
+    """
+    Stand-in for layer_2_service.Layer2ServiceObject transmitting datagrams at the UART rate and receiving nothing, no Faraday required
+    """
+
+    def __init__(self, port, baud, timeout):
+        self.frame_time = DATAGRAM_LENGTH * DATALINK_OVERHEAD * 10 / UART_BAUDRATE
+        self.tx_queue = Queue.Queue()
+        self.busy = False
+        self.enabled = True
+        self.sent = []
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        while(self.enabled):
+            try:
+                datagram = self.tx_queue.get(timeout=0.1)
+            except Queue.Empty:
+                continue
+            self.busy = True
+            time.sleep(self.frame_time)
+            self.sent.append((time.time(), datagram))
+            self.busy = False
+
+    def POST(self, payload_data):
+        self.busy = True
+        self.tx_queue.put(payload_data)
+
+    def TxInWait(self):
+        return self.tx_queue.qsize() + int(self.busy)
+
+    def GET(self):
+        return False
+
+    def IsEmpty(self):
+        return True
+
+    def Abort(self):
+        self.enabled = False
+        self.thread.join()
+
+
+def run_load(express, bulk_count, command_count):
+    """
+    Queues bulk_count bulk datagrams and POSTs command_count cutdown commands while they are sent. With express False the pre-change
+    service logic is run: every datagram goes into the bulk lane and is handed to layer 2 right away without waiting for it to drain, which
+    is exactly the former single FIFO transmit loop. Returns the layer 4 transmit latency statistics, the command latencies from POST until
+    sent over the simulated UART and the elapsed time.
+    """
+    faraday_cmd = faradaycommands.faraday_commands()
+    cutdown = faraday_cmd.CommandLocalHABActivateCutdownEvent()
+    bulk = chr(0) * 100
+
+    uart = layer_4_service.faraday_uart_object("SIMULATED", UART_BAUDRATE, 5)
+    if(not express):
+        uart.LAYER_2_TX_BACKLOG_MAX = sys.maxint
+    uart.transmit_latency_stats_reset()
+    start = time.time()
+    for i in range(bulk_count):
+        uart.POST(BULK_SERVICE_NUMBER, len(bulk), bulk)
+    posted = []
+    for i in range(command_count):
+        time.sleep(COMMAND_INTERVAL)
+        posted.append(time.time())
+        if(express):
+            uart.POST(layer_4_service.COMMAND_SERVICE_NUMBER, len(cutdown), cutdown)
+        else:
+            uart.POST(layer_4_service.COMMAND_SERVICE_NUMBER, len(cutdown), cutdown, layer_4_service.PRIORITY_BULK)
+
+    #Wait until all datagrams reached layer 2 and were sent
+    while(uart.transmit_datagram_queue_hasitem() or uart.layer_2_object.TxInWait()):
+        time.sleep(0.01)
+    elapsed = time.time() - start
+    stats = uart.transmit_latency_stats()
+    uart.Abort()
+
+    #Commands are sent in the order they were POSTed
+    sent = [sent_time for sent_time, datagram in uart.layer_2_object.sent
+            if ord(datagram[0]) == layer_4_service.COMMAND_SERVICE_NUMBER]
+    latencies = [sent_time - posted_time for posted_time, sent_time in zip(posted, sent)]
+    return stats, latencies, elapsed
+
+
+def print_stats(title, stats, latencies, elapsed):
+    print title
+    print "  Elapsed: {0:.2f} s".format(elapsed)
+    print "  Cutdown commands POST to UART: {0:8.1f} ms mean, {1:8.1f} ms worst case".format(sum(latencies) / len(latencies) * 1000,
+                                                                                         max(latencies) * 1000)
+    print "  Layer 4 queue latency per lane:"
+    for lane, name in ((layer_4_service.PRIORITY_EXPRESS, "Express"), (layer_4_service.PRIORITY_COMMAND, "Command"),
+                       (layer_4_service.PRIORITY_BULK, "Bulk")):
+        lane_stats = stats[lane]
+        print "    {0:8s} {1:5d} datagrams, latency {2:8.1f} ms mean, {3:8.1f} ms max".format(name + ":", lane_stats["count"],
+                                                                                            lane_stats["mean"] * 1000,
+                                                                                            lane_stats["max"] * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark layer 4 command latency under bulk load over a simulated UART")
+    parser.add_argument("--bulk", type=int, default=BULK_DATAGRAMS, help="Bulk datagrams queued at once")
+    parser.add_argument("--commands", type=int, default=COMMANDS, help="Cutdown commands POSTed during the bulk transfer")
+    args = parser.parse_args()
+
+    #Run the layer 4 service over the simulated UART
+    layer_4_service.layer_2_service.Layer2ServiceObject = SimulatedLayer2
+
+    stats, latencies, elapsed = run_load(False, args.bulk, args.commands)
+    print_stats("Pre-change single FIFO (one lane, no layer 2 backlog limit)", stats, latencies, elapsed)
+    print
+    stats, latencies, elapsed = run_load(True, args.bulk, args.commands)
+    print_stats("Priority lanes", stats, latencies, elapsed)
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,29 @@
 import struct
 
+# NumPy is optional, only needed by compute_checksums_16 when use_numpy is True
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 ##########
 ## Checksum
 ##########
 
+def fold_checksum_16(checksum):
+    """
+    Corrects a byte sum for 16 bit overflow the same way compute_checksum_16() always has. Sums over 2**16 are reduced by 2**16 until they
+    are no larger than 2**16, computed without a loop.
+
+    :param checksum: The sum of the packet bytes as an Integer
+
+    :return: Returns the 16 bit checksum as an Integer
+    """
+    #since python doesn't limit to 16 bit Int's like CC430 in Faraday check for overflow of 16 bits and convert
+    if checksum > 2**16:
+        checksum = ((checksum - 1) & 0xFFFF) + 1
+    return checksum
+
 def compute_checksum_16(packet, length):
     """
     Computes a basic 16 bit checksum of a supplied string of bytes (packet) and length. This is used for error detection purposes.
@@ -13,14 +33,55 @@ def compute_checksum_16(packet, length):
 
     :return: Returns the 16 bit checksum as an Integer
     """
-    parsed_data = struct.unpack(str(length) + 'B', packet)
-    checksum = 0
-    #print "TESTING ****", parsed_data
-    for i in range(0,len(parsed_data)):
-        checksum += parsed_data[i]
-    #since python doesn't limit to 16 bit Int's like CC430 in Faraday check for overflow of 16 bits and convert
-    while(checksum > 2**16):
-        print "REDUCING", checksum
-        checksum -= 2**16
-    #Return checksum result
-    return checksum
\ No newline at end of file
+    if len(packet) != length:
+        #Same error the original struct.unpack() based implementation raised
+        raise struct.error("unpack requires a string argument of length {0}".format(length))
+
+    #sum() over a bytearray adds the bytes in C instead of a Python loop
+    return fold_checksum_16(sum(bytearray(packet)))
+
+def compute_checksums_16(packets, use_numpy = False):
+    """
+    Computes the 16 bit checksum of many packets at once, identical to calling compute_checksum_16() on each whole packet.
+
+    :param packets: A list of packets as strings of bytes, packets may have different lengths
+    :param use_numpy: If True all packets are summed together by NumPy which is fastest for large batches (requires NumPy)
+
+    :return: Returns a list of the 16 bit checksums as Integers
+    """
+    if not use_numpy:
+        return [fold_checksum_16(sum(bytearray(packet))) for packet in packets]
+
+    if numpy is None:
+        raise ImportError("compute_checksums_16 use_numpy requires NumPy")
+    if len(packets) == 0:
+        return []
+
+    data = numpy.frombuffer(b''.join(packets), dtype=numpy.uint8)
+    lengths = numpy.fromiter((len(packet) for packet in packets), dtype=numpy.int64, count=len(packets))
+    if (lengths == lengths[0]).all() and lengths[0] > 0:
+        #Equal length packets (i.e. datagrams) are rows of a 2D array
+        sums = data.reshape(len(packets), lengths[0]).sum(axis=1, dtype=numpy.int64)
+    else:
+        #Sum each packet's slice, reduceat returns the value at an empty slice's offset so zero those
+        offsets = numpy.concatenate(([0], numpy.cumsum(lengths)[:-1]))
+        sums = numpy.zeros(len(packets), dtype=numpy.int64)
+        nonempty = lengths > 0
+        if data.size > 0:
+            sums[nonempty] = numpy.add.reduceat(data.astype(numpy.int64), offsets[nonempty])
+    return [fold_checksum_16(checksum) for checksum in sums.tolist()]
+
+def verify_checksum_16(packet, length, checksum):
+    """
+    Verifies a packet against its 16 bit checksum. The result is identical to comparing against compute_checksum_16() but the bytes are
+    summed by sum() over a bytearray instead of a Python loop, fast enough to check every received packet.
+
+    :param packet: The packet that the checksum was computed of as a string of bytes
+    :param length: The length of the packet the checksum was computed of, bytes after length (i.e. the checksum itself) are ignored
+    :param checksum: The received 16 bit checksum as an Integer
+
+    :return: Returns True if the checksum matches
+    """
+    if len(packet) < length:
+        return False
+    return fold_checksum_16(sum(bytearray(packet[:length]))) == checksum
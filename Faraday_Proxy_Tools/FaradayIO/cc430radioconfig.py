@@ -1,4 +1,22 @@
 #from construct import *
+import bisect
+
+#Faraday only supports the Amateur Radio 900MHz band, default frequency table range
+BAND_START_MHZ = 902.0
+BAND_STOP_MHZ = 928.0
+
+def _freq_hz(freq_mhz):
+    """
+    Returns a frequency in MHz (Integer or float) as an Integer number of Hz. Rounding to the nearest Hz keeps values such as 915.35 that are
+    not exactly representable as a float from truncating down one Hz.
+    """
+    return int(round(float(freq_mhz)*10**6))
+
+def _freq_word_list(freq_word, fxosc_hz):
+    """
+    Splits a 24 bit frequency word into the list returned by freq0_carrier_calculation(), the actual frequency is truncated to whole Hz.
+    """
+    return [(freq_word >> 16) & 0xFF, (freq_word >> 8) & 0xFF, freq_word & 0xFF, ((freq_word*fxosc_hz) >> 16)/float(10**6)]
 
 def freq0_carrier_calculation(freq_desired, fxosc = 26.0, debug = False):
     """
@@ -8,7 +26,7 @@ def freq0_carrier_calculation(freq_desired, fxosc = 26.0, debug = False):
     :param fxosc: CC430 High Frequency crystal frequency in MHZ  (Integer or float). Default = 26.0MHz
     :param debug: If True then the function will print additional information about the calculation process
 
-    :return: A list\: [FREQ2, FREQ1, FREQ0, STR(actual frequency of carrier in MHz)]
+    :return: A list\: [FREQ2, FREQ1, FREQ0, actual frequency of carrier in MHz]
 
 
     .. note:: The CC430 high frequency crystal for Faraday is 26.0 MHz
@@ -17,32 +35,20 @@ def freq0_carrier_calculation(freq_desired, fxosc = 26.0, debug = False):
      .. warning:: Farday only supports the Amateur Radio 900MHz band (902-928MHz).
 
     """
+    fxosc_hz = _freq_hz(fxosc)
 
-    #Calculate the smallest bit resolution in VC0 based on crystal
-    vco_step_float = float(fxosc*10**6)/2**16
-
-    #Calculate 24 bit word needed for desired frequency nd return INT
-    desired_freq_word_int = int((float(freq_desired)*10**6)/vco_step_float)
-    desired_freq_step_count_int = int(desired_freq_word_int)*vco_step_float
-
-    actual_freq_step_count_float = int(desired_freq_step_count_int)/float((10**6))
+    #Calculate 24 bit word needed for desired frequency, the VCO step is fxosc/2**16 so integer arithmetic is exact
+    desired_freq_word_int = (_freq_hz(freq_desired) << 16)//fxosc_hz
 
-    #Convert 24 bit word into hex string and parse into FREQ2, FREQ1, and FREQ0
-    desired_freq_word_int_hex = hex(desired_freq_word_int)
-    FREQx_list = [desired_freq_word_int_hex[i:i+2] for i in range (0, len(desired_freq_word_int_hex), 2)]
-
-    #Create list of INT's of the 3 bytes for FREQx's
-    FREQx_list[0] = int(FREQx_list[1],16) #FREQ2
-    FREQx_list[1] = int(FREQx_list[2],16) #FREQ1
-    FREQx_list[2] = int(FREQx_list[3],16) #FREQ0
-    FREQx_list[3] = actual_freq_step_count_float #append actual frequency for reference
+    #Parse 24 bit word into FREQ2, FREQ1, and FREQ0 and append actual frequency for reference
+    FREQx_list = _freq_word_list(desired_freq_word_int, fxosc_hz)
 
     if debug:
-        print "vco_step_float (Hz) =", vco_step_float
-        print "24-bit word for desired frequency (int): ", int(desired_freq_step_count_int)
+        print "vco_step_float (Hz) =", fxosc_hz/float(2**16)
+        print "24-bit word for desired frequency (int): ", desired_freq_word_int
         print "24-bit word for desired frequency (hex): ", hex(desired_freq_word_int)
         #Calculate actual achieved frequency due to VCO step size
-        print "Actual result frequency (MHz): ", actual_freq_step_count_float
+        print "Actual result frequency (MHz): ", FREQx_list[3]
 
     #RETURN list of FREQx bytes and actual achieved frequency
     return FREQx_list
@@ -52,9 +58,9 @@ def freq0_reverse_carrier_calculation( freq0, freq1, freq2, fxosc = 26.0, debug
     """
     This function reverse calculates the CC430 frequency in MHz from the known freq[] bytes in the CC430 radio registers.
 
-    :param freq0: Frequency byte index 0
+    :param freq0: Frequency byte index 0 (most significant byte, FREQ2 register)
     :param freq1: Frequency byte index 1
-    :param freq2: Frequency byte index 2
+    :param freq2: Frequency byte index 2 (least significant byte, FREQ0 register)
     :param fxosc: CC430 High Frequency crystal frequency in MHZ  (Integer or float). efault = 26.0MHz
     :param debug: If True then the function will print additional information about the calculation process
 
@@ -65,14 +71,89 @@ def freq0_reverse_carrier_calculation( freq0, freq1, freq2, fxosc = 26.0, debug
     #Calculate the smallest bit resolution in VC0 based on crystal
     vco_step_float = float(fxosc*10**6)/2**16
 
-        #print steps for rebuild
-    freq0_shifted = freq0<<16
-    freq1_shifted = freq1<<8
-    freq2_shifted = freq2
-
+    freq_word = (freq0 << 16) | (freq1 << 8) | freq2
 
-    actual_freq_mhz = (int(hex(freq0_shifted + freq1_shifted + freq2_shifted),16)*vco_step_float)/float(10**6)
+    actual_freq_mhz = (freq_word*vco_step_float)/float(10**6)
     if (debug == 1):
-        print freq0_shifted, freq1_shifted, freq2_shifted
+        print freq0 << 16, freq1 << 8, freq2
         print actual_freq_mhz
     return actual_freq_mhz
+
+
+class FrequencyTable(object):
+    """
+    Precomputed table of every CC430 carrier frequency in a band at VCO step resolution (~397Hz with a 26.0MHz crystal), built for
+    frequency hopping experiments that retune often.
+
+    lookup() returns exactly what freq0_carrier_calculation() does in O(1) and nearest() finds the closest achievable carrier by binary search.
+
+    :Example:
+
+        >>> table = FrequencyTable()
+        >>> table.lookup(915.350)
+        [35, 52, 173, 915.349884]
+        >>> table.nearest(915.3502)
+        [35, 52, 174, 915.35028]
+    """
+
+    def __init__(self, start_mhz = BAND_START_MHZ, stop_mhz = BAND_STOP_MHZ, fxosc = 26.0):
+        """
+        :param start_mhz: Lowest frequency in MHz of the table (Integer or float). Default = 902.0MHz
+        :param stop_mhz: Highest frequency in MHz of the table (Integer or float). Default = 928.0MHz
+        :param fxosc: CC430 High Frequency crystal frequency in MHZ  (Integer or float). Default = 26.0MHz
+        """
+        self.fxosc_hz = _freq_hz(fxosc)
+        self.start_hz = _freq_hz(start_mhz)
+        self.stop_hz = _freq_hz(stop_mhz)
+
+        #24 bit words lookup() rounds start_mhz and stop_mhz down to, the first carrier may be up to one VCO step below start_mhz
+        self.first_word = (self.start_hz << 16)//self.fxosc_hz
+        self.last_word = (self.stop_hz << 16)//self.fxosc_hz
+
+        #Exact carrier frequency of each word in Hz (truncated) and MHz, index is word - first_word
+        self.frequencies_hz = [(word*self.fxosc_hz) >> 16 for word in xrange(self.first_word, self.last_word + 1)]
+        self.frequencies_mhz = [freq_hz/float(10**6) for freq_hz in self.frequencies_hz]
+
+    def __len__(self):
+        return len(self.frequencies_hz)
+
+    def _word_list(self, index):
+        """Returns the [FREQ2, FREQ1, FREQ0, actual frequency] list of table index"""
+        freq_word = self.first_word + index
+        return [(freq_word >> 16) & 0xFF, (freq_word >> 8) & 0xFF, freq_word & 0xFF, self.frequencies_mhz[index]]
+
+    def lookup(self, freq_desired):
+        """
+        Returns the CC430 frequency bytes for a frequency, identical to freq0_carrier_calculation() (rounds down to the VCO step).
+
+        :param freq_desired: Frequency in MHz that is desired to tune to (Integer or float)
+
+        :return: A list\: [FREQ2, FREQ1, FREQ0, actual frequency of carrier in MHz]
+        """
+        freq_hz = _freq_hz(freq_desired)
+        if freq_hz < self.start_hz or freq_hz > self.stop_hz:
+            raise ValueError("Frequency {0} MHz is outside of the table".format(freq_desired))
+        return self._word_list(((freq_hz << 16)//self.fxosc_hz) - self.first_word)
+
+    def nearest(self, freq_desired):
+        """
+        Returns the CC430 frequency bytes of the carrier frequency in the table closest to a frequency.
+
+        :param freq_desired: Frequency in MHz (Integer or float), frequencies outside of the table return the first or last entry
+
+        :return: A list\: [FREQ2, FREQ1, FREQ0, actual frequency of carrier in MHz]
+        """
+        freq_hz = _freq_hz(freq_desired)
+        index = bisect.bisect_left(self.frequencies_hz, freq_hz)
+        if index == len(self.frequencies_hz) or (index > 0 and freq_hz - self.frequencies_hz[index - 1] <= self.frequencies_hz[index] - freq_hz):
+            index -= 1
+        return self._word_list(index)
+
+    def reverse(self, freq0, freq1, freq2):
+        """
+        Returns the carrier frequency in MHz of CC430 frequency bytes from the table, same arguments as freq0_reverse_carrier_calculation().
+        """
+        index = ((freq0 << 16) | (freq1 << 8) | freq2) - self.first_word
+        if index < 0 or index >= len(self.frequencies_mhz):
+            raise ValueError("Frequency word is outside of the table")
+        return self.frequencies_mhz[index]
@@ -30,6 +30,30 @@ UPDATE_TELEMETRY_INTERVAL_UART_COMMAND = 0
 UPDATE_TELEMETRY_INTERVAL_RF_COMMAND = 1
 RF_CMD_NUMBER = 9
 
+#Precompiled packet structures
+COMMAND_DATAGRAM_STRUCT = struct.Struct('2B119s') #Command datagram header and payload
+ERROR_DETECTION_STRUCT = struct.Struct('>1H') #16bit Error Detection (Checksum)
+RF_COMMAND_HEADER_STRUCT = struct.Struct('9s2B') #RF Command packet destination callsign, callsign length and ID
+RF_LOCAL_COMMAND_STRUCT = struct.Struct('2B25s') #Command packect to be run on remote unit as local command
+GPIO_COMMAND_STRUCT = struct.Struct('6B')
+READ_MEMORY_STRUCT = struct.Struct('>HB')
+SINGLE_BYTE_STRUCT = struct.Struct('1B')
+FREQUENCY_STRUCT = struct.Struct('3B')
+MSG_EXPERIMENTAL_STRUCT = struct.Struct('1B9s2B42s')
+
+#Constant placeholder payloads of commands needing no payload data
+TELEMETRY_UPDATE_PACKET = SINGLE_BYTE_STRUCT.pack(255)
+EMPTY_COMMAND_PACKET = SINGLE_BYTE_STRUCT.pack(0)
+
+#Byte offsets within a command datagram
+COMMAND_DATAGRAM_CHECKSUM_OFFSET = COMMAND_DATAGRAM_STRUCT.size
+
+#Byte offsets within an RF command datagram, the remote unit's local command follows the RF header and each is followed by its checksum
+RF_LOCAL_COMMAND_OFFSET = RF_COMMAND_HEADER_STRUCT.size
+RF_LOCAL_COMMAND_CHECKSUM_OFFSET = RF_LOCAL_COMMAND_OFFSET + RF_LOCAL_COMMAND_STRUCT.size
+RF_COMMAND_CHECKSUM_OFFSET = RF_LOCAL_COMMAND_CHECKSUM_OFFSET + ERROR_DETECTION_STRUCT.size
+RF_COMMAND_DATAGRAM_LEN = RF_COMMAND_CHECKSUM_OFFSET + ERROR_DETECTION_STRUCT.size
+
 def create_command_datagram(command, payload):
     """
     This function creates a command packet datagram that encapsulates the actual command packets to the parsed. This allows identification of packet "types" and modularity within the command system.
@@ -41,31 +65,16 @@ def create_command_datagram(command, payload):
 
     .. note:: This command module has a predefined set of command number definitions for use/reference.
     """
-    #Define packets
-    pkt_struct1 = struct.Struct('2B')
-    pkt_struct2 = struct.Struct('119s')
-    pkt_struct3 = struct.Struct('>1H')
-
-    #Determine payload length
-    payload_len = len(payload)
-
-    #Create sub packets
-    pkt_a = pkt_struct1.pack(command, payload_len)
-    pkt_b = pkt_struct2.pack(payload)
-    checksum_computed = checksum.compute_checksum_16(pkt_a + pkt_b, len(pkt_a + pkt_b))
-    pkt_c = pkt_struct3.pack(checksum_computed)
-
-    #Concactenate sub packets into a single packet
-    packet_packed = pkt_a + pkt_b + pkt_c
-
-    #Only return packet if all variables are correctly sized
-    if(len(payload)<=FIXED_PAYLOAD_LEN_MAX):
-        #print "Lengths", len(packet_packed)
-        packet_final = packet_packed
-        return packet_final
-    else:
-        return False
+    #Only create packet if all variables are correctly sized
+    if(len(payload)>FIXED_PAYLOAD_LEN_MAX):
         print "ERROR - Create Command: Payload Too Long!", len(payload)
+        return False
+
+    #Pack header, payload and checksum into a single buffer
+    packet = bytearray(COMMAND_DATAGRAM_LEN)
+    COMMAND_DATAGRAM_STRUCT.pack_into(packet, 0, command, len(payload), payload)
+    ERROR_DETECTION_STRUCT.pack_into(packet, COMMAND_DATAGRAM_CHECKSUM_OFFSET, checksum.fold_checksum_16(sum(packet)))
+    return str(packet)
 
 def create_rf_command_datagram(dest_callsign, dest_device_id, command, payload):
     """
@@ -85,29 +94,57 @@ def create_rf_command_datagram(dest_callsign, dest_device_id, command, payload):
     """
     #Cheack if callsign is too long
     if(len(dest_callsign)<DEST_CALLSIGN_MAX_LEN):
-        payload_len = len(payload)
-        #Define packet structures
-        pkt_cmd_datagram_struct = struct.Struct('2B25s') #Command packect to be run on remote unit as local command
-        pkt_cmd_datagram_error_detection_struct = struct.Struct('>1H') #Command packect to be run on remote unit as local command Error Detection
-        pkt_rf_cmd_struct = struct.Struct('9s2B29s') #RF Command packet that encapsulates local command to be run on remote unit
-        pkt_rf_error_detection_struct = struct.Struct('>1H') #16bit Error Detection (Checksum)
-
-        #Create local command for remote unit
-        pkt_cmd_datagram = pkt_cmd_datagram_struct.pack(command, len(payload), payload)
-        pkt_cmd_datagram_error_detection = pkt_cmd_datagram_error_detection_struct.pack(checksum.compute_checksum_16(pkt_cmd_datagram, len(pkt_cmd_datagram)))
-        pkt_cmd_datagram_final  = pkt_cmd_datagram + pkt_cmd_datagram_error_detection
-        print repr(pkt_cmd_datagram_final)
-
-        #Create RF Command for local device without Error Detection appended. NOTE Callsign must be in uppercase!
-        pkt_rf_cmd = pkt_rf_cmd_struct.pack(str(dest_callsign).upper(), len(dest_callsign), dest_device_id, pkt_cmd_datagram_final)
-
-        #Create final local command packet with Error Detection appeneded
-        pkt_rf_error_detection = pkt_rf_error_detection_struct.pack(checksum.compute_checksum_16(pkt_rf_cmd, len(pkt_rf_cmd)))
-        packet = pkt_rf_cmd + pkt_rf_error_detection
-        return packet
+        packet = bytearray(RF_COMMAND_DATAGRAM_LEN)
+
+        #Create local command for remote unit with its Error Detection appended
+        RF_LOCAL_COMMAND_STRUCT.pack_into(packet, RF_LOCAL_COMMAND_OFFSET, command, len(payload), payload)
+        #RF header and checksums are still zero, summing the buffer sums only the local command
+        local_checksum = checksum.fold_checksum_16(sum(packet))
+        ERROR_DETECTION_STRUCT.pack_into(packet, RF_LOCAL_COMMAND_CHECKSUM_OFFSET, local_checksum)
+
+        #Create RF Command header for local device in front of it. NOTE Callsign must be in uppercase!
+        RF_COMMAND_HEADER_STRUCT.pack_into(packet, 0, str(dest_callsign).upper(), len(dest_callsign), dest_device_id)
+
+        #Append final Error Detection of the RF Command
+        ERROR_DETECTION_STRUCT.pack_into(packet, RF_COMMAND_CHECKSUM_OFFSET, checksum.fold_checksum_16(sum(packet)))
+        return str(packet)
     else:
         print "Error: Callsign too long!"
 
+def create_rf_command_datagrams(destinations, command, payload):
+    """
+    This function creates the same command packet datagram for commanding many REMOTE (RF) Faraday devices at once. The local command for
+    the remote units and its checksum are created only once, only the RF Command header and its checksum differ for each destination.
+
+    :param destinations: A list of (callsign, device ID) tuples of the target Faraday units
+    :param command: The command "number" that identifies the command packet to be parsed or direct action to be taken
+    :param payload: The payload for the specified command packet type. This is usually just commands full "packet" structure
+
+    :return: A list of complete command datagram packets as strings of raw bytes, identical to calling create_rf_command_datagram() for each
+        destination.
+
+    :raises ValueError: A destination callsign is too long, no datagrams are created
+    """
+    #Check all callsigns before creating anything so a bad destination is never silently skipped
+    invalid = [dest_callsign for dest_callsign, dest_device_id in destinations if len(dest_callsign) >= DEST_CALLSIGN_MAX_LEN]
+    if invalid:
+        raise ValueError("Callsign too long: {0}".format(", ".join(map(repr, invalid))))
+
+    #Create local command for remote units with its Error Detection appended, shared by all destinations
+    local_command = bytearray(RF_LOCAL_COMMAND_STRUCT.size + ERROR_DETECTION_STRUCT.size)
+    RF_LOCAL_COMMAND_STRUCT.pack_into(local_command, 0, command, len(payload), payload)
+    ERROR_DETECTION_STRUCT.pack_into(local_command, RF_LOCAL_COMMAND_STRUCT.size, checksum.fold_checksum_16(sum(local_command)))
+    local_command_sum = sum(local_command)
+    local_command = str(local_command)
+
+    packets = []
+    for dest_callsign, dest_device_id in destinations:
+        #Create RF Command header. NOTE Callsign must be in uppercase!
+        header = RF_COMMAND_HEADER_STRUCT.pack(str(dest_callsign).upper(), len(dest_callsign), dest_device_id)
+        rf_checksum = checksum.fold_checksum_16(sum(bytearray(header)) + local_command_sum)
+        packets.append(header + local_command + ERROR_DETECTION_STRUCT.pack(rf_checksum))
+    return packets
+
 def create_fixed_length_packet(data, fixed_legth):
         """
         A simple function that accepts a string of databytes and appends padding bytes up to a fixed length.
@@ -202,7 +239,7 @@ def create_freq_list(freq):
 
 
     """
-    frequency_list = cc430radioconfig.freq0_carrier_calculation(26,freq,0)
+    frequency_list = cc430radioconfig.freq0_carrier_calculation(freq, 26.0)
     return frequency_list
 
 def calc_radio_freq(freq0, freq1, freq2):
@@ -219,7 +256,7 @@ def calc_radio_freq(freq0, freq1, freq2):
         >>> calc_radio_freq(35, 52, 173)
         915.3498840332031
     """
-    frequency = cc430radioconfig.freq0_reverse_carrier_calculation(26, freq0, freq1, freq2, False)
+    frequency = cc430radioconfig.freq0_reverse_carrier_calculation(freq0, freq1, freq2, 26.0)
     return frequency
 
 ######################################################
@@ -266,9 +303,6 @@ def create_gpio_command_packet(port3_on_bitmask, port4_on_bitmask, port5_on_bitm
 
     """
     #This function is the create a single ON/OFF for all GPIO ports
-    #Define Packets Structures
-    gpio_cmd_pkt_struct = struct.Struct('6B')
-
     #Create ON/OFF integers to bitwise & to check for duplicate bits for bot ON and OFF
     check_on_int = port3_on_bitmask<<16
     check_on_int |= port4_on_bitmask<<8
@@ -280,108 +314,114 @@ def create_gpio_command_packet(port3_on_bitmask, port4_on_bitmask, port5_on_bitm
         print "GPIO ON/OFF Bitmask check FAIL"
         return False
     else:
-        gpio_cmd_pkt = gpio_cmd_pkt_struct.pack(port3_on_bitmask, port4_on_bitmask, port5_on_bitmask, port3_off_bitmask, port4_off_bitmask, port5_off_bitmask)
+        gpio_cmd_pkt = GPIO_COMMAND_STRUCT.pack(port3_on_bitmask, port4_on_bitmask, port5_on_bitmask, port3_off_bitmask, port4_off_bitmask, port5_off_bitmask)
         return gpio_cmd_pkt #create_command_packet(GPIO_COMMAND_NUMBER, gpio_command_packet)
 
+def create_gpio_pin_packet(port, bitmask, state):
+    """
+    A packet generation function to create a GPIO command packet that toggles the GPIO pins of a single port HIGH or LOW.
+
+    :param port: The GPIO port number (3, 4 or 5)
+    :param bitmask: The bitmask of the port's pins to toggle (i.e. gpioallocations.LED_1)
+    :param state: 1 to toggle the pins HIGH, 0 to toggle them LOW
+
+    :Return: Returns the complete GPIO command application packet
+    """
+    bitmasks = [0, 0, 0, 0, 0, 0]
+    bitmasks[(port - 3) + (0 if state else 3)] = bitmask
+    return create_gpio_command_packet(*bitmasks)
+
+#Constant GPIO command packets, created once when the module is loaded
+GPIO_PACKET_GPS_STANDBY_HIGH = create_gpio_pin_packet(3, gpioallocations.GPS_STANDBY, 1)
+GPIO_PACKET_GPS_STANDBY_LOW = create_gpio_pin_packet(3, gpioallocations.GPS_STANDBY, 0)
+GPIO_PACKET_GPS_RESET_HIGH = create_gpio_pin_packet(3, gpioallocations.GPS_RESET, 1)
+GPIO_PACKET_GPS_RESET_LOW = create_gpio_pin_packet(3, gpioallocations.GPS_RESET, 0)
+GPIO_PACKET_MOSFET_HIGH = create_gpio_pin_packet(5, gpioallocations.MOSFET_CNTL, 1)
+GPIO_PACKET_MOSFET_LOW = create_gpio_pin_packet(5, gpioallocations.MOSFET_CNTL, 0)
+GPIO_PACKET_LED_1_HIGH = create_gpio_pin_packet(3, gpioallocations.LED_1, 1)
+GPIO_PACKET_LED_1_LOW = create_gpio_pin_packet(3, gpioallocations.LED_1, 0)
+GPIO_PACKET_LED_2_HIGH = create_gpio_pin_packet(3, gpioallocations.LED_2, 1)
+GPIO_PACKET_LED_2_LOW = create_gpio_pin_packet(3, gpioallocations.LED_2, 0)
+
 def packet_gpio_gps_standby_enable():
     """
     A predefined funtion that returns the GPIO bitmask to ENABLE the GPS standby GPIO pin.
 
-    :Return: A GPIO Bitmask
-
-    .. todo:: This function needs updating to the new create_gpio_command_packet()
+    :Return: A GPIO command packet (string of bytes)
     """
-    return create_gpio_command_packet(3, gpio_allocation.GPS_STANDBY, 0)
+    return GPIO_PACKET_GPS_STANDBY_LOW
 
 def packet_gpio_gps_standby_disable():
     """
     A predefined funtion that returns the GPIO bitmask to DISABLE the GPS standby GPIO pin.
 
-    :Return: A GPIO Bitmask
-
-    .. todo:: This function needs updating to the new create_gpio_command_packet()
+    :Return: A GPIO command packet (string of bytes)
     """
-    return create_gpio_command_packet(3, gpio_allocation.GPS_STANDBY, 1)
+    return GPIO_PACKET_GPS_STANDBY_HIGH
 
 def packet_gpio_gps_reset_enable():
     """
     A predefined funtion that returns the GPIO bitmask to ENABLE the GPS RESET GPIO pin.
 
-    :Return: A GPIO Bitmask
-
-    .. todo:: This function needs updating to the new create_gpio_command_packet()
+    :Return: A GPIO command packet (string of bytes)
     """
-    return create_gpio_command_packet(3, gpio_allocation.GPS_RESET, 0)
+    return GPIO_PACKET_GPS_RESET_LOW
 
 def packet_gpio_gps_reset_disable():
     """
     A predefined funtion that returns the GPIO bitmask to DISABLE the GPS RESET GPIO pin.
 
-    :Return: A GPIO Bitmask
-
-    .. todo:: This function needs updating to the new create_gpio_command_packet()
+    :Return: A GPIO command packet (string of bytes)
     """
-    return create_gpio_command_packet(3, gpio_allocation.GPS_RESET, 1)
+    return GPIO_PACKET_GPS_RESET_HIGH
 
 def packet_gpio_mosfet_enable():
     """
     A predefined funtion that returns the GPIO bitmask to ENABLE the MOSFET GPIO pin.
 
-    :Return: A GPIO Bitmask
-
-    .. todo:: This function needs updating to the new create_gpio_command_packet()
+    :Return: A GPIO command packet (string of bytes)
     """
-    return create_gpio_command_packet(5, gpio_allocation.MOSFET_CNTL, 1)
+    return GPIO_PACKET_MOSFET_HIGH
 
 def packet_gpio_mosfet_disable():
     """
     A predefined funtion that returns the GPIO bitmask to DISABLE the MOSFET GPIO pin.
 
-    :Return: A GPIO Bitmask
-
-    .. todo:: This function needs updating to the new create_gpio_command_packet()
+    :Return: A GPIO command packet (string of bytes)
     """
-    return create_gpio_command_packet(5, gpio_allocation.MOSFET_CNTL, 0)
+    return GPIO_PACKET_MOSFET_LOW
 
 def packet_gpio_led_1_enable():
     """
     A predefined funtion that returns the GPIO bitmask to ENABLE the LED #1 GPIO pin.
 
-    :Return: A GPIO Bitmask
-
-    .. todo:: This function needs updating to the new create_gpio_command_packet()
+    :Return: A GPIO command packet (string of bytes)
     """
-    return create_gpio_command_packet(3, gpio_allocation.LED_1, 1)
+    return GPIO_PACKET_LED_1_HIGH
 
 def packet_gpio_led_1_disable():
     """
     A predefined funtion that returns the GPIO bitmask to DISABLE the LED #1 GPIO pin.
 
-    :Return: A GPIO Bitmask
-
-    .. todo:: This function needs updating to the new create_gpio_command_packet()
+    :Return: A GPIO command packet (string of bytes)
     """
-    return create_gpio_command_packet(3, gpio_allocation.LED_1, 0)
+    return GPIO_PACKET_LED_1_LOW
 
 def packet_gpio_led_2_enable():
     """
     A predefined funtion that returns the GPIO bitmask to ENABLE the LED #2 GPIO pin.
 
-    :Return: A GPIO Bitmask
-
-    .. todo:: This function needs updating to the new create_gpio_command_packet()
+    :Return: A GPIO command packet (string of bytes)
     """
-    return create_gpio_command_packet(3, gpio_allocation.LED_2, 1)
+    return GPIO_PACKET_LED_2_HIGH
 
 def packet_gpio_led_2_disable():
     """
     A predefined funtion that returns the GPIO bitmask to DISABLE the LED #2 GPIO pin.
 
-    :Return: A GPIO Bitmask
-
-    .. todo:: This function needs updating to the new create_gpio_command_packet()
+    :Return: A GPIO command packet (string of bytes)
     """
-    return create_gpio_command_packet(3, gpio_allocation.LED_2, 0)
+    return GPIO_PACKET_LED_2_LOW
 
 ##############
 ## Command = READ MEMORY
@@ -405,8 +445,7 @@ def create_read_memory_packet(dec_address, length):
 
     """
     if(length<=MAX_MEMORY_READ_LEN):
-        packet_struct = struct.Struct('>HB')
-        packet = packet_struct.pack(dec_address, length)
+        packet = READ_MEMORY_STRUCT.pack(dec_address, length)
         return packet
     else:
         return False
@@ -473,9 +512,7 @@ def create_local_telem_update_packet():
 
     .. todo:: This should be deprecated into a single "dummy" payload function
     """
-    packet_struct = struct.Struct('>B')
-    packet = packet_struct.pack(255)
-    return packet
+    return TELEMETRY_UPDATE_PACKET
 
 ##############
 ## Command = Send RF Data Now
@@ -489,9 +526,7 @@ def create_rf_telem_update_packet():
 
     .. todo:: This should be deprecated into a single "dummy" payload function
     """
-    packet_struct = struct.Struct('>B')
-    packet = packet_struct.pack(255)
-    return packet
+    return TELEMETRY_UPDATE_PACKET
 
 ##############
 ## Command = Update RF frequency
@@ -507,8 +542,7 @@ def create_update_rf_frequency_packet(frequency_mhz):
 
     """
     freq_list = create_freq_list(float(frequency_mhz))
-    packet_struct = struct.Struct('3B')
-    packet = packet_struct.pack(freq_list[0], freq_list[1], freq_list[2])
+    packet = FREQUENCY_STRUCT.pack(freq_list[0], freq_list[1], freq_list[2])
     return packet
 
 
@@ -529,8 +563,7 @@ def create_update_rf_patable_packet(ucharPATable_Setting):
     :Return: A completed packet (string of bytes)
 
     """
-    packet_struct = struct.Struct('1B')
-    packet = packet_struct.pack(ucharPATable_Setting)
+    packet = SINGLE_BYTE_STRUCT.pack(ucharPATable_Setting)
     return packet
 
 ##############
@@ -543,9 +576,7 @@ def create_reset_device_debug_flash_packet():
 
     :Return: A completed packet (string of bytes)
     """
-    packet_struct = struct.Struct('1B')
-    packet = packet_struct.pack(0)
-    return packet
+    return EMPTY_COMMAND_PACKET
 
 
 ##############
@@ -558,9 +589,7 @@ def create_send_telemetry_device_debug_flash():
 
     :Return: A completed packet (string of bytes)
     """
-    packet_struct = struct.Struct('1B')
-    packet = packet_struct.pack(0)
-    return packet
+    return EMPTY_COMMAND_PACKET
 
 def create_empty_command_packet():
     """
@@ -569,9 +598,7 @@ def create_empty_command_packet():
 
     :Return: A completed packet (string of bytes)
     """
-    packet_struct = struct.Struct('1B')
-    packet = packet_struct.pack(0)
-    return packet
+    return EMPTY_COMMAND_PACKET
 
 
 ##############
@@ -597,7 +624,6 @@ def CreatePacketMsgExperimental(msg_cmd, dest_callsign, dest_device_id, data_len
 
 
     """
-    packet_struct = struct.Struct('1B9s2B42s')
-    packet = packet_struct.pack(msg_cmd, str(dest_callsign).upper(), dest_device_id, data_len, data)
+    packet = MSG_EXPERIMENTAL_STRUCT.pack(msg_cmd, str(dest_callsign).upper(), dest_device_id, data_len, data)
     return packet
 
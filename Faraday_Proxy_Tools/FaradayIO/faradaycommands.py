@@ -67,6 +67,30 @@ class faraday_commands(object):
         packet = commandmodule.create_rf_command_datagram(remote_callsign, remote_node_id, command_number, command_packet)
         return packet
 
+    def CommandRfBatch(self, destinations, command_number, command_packet):
+        """
+        A predefined function that returns raw command application DATAGRAMS that will cause the supplied command to be executed on many remote (RF) devices. The command
+        for the remote devices is only created once.
+
+        .. note:: Unlike CommandRf(), which returns the RF command DATAGRAM to be wrapped with CommandLocal(CMD_SENDRFCOMMAND, ...) like the
+            CommandRemote functions do, each returned DATAGRAM is already wrapped and ready to POST to the local device. Do not wrap it again.
+
+        :param destinations: A list of (callsign, ID number) tuples of the remote target Faraday devices
+        :param command_number: Command application command identification number (Identifies a command/command type using 0-255)
+        :param command_packet: Pass a pre-generated packet as defined by the intended command.
+
+        :Return: Returns a list of the complete generated packets as strings of bytes in the order of destinations.
+
+        :raises ValueError: A destination callsign is too long, no packets are returned
+
+        :Example:
+
+        >>> faraday_cmd = faradaycommands.faraday_commands()
+        >>> packets = faraday_cmd.CommandRfBatch([("KB1LQD", 1), ("KB1LQD", 2)], faraday_cmd.CMD_APP_HAB_CUTDOWNNOW, faradaycommands.commandmodule.create_empty_command_packet())
+        """
+        return [commandmodule.create_command_datagram(self.CMD_SENDRFCOMMAND, packet)
+                for packet in commandmodule.create_rf_command_datagrams(destinations, command_number, command_packet)]
+
     ###############################
     ## Predefined LOCAL Commands
     ###############################
@@ -131,7 +155,7 @@ class faraday_commands(object):
         :Return: Returns the complete generated packet as a string of bytes.
 
         """
-        packet = commandmodule.create_command_datagram(self.CMD_GPIO, commandmodule.create_gpio_command_packet(int(gpioallocations.LED_1), 0, 0, 0, 0, 0 ))
+        packet = commandmodule.create_command_datagram(self.CMD_GPIO, commandmodule.GPIO_PACKET_LED_1_HIGH)
         return packet
 
     def CommandLocalGPIOLED1Off(self):
@@ -141,7 +165,7 @@ class faraday_commands(object):
         :Return: Returns the complete generated packet as a string of bytes.
 
         """
-        packet = commandmodule.create_command_datagram(self.CMD_GPIO, commandmodule.create_gpio_command_packet(0, 0, 0, int(gpioallocations.LED_1), 0, 0 ))
+        packet = commandmodule.create_command_datagram(self.CMD_GPIO, commandmodule.GPIO_PACKET_LED_1_LOW)
         return packet
 
     def CommandLocalGPIOLED2On(self):
@@ -151,7 +175,7 @@ class faraday_commands(object):
         :Return: Returns the complete generated packet as a string of bytes.
 
         """
-        packet = commandmodule.create_command_datagram(self.CMD_GPIO, commandmodule.create_gpio_command_packet(int(gpioallocations.LED_2), 0, 0, 0, 0, 0 ))
+        packet = commandmodule.create_command_datagram(self.CMD_GPIO, commandmodule.GPIO_PACKET_LED_2_HIGH)
         return packet
 
     def CommandLocalGPIOLED2Off(self):
@@ -161,7 +185,7 @@ class faraday_commands(object):
         :Return: Returns the complete generated packet as a string of bytes.
 
         """
-        packet = commandmodule.create_command_datagram(self.CMD_GPIO, commandmodule.create_gpio_command_packet(0, 0, 0, int(gpioallocations.LED_2), 0, 0 ))
+        packet = commandmodule.create_command_datagram(self.CMD_GPIO, commandmodule.GPIO_PACKET_LED_2_LOW)
         return packet
 
     def CommandLocalUpdatePATable(self, ucharPATable_Byte):
@@ -389,7 +413,7 @@ class faraday_commands(object):
         :Return: Returns the complete generated packet as a string of bytes.
 
         """
-        packet = commandmodule.create_rf_command_datagram(remote_callsign, remote_node_id, self.CMD_GPIO, commandmodule.create_gpio_command_packet(int(gpioallocations.LED_1), 0, 0, 0, 0, 0 ))
+        packet = commandmodule.create_rf_command_datagram(remote_callsign, remote_node_id, self.CMD_GPIO, commandmodule.GPIO_PACKET_LED_1_HIGH)
         return packet
 
     def CommandRemoteGPIOLED1Off(self, remote_callsign, remote_node_id):
@@ -402,7 +426,7 @@ class faraday_commands(object):
         :Return: Returns the complete generated packet as a string of bytes.
 
         """
-        packet = commandmodule.create_rf_command_datagram(remote_callsign, remote_node_id, self.CMD_GPIO, commandmodule.create_gpio_command_packet(0, 0, 0, int(gpioallocations.LED_1), 0, 0 ))
+        packet = commandmodule.create_rf_command_datagram(remote_callsign, remote_node_id, self.CMD_GPIO, commandmodule.GPIO_PACKET_LED_1_LOW)
         return packet
 
     def CommandRemoteGPIOLED2On(self, remote_callsign, remote_node_id):
@@ -415,7 +439,7 @@ class faraday_commands(object):
         :Return: Returns the complete generated packet as a string of bytes.
 
         """
-        packet = commandmodule.create_rf_command_datagram(remote_callsign, remote_node_id, self.CMD_GPIO, commandmodule.create_gpio_command_packet(int(gpioallocations.LED_2), 0, 0, 0, 0, 0 ))
+        packet = commandmodule.create_rf_command_datagram(remote_callsign, remote_node_id, self.CMD_GPIO, commandmodule.GPIO_PACKET_LED_2_HIGH)
         return packet
 
     def CommandRemoteGPIOLED2Off(self, remote_callsign, remote_node_id):
@@ -428,7 +452,7 @@ class faraday_commands(object):
         :Return: Returns the complete generated packet as a string of bytes.
 
         """
-        packet = commandmodule.create_rf_command_datagram(remote_callsign, remote_node_id, self.CMD_GPIO, commandmodule.create_gpio_command_packet(0, 0, 0, int(gpioallocations.LED_2), 0, 0 ))
+        packet = commandmodule.create_rf_command_datagram(remote_callsign, remote_node_id, self.CMD_GPIO, commandmodule.GPIO_PACKET_LED_2_LOW)
         return packet
 
 
@@ -1,6 +1,285 @@
+import re
 import struct
 import time
 
+import Checksum
+from collections import Mapping, namedtuple
+
+# NumPy is optional, only needed by UnpackPackets_3 when use_numpy is True
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Number of packets unpacked by a single struct call in UnpackPackets_3
+BULK_CHUNK_PACKETS = 256
+
+# NumPy dtype kind and size of each struct format code
+NUMPY_CODES = {'b': 'i1', 'B': 'u1', '?': 'b1', 'h': 'i2', 'H': 'u2',
+               'i': 'i4', 'I': 'u4', 'l': 'i4', 'L': 'u4', 'q': 'i8',
+               'Q': 'u8', 'f': 'f4', 'd': 'f8', 'c': 'S1'}
+
+# Struct format definition of a telemetry packet type #3
+PACKET_3_STRUCT = struct.Struct('>9s 2B 9s 8B 1H 9s 1s 10s 1s 8s 1s 5s 1c 4s 3B 9H 2B 2H')
+
+# Dictionary keys of each value unpacked from a telemetry packet type #3
+PACKET_3_KEYS = ('SOURCECALLSIGN', 'SOURCECALLSIGNLEN', 'SOURCEID', 'DESTINATIONCALLSIGN', 'DESTINATIONCALLSIGNLEN',
+                 'DESTINATIONID', 'RTCSEC', 'RTCMIN', 'RTCHOUR', 'RTCDAY', 'RTCDOW', 'RTCMONTH', 'RTCYEAR',
+                 'GPSLATITUDE', 'GPSLATITUDEDIR', 'GPSLONGITUDE', 'GPSLONGITUDEDIR', 'GPSALTITUDE',
+                 'GPSALTITUDEUNITS', 'GPSSPEED', 'GPSFIX', 'GPSHDOP', 'GPIOSTATE', 'IOSTATE', 'RFSTATE', 'ADC0',
+                 'ADC1', 'ADC2', 'ADC3', 'ADC4', 'ADC5', 'VCC', 'BOARDTEMP', 'ADC8', 'HABTIMERSTATE',
+                 'HABCUTDOWNSTATE', 'HABTRIGGERTIME', 'HABTIMER')
+
+
+class TelemetryRecord(namedtuple('TelemetryRecord', PACKET_3_KEYS + ('EPOCH',))):
+    """
+    This class is a compact, immutable telemetry packet type #3 returned by UnpackPacket_3_Record(). Fields are accessed by the same names as
+    the UnpackPacket_3() dictionary keys (i.e. record.VCC) or by index. Having no per instance dictionary it uses several times less memory
+    than the dictionary when many packets are buffered.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_unpacked(cls, parsed_packet, epoch):
+        """
+        This function creates a record from the values unpacked by PACKET_3_STRUCT and the time the packet was received.
+        """
+        # Use length fields to replace callsigns with exact strings
+        return cls._make((parsed_packet[0][:parsed_packet[1]],) + parsed_packet[1:3] +
+                         (parsed_packet[3][:parsed_packet[4]],) + parsed_packet[4:] + (epoch,))
+
+    def to_dict(self):
+        """
+        This function returns the record as a dictionary identical to the one returned by UnpackPacket_3().
+
+        :return: Dictionary of telemetry keyed by field name
+        """
+        dictionaryData = dict(zip(self._fields, self))
+        dictionaryData['SOURCECALLSIGNLEN'] = str(self.SOURCECALLSIGNLEN) #UnpackPacket_3() has always returned this as a string
+        return dictionaryData
+
+
+
+def struct_field_layout(struct_object):
+    """
+    This function returns the byte offset and format code of every value unpacked by a struct. Only formats using standard sizes
+    (beginning with '<', '>', '!' or '=') are supported since native alignment is not accounted for.
+
+    :param struct_object: The precompiled struct.Struct object
+
+    :return: A list of (offset, code) tuples, one for each unpacked value i.e. [(0, '9s'), (9, 'B'), ...]
+    """
+    fmt = struct_object.format
+    byteorder = ''
+    if fmt[0] in '@=<>!':
+        byteorder = fmt[0]
+        fmt = fmt[1:]
+
+    layout = []
+    offset = 0
+    for count, code in re.findall(r'(\d*)\s*([a-zA-Z?])', fmt):
+        count = int(count) if count else 1
+        if code in 'sp':
+            # Strings are a single value of count bytes
+            layout.append((offset, str(count) + code))
+            offset += count
+        elif code == 'x':
+            # Pad bytes are not unpacked
+            offset += count
+        else:
+            size = struct.calcsize(byteorder + code)
+            for i in range(count):
+                layout.append((offset, code))
+                offset += size
+    return layout
+
+
+def numpy_struct_dtype(struct_object, names):
+    """
+    This function creates a NumPy structured dtype with the same memory layout as a struct so packets can be decoded in bulk with
+    numpy.frombuffer().
+
+    :param struct_object: The precompiled struct.Struct object
+    :param names: The field names of each value unpacked by the struct
+
+    :return: The numpy.dtype object
+    """
+    byteorder = '<' if struct_object.format[0] == '<' else '>'
+    formats = []
+    offsets = []
+    for offset, code in struct_field_layout(struct_object):
+        if code[-1] in 'sp':
+            formats.append('S' + code[:-1])
+        else:
+            formats.append(byteorder + NUMPY_CODES[code])
+        offsets.append(offset)
+    return numpy.dtype({'names': list(names), 'formats': formats,
+                        'offsets': offsets, 'itemsize': struct_object.size})
+
+
+def create_sparse_struct(struct_object, names, fields):
+    """
+    This function creates a struct which unpacks only the requested fields of another struct, skipping all other bytes with pad bytes.
+
+    :param struct_object: The precompiled struct.Struct object
+    :param names: The field names of each value unpacked by struct_object
+    :param fields: The names of the fields to unpack
+
+    :return: A tuple of the new struct.Struct and the field names it unpacks in order
+    """
+    layout = dict(zip(names, struct_field_layout(struct_object)))
+    fmt = struct_object.format[0]
+    position = 0
+    ordered = []
+    for offset, code, name in sorted((layout[field] + (field,) for field in set(fields))):
+        if offset > position:
+            fmt += str(offset - position) + 'x'
+        fmt += code
+        position = offset + struct.calcsize(fmt[0] + code)
+        ordered.append(name)
+    return struct.Struct(fmt), tuple(ordered)
+
+
+class TelemetryView(Mapping):
+    """
+    This class is a lazy, read-only view of a raw telemetry packet type #3 returned by ViewPacket_3(). Nothing is decoded when the view is
+    created, each field is a property decoding only that field from the packet bytes with a precompiled struct using its offset in
+    PACKET_3_STRUCT. Consumers needing only a few fields (i.e. VCC and BOARDTEMP) skip decoding the rest of the packet. Decoding a single
+    field is as fast as looking it up in a cache so fields are not cached, read a field into a variable when it is used repeatedly.
+    Consumers always reading the same set of fields (i.e. APRS) should use unpack() which decodes them together with a single struct call.
+
+    The view is a read-only mapping with the same keys and values as the UnpackPacket_3() dictionary (view.VCC, view['VCC'],
+    view.get('VCC')). len(), iteration, items(), values() and dict(view) always cover every field. It is not a dict, serialize to_dict()
+    with json.dumps().
+    """
+    __slots__ = ('packet', 'EPOCH')
+
+    # Field names in packet order followed by EPOCH
+    fields = tuple(PACKET_3_KEYS) + ('EPOCH',)
+    field_set = frozenset(fields)
+
+    # Fields converted after decoding, unpack() reads them as attributes
+    converted_fields = frozenset(('SOURCECALLSIGN', 'SOURCECALLSIGNLEN', 'DESTINATIONCALLSIGN', 'EPOCH'))
+
+    # Sparse struct unpack_from function and reordering function of each set of unpack() fields, created on first use
+    unpackers = {}
+
+    def __init__(self, packet, epoch):
+        """
+        :param packet: The packet as a string of bytes, a short packet raises struct.error when its missing fields are accessed
+        :param epoch: The time the packet was received
+        """
+        self.packet = packet
+        self.EPOCH = epoch
+
+    def unpack(self, fields):
+        """
+        This function decodes several fields at once with a single precompiled struct skipping all other fields, much faster than reading
+        each field when a consumer always uses the same fields.
+
+        :param fields: Tuple of field names, the struct is created and the names validated on the first call with each tuple
+
+        :return: Tuple of the field values in the order of fields
+
+        :raises TypeError: fields is not an iterable of field names
+        :raises ValueError: fields contains a name that is not a telemetry field
+        """
+        try:
+            unpack, reorder = self.unpackers[fields]
+        except (KeyError, TypeError):
+            unpack, reorder = self.unpacker(fields)
+        if unpack is None:
+            return tuple([getattr(self, field) for field in fields])
+        if reorder is None:
+            return unpack(self.packet)
+        return reorder(unpack(self.packet))
+
+    @classmethod
+    def unpacker(cls, fields):
+        """
+        This function returns the sparse struct unpack_from function and reordering function decoding a set of unpack() fields, created
+        and validated on first use. Field sets including converted fields are read as attributes instead.
+        """
+        if isinstance(fields, basestring):
+            raise TypeError("fields must be an iterable of field names, not a string")
+        try:
+            key = tuple(fields)
+            return cls.unpackers[key]
+        except TypeError:
+            raise TypeError("fields must be an iterable of field names: {0!r}".format(fields))
+        except KeyError:
+            pass
+
+        unknown = [field for field in key if field not in cls.field_set]
+        if unknown:
+            raise ValueError("fields are not telemetry packet fields: {0}".format(", ".join(map(repr, unknown))))
+
+        if not key or cls.converted_fields.intersection(key):
+            unpacker = (None, None)
+        else:
+            sparse_struct, names = create_sparse_struct(PACKET_3_STRUCT, PACKET_3_KEYS, key)
+            if names == key:
+                reorder = None
+            else:
+                # Sparse struct values are in packet order and repeated fields are only decoded once
+                indexes = [names.index(field) for field in key]
+                reorder = lambda values: tuple([values[index] for index in indexes])
+            unpacker = (sparse_struct.unpack_from, reorder)
+        cls.unpackers[key] = unpacker
+        return unpacker
+
+    def __getitem__(self, key):
+        if key in self.field_set:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.field_set
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def keys(self):
+        """
+        This function returns the field names of the view in packet order.
+        """
+        return list(self.fields)
+
+    def to_record(self):
+        """
+        This function decodes every field of the packet at once and returns them as a TelemetryRecord.
+        """
+        return TelemetryRecord.from_unpacked(PACKET_3_STRUCT.unpack_from(self.packet), self.EPOCH)
+
+    def to_dict(self):
+        """
+        This function returns the packet as a dictionary identical to the one returned by UnpackPacket_3().
+        """
+        return self.to_record().to_dict()
+
+
+def slice_callsign(callsign, length):
+    """
+    This function returns a callsign trimmed to its callsign length field.
+    """
+    return callsign[:length]
+
+
+# Create a property of TelemetryView for every packet field decoding it with a precompiled struct unpack_from function
+for key, (offset, code) in zip(PACKET_3_KEYS, struct_field_layout(PACKET_3_STRUCT)):
+    unpack = struct.Struct(PACKET_3_STRUCT.format[0] + (str(offset) + 'x' if offset else '') + code).unpack_from
+    setattr(TelemetryView, key, property(lambda self, unpack = unpack: unpack(self.packet)[0]))
+# Use length fields to replace callsigns with exact strings, callsign length is a string like UnpackPacket_3()
+for key, unpack in (('SOURCECALLSIGN', struct.Struct('>9sB').unpack_from),
+                    ('DESTINATIONCALLSIGN', struct.Struct('>11x9sB').unpack_from)):
+    setattr(TelemetryView, key, property(lambda self, unpack = unpack: slice_callsign(*unpack(self.packet))))
+TelemetryView.SOURCECALLSIGNLEN = property(lambda self, unpack = struct.Struct('>9xB').unpack_from: str(unpack(self.packet)[0]))
+del key, offset, code, unpack
+
+
 class TelemetryParse(object):
     """
     This class object contains all the pre-defined values, packet structures, and functions used to interact (mostly parse) data from the Telemetry application. The telemetry application follows the OSI layer standards for a network stack and therfore contains its own packet
@@ -8,14 +287,29 @@ class TelemetryParse(object):
     """
     def __init__(self):
         self.datagram_struct = struct.Struct('>3B 118s 1H') #Struct format definition for the generice telemetry packet format datagram
+        self.datagram_checksum_struct = struct.Struct('>1H') #Struct format definition of the datagram ErrorDetection checksum at the end of the datagram
         self.flash_config_info_d_struct = struct.Struct('<1B 9s 5B 9x 4B 21x 9s 1s 10s 1s 8s 1s 1B 21x 1B 2H 10x')
         self.flash_config_info_d_struct_len = 116
         self.packet_1_struct = struct.Struct('4B')
         self.packet_1_len = 4
         self.packet_2_struct = struct.Struct('<1H 12B L')
         self.packet_2_len = 18
-        self.packet_3_struct = struct.Struct('>9s 2B 9s 8B 1H 9s 1s 10s 1s 8s 1s 5s 1c 4s 3B 9H 2B 2H')
+        self.packet_3_struct = PACKET_3_STRUCT
         self.packet_3_len = 97
+        self.packet_3_keys = PACKET_3_KEYS #Dictionary keys of each packet_3_struct value
+        self.packet_3_bulk_struct = struct.Struct(self.packet_3_struct.format + self.packet_3_struct.format[1:] * (BULK_CHUNK_PACKETS - 1)) #BULK_CHUNK_PACKETS consecutive packet #3's
+        self.packet_3_dtype = None #NumPy dtype matching packet_3_struct, created on first use
+        self.packet_1_keys = ('RF_Freq_2', 'RF_Freq_1', 'RF_Freq_0', 'RF_PATable')
+        self.packet_2_keys = ('BootCounter', 'ResetCounter', 'BrownoutCounter', 'Reset_NMICounter', 'PMM_LowCounter', 'PMM_HighCounter',
+                              'PMM_OVP_LowCounter', 'PMM_OVP_HighCounter', 'WatchdogTimeoutCounter', 'FlashKeyViolationCounter',
+                              'FLLUnlockCounter', 'PeripheralConfigCounter', 'AccessViolationCounter', 'FirmwareRevision')
+
+        #Registry of packet parsers used by Parse(), maps datagram PacketType to the packet struct and a function creating the result
+        #from the unpacked values and receive time
+        self.parsers = {1: (self.packet_1_struct, lambda parsed_packet, epoch: dict(zip(self.packet_1_keys, parsed_packet))),
+                        2: (self.packet_2_struct, lambda parsed_packet, epoch: dict(zip(self.packet_2_keys, parsed_packet))),
+                        3: (self.packet_3_struct, TelemetryRecord.from_unpacked),
+                        }
 
 
     def UnpackDatagram(self, packet, debug = False):
@@ -61,6 +355,47 @@ class TelemetryParse(object):
         #Return parsed packet list
         return dictionaryData
 
+    def VerifyDatagram(self, datagram):
+        """
+        This function verifies the 16 bit checksum (ErrorDetection) of a raw telemetry datagram. The checksum covers every datagram byte
+        before it, computed like Checksum.compute_checksum_16().
+
+        :param datagram: The raw telemetry datagram as a string of bytes (i.e. from DecodeRawPacket())
+
+        :return: Returns True if the datagram is the correct length and its checksum matches
+        """
+        if len(datagram) != self.datagram_struct.size:
+            return False
+        checksum_offset = self.datagram_struct.size - self.datagram_checksum_struct.size
+        checksum = self.datagram_checksum_struct.unpack_from(datagram, checksum_offset)[0]
+        return Checksum.verify_checksum_16(datagram, checksum_offset, checksum)
+
+    def Parse(self, datagram, epoch = None):
+        """
+        This function parses a raw telemetry datagram of any supported packet type. The datagram PacketType selects the precompiled packet
+        struct from the parsers registry so callers do not need to know the packet type in advance.
+
+        :param datagram: The raw telemetry datagram as a string of bytes (i.e. from DecodeRawPacket())
+        :param epoch: The time the datagram was received, defaults to now
+
+        :return: Returns a tuple of the PacketType and the parsed packet. Packet types #1 and #2 are the UnpackPacket_1() and UnpackPacket_2()
+        dictionaries, packet type #3 is a TelemetryRecord (see UnpackPacket_3_Record())
+
+        .. note:: Raises ValueError for an unknown PacketType and struct.error for a datagram of the wrong length.
+        """
+        parsed_datagram = self.datagram_struct.unpack(datagram)
+
+        try:
+            packet_struct, create = self.parsers[parsed_datagram[0]]
+        except KeyError:
+            raise ValueError("Unknown telemetry packet type {0}".format(parsed_datagram[0]))
+
+        if epoch is None:
+            epoch = time.time()
+
+        #Payload is padded, only unpack the packet from the start of it
+        return parsed_datagram[0], create(packet_struct.unpack_from(parsed_datagram[3]), epoch)
+
     def ExtractPaddedPacket(self, packet, packet_len):
         """
         This function simply extracts and returns a packet from a longer byte array. This is useful to extract ONLY the intended packet to be parsed from
@@ -241,8 +576,103 @@ class TelemetryParse(object):
         #Return parsed packet list
         return dictionaryData
 
+    def UnpackPacket_3_Record(self, packet, epoch = None):
+        """
+        This function unpacks a telemetry packet type #3 (standard telemetry) from the raw packet supplied in the function argument into
+        a compact TelemetryRecord instead of a dictionary. Use this when buffering or storing many packets.
+
+        :param packet: The packet as a string of byte that will be decoded
+        :param epoch: The time the packet was received, defaults to now
+
+        :return: Returns a TelemetryRecord with the same fields as the UnpackPacket_3() dictionary
+        """
+        parsed_packet = self.packet_3_struct.unpack(packet)
+
+        if epoch is None:
+            epoch = time.time()
+
+        return TelemetryRecord.from_unpacked(parsed_packet, epoch)
+
+    def ViewPacket_3(self, packet, epoch = None):
+        """
+        This function returns a lazy TelemetryView of a telemetry packet type #3 (standard telemetry) from the raw packet supplied in the
+        function argument. Fields are not decoded until they are accessed which is faster than UnpackPacket_3_Record() when only a few
+        fields are used. Use the view unpack() function to decode a fixed set of fields with a single struct call.
+
+        :param packet: The packet as a string of byte that will be decoded
+        :param epoch: The time the packet was received, defaults to now
+
+        :return: Returns a TelemetryView accessed like the UnpackPacket_3() dictionary
+        """
+        if epoch is None:
+            epoch = time.time()
+        return TelemetryView(packet, epoch)
+
+    def UnpackPackets_3(self, packets, epoch = None, use_numpy = False):
+        """
+        This function unpacks a contiguous string of telemetry packet type #3 (standard telemetry) packets in a single pass. This is much
+        faster than calling UnpackPacket_3() for every packet when decoding a backlog such as a historical replay.
+
+        :param packets: A string of N packets, each exactly packet_3_len bytes long, such as the joined output of ExtractPaddedPacket()
+        :param epoch: The time the packets were received, defaults to now. A list provides the time of each packet
+        :param use_numpy: If True the columns are NumPy arrays decoded with a structured dtype matching packet_3_struct (requires NumPy)
+
+        :return: Returns a dictionary of columns with the same keys as UnpackPacket_3(), each a list (or array) of N values
+
+        .. note:: Callsigns are trimmed to their callsign length fields and SOURCECALLSIGNLEN values are strings just like
+        UnpackPacket_3(). NumPy string columns also have trailing null bytes removed by NumPy.
+        """
+        count, remainder = divmod(len(packets), self.packet_3_len)
+        if remainder != 0:
+            raise ValueError("Packets length {0} is not a multiple of {1}".format(len(packets), self.packet_3_len))
+
+        if epoch is None:
+            epoch = time.time()
+        if not isinstance(epoch, (list, tuple)):
+            epoch = [epoch] * count
+        if len(epoch) != count:
+            raise ValueError("Expected {0} epoch values, received {1}".format(count, len(epoch)))
+
+        if use_numpy:
+            if numpy is None:
+                raise ImportError("UnpackPackets_3 use_numpy requires NumPy")
+            if self.packet_3_dtype is None:
+                self.packet_3_dtype = numpy_struct_dtype(self.packet_3_struct, self.packet_3_keys)
+            records = numpy.frombuffer(packets, dtype=self.packet_3_dtype, count=count)
+            columns = dict((key, records[key]) for key in self.packet_3_keys)
+            columns['SOURCECALLSIGN'] = numpy.array([callsign[:length] for callsign, length in
+                                                     zip(records['SOURCECALLSIGN'], records['SOURCECALLSIGNLEN'])])
+            columns['DESTINATIONCALLSIGN'] = numpy.array([callsign[:length] for callsign, length in
+                                                          zip(records['DESTINATIONCALLSIGN'], records['DESTINATIONCALLSIGNLEN'])])
+            columns['SOURCECALLSIGNLEN'] = records['SOURCECALLSIGNLEN'].astype('S3') #A string like UnpackPacket_3()
+            columns['EPOCH'] = numpy.array(epoch, dtype='f8')
+            return columns
+
+        #Unpack up to BULK_CHUNK_PACKETS at a time, values of each field are every len(keys)'th value
+        fields = len(self.packet_3_keys)
+        columns = [[] for key in self.packet_3_keys]
+        for start in range(0, count, BULK_CHUNK_PACKETS):
+            chunk = min(BULK_CHUNK_PACKETS, count - start)
+            if chunk == BULK_CHUNK_PACKETS:
+                chunk_struct = self.packet_3_bulk_struct
+            else:
+                chunk_struct = struct.Struct(self.packet_3_struct.format + self.packet_3_struct.format[1:] * (chunk - 1))
+            values = chunk_struct.unpack_from(packets, start * self.packet_3_len)
+            for index, column in enumerate(columns):
+                column.extend(values[index::fields])
+
+        # Use length fields to replace callsigns with exact strings
+        columns[0] = [callsign[:length] for callsign, length in zip(columns[0], columns[1])]
+        columns[3] = [callsign[:length] for callsign, length in zip(columns[3], columns[4])]
+        columns[1] = [str(length) for length in columns[1]] #A string like UnpackPacket_3()
+
+        dictionaryData = dict(zip(self.packet_3_keys, columns))
+        dictionaryData['EPOCH'] = list(epoch)
+
+        #Return columns of parsed packets
+        return dictionaryData
+
     def UnpackPacket_2(self, packet, debug = False):
-        print packet, len(packet)
         """
         This function unpacks a telemetry packet type #2 (Device Debug Flash Data) from the raw packet supplied in the function argument.
 
@@ -272,21 +702,7 @@ class TelemetryParse(object):
         #Unpack the packet
         parsed_packet = self.packet_2_struct.unpack(packet)
 
-        dictionaryData = {'BootCounter': parsed_packet[0],
-                          'ResetCounter': parsed_packet[1],
-                          'BrownoutCounter': parsed_packet[2],
-                          'Reset_NMICounter': parsed_packet[3],
-                          'PMM_LowCounter': parsed_packet[4],
-                          'PMM_HighCounter': parsed_packet[5],
-                          'PMM_OVP_LowCounter': parsed_packet[6],
-                          'PMM_OVP_HighCounter': parsed_packet[7],
-                          'WatchdogTimeoutCounter': parsed_packet[8],
-                          'FlashKeyViolationCounter': parsed_packet[9],
-                          'FLLUnlockCounter': parsed_packet[10],
-                          'PeripheralConfigCounter': parsed_packet[11],
-                          'AccessViolationCounter': parsed_packet[12],
-                          'FirmwareRevision': parsed_packet[13],
-                          }
+        dictionaryData = dict(zip(self.packet_2_keys, parsed_packet))
 
         #Perform debug actions if needed
         if(debug == True):
@@ -331,11 +747,7 @@ class TelemetryParse(object):
         #Unpack the packet
         parsed_packet = self.packet_1_struct.unpack(packet)
 
-        dictionaryData = {'RF_Freq_2': parsed_packet[0],
-                          'RF_Freq_1': parsed_packet[1],
-                          'RF_Freq_0': parsed_packet[2],
-                          'RF_PATable': parsed_packet[3],
-                          }
+        dictionaryData = dict(zip(self.packet_1_keys, parsed_packet))
 
         #Perform debug actions if needed
         if(debug == True):
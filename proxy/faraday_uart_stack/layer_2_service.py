@@ -55,6 +55,12 @@ class Layer2ServiceObject(threading.Thread):
     def POST(self, payload_data):
         self.tx.insert_data(payload_data)
 
+    def TxInWait(self):
+        """
+        Returns the number of payloads and framed fragments waiting to be transmitted
+        """
+        return self.tx.insert_data_class.tx_data_queue.qsize() + self.tx.insert_data_class.tx_packet_queue.qsize()
+
     def GET(self):
         """
         Gets the next received Layer 2 datagram in the FIFO
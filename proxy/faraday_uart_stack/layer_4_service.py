@@ -16,6 +16,37 @@ import time
 import Queue
 import struct
 
+#Transmit priority lanes, lower numbers are always sent first
+PRIORITY_EXPRESS = 0 #Cutdown and reset commands
+PRIORITY_COMMAND = 1 #All other commands
+PRIORITY_BULK = 2 #All other service ports
+PRIORITY_LANES = (PRIORITY_EXPRESS, PRIORITY_COMMAND, PRIORITY_BULK)
+
+#Command service port and the command datagram bytes identifying express commands
+COMMAND_SERVICE_NUMBER = 2
+COMMAND_NUMBER_OFFSET = 0 #Command number of a local command datagram
+RF_COMMAND_NUMBER = 9 #Local command datagram carrying a command for a remote (RF) unit
+RF_COMMAND_NUMBER_OFFSET = 13 #Remote command number after the 2 byte datagram and 11 byte RF command headers
+EXPRESS_COMMAND_NUMBERS = frozenset([14, 15, 16, 17, 253, 254]) #HAB cutdown/timer/state machine and configuration hard/factory resets
+
+
+def transmit_priority(service_number, payload):
+    """
+    Returns the transmit priority lane of a payload for a service number. Commands on the command service port are
+    classified by command number, local or RF, so urgent cutdown and reset commands skip queued bulk traffic.
+    """
+    if(service_number != COMMAND_SERVICE_NUMBER):
+        return PRIORITY_BULK
+    try:
+        command = ord(payload[COMMAND_NUMBER_OFFSET])
+        if(command == RF_COMMAND_NUMBER):
+            command = ord(payload[RF_COMMAND_NUMBER_OFFSET])
+    except IndexError:
+        return PRIORITY_COMMAND
+    if(command in EXPRESS_COMMAND_NUMBERS):
+        return PRIORITY_EXPRESS
+    return PRIORITY_COMMAND
+
 
 #####################################################
 ##
@@ -50,7 +81,9 @@ class faraday_uart_object(threading.Thread):
         self.rx_unparsed = ''
         self.enabled = True
         self.uart_layer_output_status = True
-        self.transmit_datagram_queue = Queue.Queue(0)
+        self.transmit_datagram_queues = [Queue.Queue(0) for lane in PRIORITY_LANES] #One FIFO per priority lane
+        self.transmit_latency_lock = threading.Lock()
+        self.transmit_latency_stats_reset()
         self.receive_datagram_queue = Queue.Queue(0)
         self.receive_parsed_queue_dict = {} #Dictionary to manage multiple queues spurred
         self.layer_2_object = layer_2_service.Layer2ServiceObject(port, baud, timeout)
@@ -58,14 +91,16 @@ class faraday_uart_object(threading.Thread):
         self.TRANPORT_PACKET_LENGTH = 125
         self.TRANPORT_PAYLOAD_LENGTH = 123
         self.QUEUE_SIZE_DEFAULT = 100
+        self.LAYER_2_TX_BACKLOG_MAX = 0 #Hold datagrams in the priority lanes until layer 2 finished sending
 
         #Start
         threading.Thread.__init__(self)
         self.start() #Starts the run() function and thread
 
-    def POST(self, service_number, payload_length, payload):
+    def POST(self, service_number, payload_length, payload, priority=None):
         """
-        Places a given payload data to the given UART service number to be transmited to the UART device. This places the item in the transmit FIFO.
+        Places a given payload data to the given UART service number to be transmited to the UART device. This places the item in the transmit FIFO
+        of its priority lane, classified by transmit_priority() unless priority is given.
         """
 
         #Calculation protocol violations before trying to create a transport packet
@@ -79,7 +114,9 @@ class faraday_uart_object(threading.Thread):
             transport_packet = layer_4_protocol.create_packet(service_number, payload_length, payload)
             #Pad fixed length packet to correct fixed size
             transport_packet_padded = transport_packet + chr(0xff)*(self.TRANPORT_PAYLOAD_LENGTH - len(payload))
-            self.transmit_datagram_queue_put(transport_packet_padded)
+            if(priority is None):
+                priority = transmit_priority(service_number, payload)
+            self.transmit_datagram_queue_put(transport_packet_padded, priority)
         else:
             print "ERROR: Transport protocol violation"
             print "Payload Length", payload_check, len(payload)
@@ -97,18 +134,53 @@ class faraday_uart_object(threading.Thread):
         except:
             return False
 
-    def transmit_datagram_queue_put(self, item):
-        self.transmit_datagram_queue.put(item)
+    def transmit_datagram_queue_put(self, item, priority=PRIORITY_BULK):
+        self.transmit_datagram_queues[priority].put((time.time(), item))
 
     def transmit_datagram_queue_get(self):
-        if(not self.transmit_datagram_queue.empty()):
-            return self.transmit_datagram_queue.get()
+        """
+        Returns the next datagram to transmit from the highest priority lane holding one and records how long it waited.
+        """
+        for priority, queue in enumerate(self.transmit_datagram_queues):
+            try:
+                queued, item = queue.get_nowait()
+            except Queue.Empty:
+                continue
+            self.transmit_latency_record(priority, time.time() - queued)
+            return item
 
     def transmit_datagram_queue_inwait(self):
-        return self.transmit_datagram_queue.qsize()
+        return sum(queue.qsize() for queue in self.transmit_datagram_queues)
 
     def transmit_datagram_queue_hasitem(self):
-        return not self.transmit_datagram_queue.empty()
+        for queue in self.transmit_datagram_queues:
+            if(not queue.empty()):
+                return True
+        return False
+
+    def transmit_latency_record(self, priority, latency):
+        with self.transmit_latency_lock:
+            stats = self.transmit_latency[priority]
+            stats["count"] += 1
+            stats["total"] += latency
+            stats["max"] = max(stats["max"], latency)
+
+    def transmit_latency_stats(self):
+        """
+        Returns a dictionary of transmit queue latency statistics (seconds from POST to the datalink layer) per priority lane.
+        """
+        with self.transmit_latency_lock:
+            stats = {}
+            for priority, lane in enumerate(self.transmit_latency):
+                stats[priority] = {"count": lane["count"],
+                                   "mean": lane["total"] / lane["count"] if lane["count"] else 0.0,
+                                   "max": lane["max"],
+                                   "queued": self.transmit_datagram_queues[priority].qsize()}
+            return stats
+
+    def transmit_latency_stats_reset(self):
+        with self.transmit_latency_lock:
+            self.transmit_latency = [{"count": 0, "total": 0.0, "max": 0.0} for lane in PRIORITY_LANES]
 
     def receive_datagram_queue_put(self, item):
         self.receive_datagram_queue.put(item)
@@ -199,8 +271,8 @@ class faraday_uart_object(threading.Thread):
         while(self.enabled):
             #Delay to allow CPU utilization relaxing
             time.sleep(0.001)
-            #check for transmit items
-            if(self.transmit_datagram_queue_hasitem()):
+            #check for transmit items, only handing them to layer 2 once it caught up so later high priority datagrams are not stuck behind its FIFO
+            if(self.transmit_datagram_queue_hasitem() and self.layer_2_object.TxInWait() <= self.LAYER_2_TX_BACKLOG_MAX):
                 tx_datagram = self.transmit_datagram_queue_get()
                 self.layer_2_object.POST(tx_datagram)
             #check for receive items
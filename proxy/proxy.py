@@ -23,6 +23,7 @@ from flask import Flask
 from flask import request
 
 from faraday_uart_stack import layer_4_service
+import txscheduler
 
 # Start logging after importing modules
 filename = os.path.abspath("loggingConfig.ini")
@@ -36,11 +37,90 @@ proxyConfig.read(filename)
 
 # Create and initialize dictionary queues
 postDict = {}
-postDicts = {}
 getDicts = {}
 unitDict = {}
 
 
+def positiveInt(value):
+    """Returns value as an int, raises ValueError unless it is above zero"""
+    number = int(value)
+    if number <= 0:
+        raise ValueError("must be positive")
+    return number
+
+
+def createTxScheduler():
+    """
+    Creates the transmit scheduler from the [TXSCHEDULER] section of proxy.ini
+
+    RATE and BURST limit packets per second sent to each unit, QUEUESIZE
+    limits packets waiting per unit and port, DEFAULTWEIGHT and PORT<n> set
+    the weighted round-robin share of each Faraday port. Defaults are used if
+    the section is missing, invalid settings are logged and ignored.
+    """
+    rate = 20
+    burst = 10
+    queueSize = 1000
+    defaultWeight = 1
+    weights = {2: 8}
+
+    if proxyConfig.has_section("TXSCHEDULER"):
+        weights = {}
+        for key, value in proxyConfig.items("TXSCHEDULER"):
+            try:
+                if key == "rate":
+                    rate = float(value)
+                    if rate <= 0:
+                        raise ValueError("must be positive")
+                elif key == "burst":
+                    burst = positiveInt(value)
+                elif key == "queuesize":
+                    queueSize = positiveInt(value)
+                elif key == "defaultweight":
+                    defaultWeight = positiveInt(value)
+                elif key.startswith("port"):
+                    port = int(key[4:])
+                    if not 0 <= port <= 255:
+                        raise ValueError("port must be 0-255")
+                    weights[port] = positiveInt(value)
+                else:
+                    raise ValueError("unknown setting")
+
+            except ValueError as e:
+                logger.error("ValueError: [TXSCHEDULER] {0}={1} ignored, {2}"
+                             .format(key.upper(), value, e))
+
+    return txscheduler.TxScheduler(rate, burst, weights, defaultWeight,
+                                   queueSize)
+
+# Transmit scheduler holding POSTed packets until sent to each unit
+txScheduler = createTxScheduler()
+
+# Seconds between logging transmit scheduler statistics
+TX_STATS_INTERVAL = 60
+
+
+def logTxStats(previous):
+    """
+    Logs queued, sent and dropped packets and the longest wait of each unit's
+    transmit queues, as a warning if packets were dropped since the previous
+    statistics.
+
+    :param previous: Statistics returned by the previous call, or {}
+    :return: Current statistics
+    """
+    stats = txScheduler.stats()
+    for unit, unitStats in sorted(stats.iteritems()):
+        message = "TX {0}: {1} queued, {2} sent, {3} dropped, {4:.1f} s max wait"\
+            .format(unit, unitStats["queued"], unitStats["sent"],
+                    unitStats["dropped"], unitStats["maxwait"])
+        if unitStats["dropped"] > previous.get(unit, {}).get("dropped", 0):
+            logger.warning(message)
+        else:
+            logger.info(message)
+    return stats
+
+
 def uart_worker(modem, getDicts, units):
     """
     Interface Faraday ports over USB UART
@@ -54,9 +134,13 @@ def uart_worker(modem, getDicts, units):
     # Iterate through dictionary of each unit in the dictionary creating a
     # deque for each item
     for key, values in units.iteritems():
-        postDicts[str(values["callsign"]) + "-" + str(values["nodeid"])] = {}
+        txScheduler.addUnit(
+            str(values["callsign"]) + "-" + str(values["nodeid"]))
         getDicts[str(values["callsign"]) + "-" + str(values["nodeid"])] = {}
 
+    txStats = {}
+    txStatsTime = time.time()
+
     # Loop through each unit checking for data, if True place into deque
     while(1):
         # Place data into the FIFO coming from UART
@@ -85,24 +169,23 @@ def uart_worker(modem, getDicts, units):
                 logger.error("KeyError: " + str(e))
 
             time.sleep(0.001)
-            # Check for data in the POST FIFO queue. This needs to check for
-            # COM ports and create the necessary buffers on the fly
-            for port in range(0, 255):
-                try:
-                    count = len(postDicts[unit][port])
-                except:
-                    # Port simply doesn't exist so don't bother
-                    pass
-                else:
-                    for num in range(count):
-                        # Data is available, pop off [unit][port] queue
-                        # and convert to BASE64 before sending to UART
-                        message = postDicts[unit][port].popleft()
-                        message = base64.b64decode(message)
-                        com.POST(port, len(message), message)
-
-            # Slow down while loop to something reasonable
-            time.sleep(0.001)
+
+        # Send POSTed data the transmit scheduler allows now. It interleaves
+        # units and ports and holds data back beyond the RF link rate
+        for unit, port, message in txScheduler.dispatch():
+            # Convert from BASE64 before sending to UART
+            try:
+                message = base64.b64decode(message)
+                modem[unit].POST(port, len(message), message)
+            except (TypeError, KeyError) as e:
+                logger.error("Error: " + str(e))
+
+        if time.time() - txStatsTime >= TX_STATS_INTERVAL:
+            txStats = logTxStats(txStats)
+            txStatsTime = time.time()
+
+        # Slow down while loop to something reasonable
+        time.sleep(0.001)
 
 # Initialize Flask microframework
 app = Flask(__name__)
@@ -171,14 +254,12 @@ def proxy():
             logger.error("StandardError: " + str(e))
             return json.dumps({"error": str(e)}), 400
 
-        # Create station name and check for presents of postDicts queue.
+        # Create station name and check for presents of its transmit queues.
         # Error if not present since this means unit not in proxy.ini configs
         station = callsign + "-" + str(nodeid)
-        try:
-            postDicts[station]
-        except KeyError as e:
-            logger.error("KeyError: " + str(e))
-            return json.dumps({"error": str(e)}), 400
+        if not txScheduler.hasUnit(station):
+            logger.error("KeyError: " + repr(station))
+            return json.dumps({"error": repr(station)}), 400
 
         # Iterate through items in the data["data"] array. If port isn't
         # present, create port queue for it and append data to that queue
@@ -191,14 +272,15 @@ def proxy():
         else:
             total = len(data["data"])
             print "length:", total
-            sent = 0
-            for item in data['data']:
-                try:
-                    postDicts[station][port].append(item)
-                except:
-                    postDicts[station][port] = deque([], maxlen=100)
-                    postDicts[station][port].append(item)
-                sent += 1
+            sent = txScheduler.putMany(station, port, list(data['data']))
+            if sent < total:
+                # Transmit queue full, the remaining packets are dropped
+                message = "Transmit queue full, posted {0} of {1} Packet(s)"\
+                    .format(sent, total)
+                logger.warning(message)
+                return json.dumps({"error": message,
+                                   "status": "Posted {0} of {1} Packet(s)"
+                                   .format(sent, total)}), 429
             return json.dumps(
                 {"status": "Posted {0} of {1} Packet(s)"
                     .format(sent, total)}), 200
@@ -0,0 +1,246 @@
+# /proxy/txscheduler.py
+# License: GPLv3 with Network Interface Clause
+
+"""
+Transmit scheduler deciding which POSTed packet the UART worker sends to which
+Faraday radio next. Each unit (radio) has its own per-port queues and a token
+bucket limiting packets to the rate its RF link can carry, so bulk transfers
+wait here instead of piling up in the radio's transmit FIFO. Ports of a unit
+are served by smooth weighted round-robin and units are served in turn, which
+bounds the time a command waits behind bulk traffic on another port.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class TokenBucket(object):
+    """
+    Token bucket rate limiter
+
+    Tokens accumulate at rate per second up to burst, sending a packet takes
+    one token.
+    """
+
+    def __init__(self, rate, burst):
+        """
+        :param rate: Tokens added per second
+        :param burst: Maximum number of tokens
+        """
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.time()
+
+    def refill(self, now):
+        """Adds the tokens accumulated since the last refill"""
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def consume(self, now):
+        """Takes a token if available, returns True if it was taken"""
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def available(self, now):
+        """Returns True if a token is available without taking it"""
+        self.refill(now)
+        return self.tokens >= 1
+
+
+class UnitQueues(object):
+    """
+    Per-port transmit queues of a single unit
+
+    Ports are picked by smooth weighted round-robin: every pick adds each
+    waiting port's weight to its credit, the port with the highest credit is
+    sent and its credit reduced by the total weight of the waiting ports. A
+    port of weight w out of a total W is therefore sent at least every W / w
+    picks while it has packets waiting.
+    """
+
+    def __init__(self, weights, defaultWeight, queueSize, rate, burst):
+        """
+        :param weights: Dictionary of port weights
+        :param defaultWeight: Weight of ports missing from weights
+        :param queueSize: Maximum packets queued per port, further packets
+            are rejected
+        :param rate: Packets per second sent to the unit
+        :param burst: Packets sent back to back after being idle
+        """
+        self.weights = weights
+        self.defaultWeight = defaultWeight
+        self.queueSize = queueSize
+        self.bucket = TokenBucket(rate, burst)
+        self.queues = {}
+        self.credit = {}
+        self.sent = 0
+        self.dropped = 0
+        self.maxWait = 0
+
+    def put(self, port, item, now):
+        """
+        Queues an item on a port
+
+        :return: True if queued, False if the port queue is full and the item
+            was dropped
+        """
+        try:
+            queue = self.queues[port]
+        except KeyError:
+            queue = self.queues[port] = deque()
+            self.credit[port] = 0
+        if len(queue) >= self.queueSize:
+            self.dropped += 1
+            return False
+        queue.append((now, item))
+        return True
+
+    def get(self, now):
+        """Returns (port, item) of the next item to send, None if empty"""
+        waiting = [port for port, queue in self.queues.iteritems() if queue]
+        if not waiting:
+            return None
+
+        total = 0
+        for port in waiting:
+            weight = self.weights.get(port, self.defaultWeight)
+            self.credit[port] += weight
+            total += weight
+        port = max(waiting, key=lambda port: self.credit[port])
+        self.credit[port] -= total
+
+        # Ports that drained start again from zero
+        for idle in self.credit:
+            if idle not in waiting:
+                self.credit[idle] = 0
+
+        queued, item = self.queues[port].popleft()
+        self.sent += 1
+        self.maxWait = max(self.maxWait, now - queued)
+        return port, item
+
+    def queued(self):
+        """Returns the number of queued items"""
+        return sum(len(queue) for queue in self.queues.itervalues())
+
+
+class TxScheduler(object):
+    """
+    Schedules POSTed packets of all units
+
+    put() is called from the Flask request threads and dispatch() from the
+    UART worker thread.
+    """
+
+    def __init__(self, rate, burst, weights=None, defaultWeight=1,
+                 queueSize=1000):
+        """
+        :param rate: Packets per second sent to each unit
+        :param burst: Packets sent to a unit back to back after being idle
+        :param weights: Dictionary of port weights, ports not listed use
+            defaultWeight
+        :param defaultWeight: Weight of ports missing from weights
+        :param queueSize: Maximum packets queued per unit and port, should
+            hold a burst of POSTs for several seconds at rate
+        """
+        self.rate = rate
+        self.burst = burst
+        self.weights = weights or {}
+        self.defaultWeight = defaultWeight
+        self.queueSize = queueSize
+        self.units = {}
+        self.order = []
+        self.lock = threading.Lock()
+
+    def addUnit(self, unit):
+        """Creates the queues of a unit"""
+        with self.lock:
+            if unit not in self.units:
+                self.units[unit] = UnitQueues(self.weights,
+                                              self.defaultWeight,
+                                              self.queueSize, self.rate,
+                                              self.burst)
+                self.order.append(unit)
+
+    def hasUnit(self, unit):
+        """Returns True if the unit was added"""
+        return unit in self.units
+
+    def put(self, unit, port, item):
+        """
+        Queues an item for a port of a unit
+
+        :param unit: Unit name "CALLSIGN-NODEID"
+        :param port: Faraday port (service number) 0-255
+        :param item: Item to send
+        :return: True if queued, False if the queue is full and the item was
+            dropped
+        :raises KeyError: Unit was not added
+        """
+        with self.lock:
+            return self.units[unit].put(port, item, time.time())
+
+    def putMany(self, unit, port, items):
+        """
+        Queues items for a port of a unit in order, stopping at the first item
+        that does not fit. All items not queued are counted as dropped.
+
+        :param unit: Unit name "CALLSIGN-NODEID"
+        :param port: Faraday port (service number) 0-255
+        :param items: List of items to send
+        :return: Number of items queued
+        :raises KeyError: Unit was not added
+        """
+        with self.lock:
+            unitQueues = self.units[unit]
+            now = time.time()
+            for queued, item in enumerate(items):
+                if not unitQueues.put(port, item, now):
+                    unitQueues.dropped += len(items) - queued - 1
+                    return queued
+            return len(items)
+
+    def dispatch(self):
+        """
+        Returns the items that may be sent now as a list of (unit, port, item)
+
+        Units take turns sending one item each while they have items queued
+        and tokens left. The first unit served rotates every call so no unit
+        is always first.
+        """
+        dispatched = []
+        with self.lock:
+            now = time.time()
+            active = [self.units[unit] for unit in self.order]
+            names = list(self.order)
+            while active:
+                ready = []
+                for name, unit in zip(names, active):
+                    if unit.queued() and unit.bucket.available(now):
+                        port, item = unit.get(now)
+                        unit.bucket.consume(now)
+                        dispatched.append((name, port, item))
+                        ready.append((name, unit))
+                names = [name for name, unit in ready]
+                active = [unit for name, unit in ready]
+
+            if self.order:
+                self.order.append(self.order.pop(0))
+        return dispatched
+
+    def stats(self):
+        """Returns a dictionary of per unit queue statistics"""
+        with self.lock:
+            return dict((name, {"queued": unit.queued(),
+                                "sent": unit.sent,
+                                "dropped": unit.dropped,
+                                "maxwait": unit.maxWait,
+                                "tokens": unit.bucket.tokens})
+                        for name, unit in self.units.iteritems())